@@ -0,0 +1,276 @@
+"""
+Run shuffle jobs for many accounts (and Google Cloud projects) at once
+
+Each account is a directory with its own credentials.json and token.json
+(create the token once by running `python api_test.py` in that directory).
+Every account gets a worker process that runs inside its directory, so its
+quota ledger, playlist cache and job journals stay separate and one
+project's daily quota never limits another's.
+
+Jobs are routed centrally: a playlist goes to an account that owns it
+(it is in that account's playlist listing) and has quota left, preferring
+the owner with the most quota. Progress lines from the workers and the
+final results come back to the parent, tagged with the account name.
+"""
+import fnmatch
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from quota import QuotaLedger, QuotaScheduler, DEFAULT_LEDGER_PATH, PAGE_SIZE, QUOTA_COSTS, project_id_from_credentials
+
+_runner = None      # This worker process's BatchRunner (see _init_worker)
+
+
+# === Worker process side ===
+class _QueueWriter:
+    """File-like object that sends each JSON line to the parent process"""
+    def __init__(self, events, account):
+        self.events = events
+        self.account = account
+
+    def write(self, text):
+        for line in text.splitlines():
+            if line:
+                self.events.put((self.account, line))
+
+    def flush(self):
+        pass
+
+
+def default_runner(concurrency, out, wait_for_quota=False):
+    """Build the worker's BatchRunner; uses credentials.json and token.json of the current directory"""
+    from shuffler_cli import BatchRunner
+    return BatchRunner(concurrency, wait_for_quota, out)
+
+
+def _init_worker(directory, name, events, concurrency, wait_for_quota, runner_factory):
+    global _runner
+    sys.stdout = sys.stderr     # stdout belongs to the parent's JSON lines
+    os.chdir(directory)     # token.json, credentials.json, ledger, cache and jobs/ of this account
+    _runner = runner_factory(concurrency, _QueueWriter(events, name), wait_for_quota)
+
+
+def _list_playlists():
+    return _runner.manager().get_user_playlists()
+
+
+def _run_job(job):
+    return _runner.shuffle_one(job['playlist'], job['mode'], job['name_template'])
+
+
+def _metrics_snapshot():
+    return _runner.metrics.snapshot()
+
+
+# === Parent process side ===
+def estimate_job(job):
+    """Quota units a job is expected to cost (upper bound for a full reshuffle)"""
+    count = job['playlist']['video_count']
+    pages = math.ceil(count / PAGE_SIZE)
+    if job['mode'] == 'reshuffle':
+        return pages + count * QUOTA_COSTS['update']
+    return QuotaScheduler.estimate(count) + pages   # Plus the availability check
+
+
+class Account:
+    """One credential profile: a directory holding credentials.json and token.json"""
+    def __init__(self, directory, name=None):
+        self.directory = os.path.abspath(directory)
+        self.name = name or os.path.basename(self.directory.rstrip(os.sep))
+        self.project = project_id_from_credentials(os.path.join(self.directory, 'credentials.json'))
+        self.playlists = []
+        self.pool = None
+        self.futures = set()    # Work submitted to pool and not finished yet
+
+    def submit(self, func, *args):
+        """Queue func(*args) in this account's worker process, remembering it until it finishes"""
+        future = self.pool.submit(func, *args)
+        self.futures.add(future)
+        future.add_done_callback(self.futures.discard)
+        return future
+
+    def remaining(self):
+        """Quota left today, read fresh from the ledger the worker keeps up to date"""
+        return QuotaLedger(os.path.join(self.directory, DEFAULT_LEDGER_PATH), project=self.project).remaining()
+
+
+class AccountPool:
+    """
+    Worker processes for several accounts, with central routing and results
+    Args: directories - one per account (see the module docstring),
+          concurrency - threads per worker for batches and prefetching,
+          out - where JSON progress lines go,
+          wait_for_quota - jobs wait in their worker for the daily reset instead
+                           of being skipped when no owner has quota left,
+          runner_factory - builds a worker's BatchRunner (for tests),
+          mp_context - multiprocessing context (default 'spawn', safe on every OS)
+    Use as a context manager so the worker processes are shut down.
+    """
+    def __init__(self, directories, concurrency=4, out=None, wait_for_quota=False,
+                 runner_factory=default_runner, mp_context=None):
+        self.accounts = [Account(directory) for directory in directories]
+        if len({account.name for account in self.accounts}) != len(self.accounts):
+            raise ValueError("Account directories must have different names")
+        self.concurrency = concurrency
+        self.out = out
+        self.wait_for_quota = wait_for_quota
+        self.runner_factory = runner_factory
+        self.mp_context = mp_context or multiprocessing.get_context('spawn')
+        self._out_lock = threading.Lock()
+        self._events = None
+        self._drainer = None
+
+    def __enter__(self):
+        self._events = self.mp_context.Queue()
+        self._drainer = threading.Thread(target=self._drain_events, name='account-events', daemon=True)
+        self._drainer.start()
+        for account in self.accounts:
+            account.pool = ProcessPoolExecutor(
+                max_workers=1, mp_context=self.mp_context, initializer=_init_worker,
+                initargs=(account.directory, account.name, self._events, self.concurrency,
+                          self.wait_for_quota, self.runner_factory))
+        return self
+
+    def __exit__(self, *exc_info):
+        for account in self.accounts:
+            if account.pool is not None:
+                # Drop jobs that have not started (shutdown's cancel_futures needs Python 3.9)
+                for future in list(account.futures):
+                    future.cancel()
+                account.pool.shutdown(wait=True)
+                account.pool = None
+        self._events.put(None)
+        self._drainer.join(timeout=5)
+
+    # === Output ===
+    def emit(self, event, account=None, **fields):
+        """Write one JSON progress line (fields as in shuffler_cli, plus the account)"""
+        if self.out is None:
+            return
+        record = dict(event=event, time=round(time.time(), 3), **fields)
+        if account is not None:
+            record['account'] = account
+        with self._out_lock:
+            self.out.write(json.dumps(record) + '\n')
+            self.out.flush()
+
+    def _drain_events(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            account, line = item
+            with self._out_lock:
+                if self.out is not None:
+                    self.out.write(json.dumps(dict(json.loads(line), account=account)) + '\n')
+                    self.out.flush()
+
+    # === Routing ===
+    def discover(self):
+        """List every account's playlists (in parallel) to learn who owns what"""
+        futures = {account: account.submit(_list_playlists) for account in self.accounts}
+        for account, future in futures.items():
+            try:
+                account.playlists = future.result()
+            except Exception as e:
+                account.playlists = []
+                self.emit('warning', account=account.name, message=f"Could not list playlists: {e}")
+        return {account.name: account.playlists for account in self.accounts}
+
+    def plan(self, patterns, mode='create', name_template='{title} (shuffled)'):
+        """
+        Turn playlist IDs / title globs into jobs, one per matched playlist
+        Returns: list of job dictionaries with the accounts that own each playlist
+        """
+        jobs = {}
+        for pattern in patterns:
+            matched = False
+            for account in self.accounts:
+                for playlist in account.playlists:
+                    if playlist['id'] == pattern or fnmatch.fnmatchcase(playlist['title'], pattern):
+                        matched = True
+                        job = jobs.setdefault(playlist['id'], {'playlist': playlist, 'mode': mode,
+                                                               'name_template': name_template, 'owners': []})
+                        if account.name not in job['owners']:
+                            job['owners'].append(account.name)
+            if not matched:
+                self.emit('warning', message=f"No playlist matches '{pattern}' in any account")
+        return list(jobs.values())
+
+    def _pick(self, account, pending, remaining):
+        """The first pending job this idle account should take, or None"""
+        for job in pending:
+            if account.name not in job['owners']:
+                continue
+            if remaining[account.name] <= 0 and not self.wait_for_quota:
+                continue
+            # Take it if we can afford it, or if no owner has more quota left than we do
+            best = max(remaining[owner] for owner in job['owners'])
+            if remaining[account.name] >= min(estimate_job(job), best):
+                return job
+        return None
+
+    def run(self, jobs):
+        """
+        Run jobs across the accounts, each account working on one job at a time
+        Returns: list of result dictionaries (with 'account' and 'status'), in completion order
+        """
+        by_name = {account.name: account for account in self.accounts}
+        pending = list(jobs)
+        running = {}        # future -> (account, job)
+        results = []
+        while pending or running:
+            busy = {account.name for account, job in running.values()}
+            remaining = {account.name: account.remaining() for account in self.accounts}
+            # Idle accounts with the most quota left choose first
+            for name in sorted(remaining, key=remaining.get, reverse=True):
+                if name in busy:
+                    continue
+                job = self._pick(by_name[name], pending, remaining)
+                if job is not None:
+                    pending.remove(job)
+                    self.emit('assigned', account=name, playlist_id=job['playlist']['id'],
+                              estimate=estimate_job(job), quota_remaining=remaining[name])
+                    running[by_name[name].submit(_run_job, job)] = (by_name[name], job)
+
+            if not running:
+                # Nothing is running and nothing could start: no owner has quota left
+                for job in pending:
+                    results.append(self._result(None, job, status='skipped',
+                                                error="no account that owns it has quota left"))
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                account, job = running.pop(future)
+                try:
+                    result = future.result()
+                    results.append(self._result(account.name, job, status='ok' if not result.get('failed')
+                                                else 'partial', **result))
+                except Exception as e:
+                    results.append(self._result(account.name, job, status='error', error=str(e)))
+
+        self.emit('finished', ok=all(result['status'] == 'ok' for result in results),
+                  quota_remaining={account.name: account.remaining() for account in self.accounts})
+        return results
+
+    def collect_metrics(self):
+        """
+        Every worker's metrics in one Metrics object
+        Returns: Metrics whose series carry an 'account' label
+        """
+        from metrics import Metrics
+        merged = Metrics()
+        for account in self.accounts:
+            merged.merge(account.submit(_metrics_snapshot).result(), account=account.name)
+        return merged
+
+    def _result(self, account, job, **fields):
+        result = dict({'playlist_id': job['playlist']['id']}, **fields, account=account)
+        self.emit('result', **result)
+        return result
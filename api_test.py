@@ -1,23 +1,27 @@
 import os
+import threading
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from youtube_session import YouTubeSession
 
 # Define what permissions we need from YouTube API
 SCOPES = ['https://www.googleapis.com/auth/youtube']
+TOKEN_PATH = 'token.json'
 
-def authenticate_youtube():
+_session = None                 # Process-wide YouTubeSession, see get_session
+_session_lock = threading.Lock()
+
+def load_credentials():
     """
-    Handles YouTube API authentication using OAuth2
-    Returns: authenticated YouTube service object
+    Load saved OAuth2 credentials, refreshing them or asking the user as needed
+    Returns: valid google.oauth2 Credentials
     """
     creds = None
 
     # Check if we already have saved credentials
-    if os.path.exists('token.json') and os.path.getsize('token.json') > 0:
+    if os.path.exists(TOKEN_PATH) and os.path.getsize(TOKEN_PATH) > 0:
         # Load existing credentials from file
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
 
     # If credentials don't exist or are invalid, get new ones
     if not creds or not creds.valid:
@@ -26,15 +30,35 @@ def authenticate_youtube():
             creds.refresh(Request())
         else:
             # Start OAuth flow - opens browser for user to authorize
+            # (imported here: only first runs need it, and it is slow to import)
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
             creds = flow.run_local_server(port=0)
 
         # Save credentials for future use
-        with open('token.json', 'w') as token:
+        with open(TOKEN_PATH, 'w') as token:
             token.write(creds.to_json())
 
-    # Create and return YouTube API service object
-    return build('youtube', 'v3', credentials=creds)
+    return creds
+
+def get_session():
+    """
+    The process-wide YouTubeSession: credentials are loaded (and the OAuth
+    flow run) once, then refreshed in the background before they expire
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = YouTubeSession(load_credentials(), token_path=TOKEN_PATH).start()
+        return _session
+
+def authenticate_youtube():
+    """
+    Handles YouTube API authentication using OAuth2
+    Returns: authenticated YouTube service object for the calling thread
+             (each thread gets its own, sharing one set of credentials)
+    """
+    return get_session().service()
 
 # Test authentication when script runs directly
 if __name__ == "__main__":
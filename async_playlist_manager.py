@@ -0,0 +1,173 @@
+import asyncio
+import json
+import random
+import aiohttp
+import httplib2
+from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+from request_executor import RetryPolicy, classify_error, RETRY, THROTTLE
+
+API_URL = 'https://www.googleapis.com/youtube/v3/'
+# Connection resets, DNS failures, timeouts... (aiohttp's counterpart of request_executor.NETWORK_ERRORS)
+NETWORK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class AsyncPlaylistManager:
+    """
+    asyncio version of PlaylistManager: same operations, one pooled keep-alive session
+    Args: credentials - google.oauth2 Credentials (None for an unauthenticated test server),
+          api_url - API root, max_connections - size of the connection pool,
+          max_concurrency - requests in flight at once across all operations
+    Use as: async with AsyncPlaylistManager(creds) as pm: ...
+    """
+    def __init__(self, credentials=None, api_url=API_URL, max_connections=20,
+                 max_concurrency=10, retry_policy=None):
+        self.credentials = credentials
+        self.api_url = api_url
+        self.max_connections = max_connections
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    # === Operations (mirror PlaylistManager) ===
+    async def get_user_playlists(self):
+        """
+        Fetch all playlists owned by the authenticated user
+        Returns: List of dictionaries with playlist info
+        """
+        playlists = []
+        async for item in self._paginate('playlists', part='snippet,contentDetails', mine='true'):
+            playlists.append({
+                'id': item['id'],
+                'title': item['snippet']['title'],
+                'video_count': item['contentDetails']['itemCount']
+            })
+        return playlists
+
+    async def get_playlist_videos(self, playlist_id):
+        """
+        Get all videos from a specific playlist
+        Returns: List of video dictionaries
+        """
+        return [{
+            'video_id': item['snippet']['resourceId']['videoId'],
+            'title': item['snippet']['title'],
+            'item_id': item['id']
+        } async for item in self._paginate('playlistItems', part='snippet', playlistId=playlist_id)]
+
+    async def get_many_playlist_videos(self, playlist_ids):
+        """
+        Fetch several playlists at once
+        Returns: dictionary playlist_id -> list of video dictionaries
+        """
+        results = await asyncio.gather(*(self.get_playlist_videos(p) for p in playlist_ids))
+        return dict(zip(playlist_ids, results))
+
+    async def create_new_playlist(self, title, description=""):
+        """
+        Create a new empty private playlist
+        Returns: playlist ID if successful, None if failed
+        """
+        try:
+            response = await self._call('POST', 'playlists', {'part': 'snippet,status'}, {
+                'snippet': {'title': title, 'description': description},
+                'status': {'privacyStatus': 'private'}
+            })
+            return response['id']
+        except (HttpError,) + NETWORK_ERRORS as e:
+            print(f"Error creating playlist: {e}")
+            return None
+
+    async def add_videos_to_playlist(self, playlist_id, video_ids, positions=None, max_workers=1):
+        """
+        Add videos to a playlist
+        Args: positions - playlist position for each video; default None appends them,
+              max_workers - inserts in flight at once (also capped by max_concurrency)
+        Returns: tuple (successful_count, failed_videos)
+
+        As in the threaded engine, inserts go one at a time in ascending
+        position order by default; max_workers > 1 lets them land out of order.
+        """
+        slots = positions if positions is not None else list(range(len(video_ids)))
+        workers = asyncio.Semaphore(max_workers)
+
+        async def insert(index):
+            snippet = {'playlistId': playlist_id,
+                       'resourceId': {'kind': 'youtube#video', 'videoId': video_ids[index]}}
+            if positions is not None:
+                snippet['position'] = positions[index]
+            async with workers:     # Waiters are woken first come, first served: in position order
+                try:
+                    await self._call('POST', 'playlistItems', {'part': 'snippet'}, {'snippet': snippet})
+                    return None
+                except (HttpError,) + NETWORK_ERRORS as e:
+                    return {'video_id': video_ids[index], 'error': str(e) or repr(e), 'position': slots[index]+1}
+
+        order = sorted(range(len(video_ids)), key=slots.__getitem__)
+        results = await asyncio.gather(*(insert(index) for index in order))
+        failed_videos = [failure for failure in results if failure]
+        return len(video_ids) - len(failed_videos), failed_videos
+
+    def shuffle_videos(self, videos):
+        """Randomize the order of videos; returns a new list"""
+        shuffled = videos.copy()
+        random.shuffle(shuffled)
+        return shuffled
+
+    # === HTTP plumbing ===
+    async def _paginate(self, resource, **params):
+        """Yield every item of a list endpoint, following nextPageToken"""
+        params['maxResults'] = 50
+        while True:
+            response = await self._call('GET', resource, params)
+            for item in response.get('items', []):
+                yield item
+            if not response.get('nextPageToken'):
+                break
+            params['pageToken'] = response['nextPageToken']
+
+    async def _call(self, method, resource, params, body=None):
+        """
+        Make one API request with the shared retry policy
+        Errors are raised as googleapiclient HttpError so they classify the same
+        way as in the threaded engine. Network errors are retried for reads
+        only: a POST may have gone through before the connection broke, and
+        sending it again could create a duplicate.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    headers = await self._auth_headers()
+                    async with self._session.request(method, self.api_url + resource, params=params,
+                                                     json=body, headers=headers) as resp:
+                        content = await resp.read()
+                        if resp.status < 300:
+                            return json.loads(content) if content else {}
+                        error = HttpError(httplib2.Response(dict(resp.headers, status=str(resp.status))),
+                                          content, uri=str(resp.url))
+                retry = classify_error(error) in (RETRY, THROTTLE)
+            except NETWORK_ERRORS as e:
+                error = e
+                retry = method != 'POST'
+
+            if not retry or attempt >= self.retry_policy.max_retries:
+                raise error
+            await asyncio.sleep(self.retry_policy.delay(attempt, error))
+            attempt += 1
+
+    async def _auth_headers(self):
+        if self.credentials is None:
+            return {}
+        if not self.credentials.valid:
+            # google-auth refresh is blocking, keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.credentials.refresh, Request())
+        return {'Authorization': f"Bearer {self.credentials.token}"}
@@ -0,0 +1,30 @@
+# Benchmark: time of every shuffle strategy at growing playlist sizes
+# Run: python benchmarks/bench_shuffle_strategies.py [sizes...]   (default 10000 100000 1000000)
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shuffle_strategies import STRATEGIES, build_permutation
+
+
+def make_videos(count, channels=200):
+    return [{'video_id': f"v{i:010d}", 'channel_id': f"c{i % channels}",
+             'duration_seconds': 60 + i % 600,
+             'published_at': f"20{10 + i % 15}-0{1 + i % 9}-01T00:00:00Z"} for i in range(count)]
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'items':>9}  " + "  ".join(f"{name:>15}" for name in STRATEGIES))
+    for count in sizes:
+        videos = make_videos(count)
+        timings = []
+        for name in STRATEGIES:
+            start = time.perf_counter()
+            build_permutation(videos, name, seed=1, **({'k': 5} if name == 'channel_spread' else {}))
+            timings.append(time.perf_counter() - start)
+        print(f"{count:>9}  " + "  ".join(f"{seconds * 1000:13.1f}ms" for seconds in timings))
+
+# How to verify: times should grow roughly linearly (n log n) with the item count
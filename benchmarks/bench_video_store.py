@@ -0,0 +1,62 @@
+# Benchmark: list-of-dicts vs VideoStore for build + shuffle + ID extraction
+# Run: python benchmarks/bench_video_store.py [sizes...]   (default 10000 100000 1000000)
+
+import sys
+import os
+import gc
+import random
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_store import VideoStore
+
+
+def pages(count):
+    """Yield fake pages of 50 video dictionaries, like iter_playlist_pages"""
+    for start in range(0, count, 50):
+        yield [{'video_id': f"v{i:010d}", 'title': f"Some video title number {i}",
+                'item_id': f"UExfaXRlbS0{i:020d}"} for i in range(start, min(start + 50, count))]
+
+
+def dict_path(count):
+    """What the GUI does today: list of dicts, copied shuffle, list of IDs"""
+    videos = []
+    for page in pages(count):
+        videos.extend(page)
+    shuffled = videos.copy()
+    random.shuffle(shuffled)
+    ids = [v['video_id'] for v in shuffled]
+    return videos, shuffled, ids
+
+
+def store_path(count):
+    store = VideoStore()
+    for page in pages(count):
+        store.extend(page)
+    view = store.shuffled()
+    ids = view.video_ids()
+    return store, view, ids
+
+
+def measure(func, count):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(count)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current / 2**20, peak / 2**20
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'items':>9}  {'path':<14} {'time':>8}  {'held MB':>9}  {'peak MB':>9}")
+    for count in sizes:
+        for name, func in (('list of dicts', dict_path), ('VideoStore', store_path)):
+            elapsed, held, peak = measure(func, count)
+            print(f"{count:>9}  {name:<14} {elapsed:7.2f}s  {held:9.1f}  {peak:9.1f}")
+
+# How to verify: VideoStore should hold several times less memory at every size
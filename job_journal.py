@@ -0,0 +1,208 @@
+import contextlib
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from quota import QUOTA_COSTS
+
+DEFAULT_JOBS_DIR = 'jobs'
+
+
+class JobJournal:
+    """
+    Append-only write-ahead log of one shuffle-and-create job (JSON Lines)
+    Records, in order: the job (source, target name, chosen order), the target
+    playlist once created, each batch of confirmed inserts, and 'done'.
+    Every record is flushed and fsynced before we move on, so after a crash
+    load() returns exactly what YouTube has already confirmed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.job = None                 # The 'job' record
+        self.target_playlist_id = None
+        self.inserted = set()           # Confirmed positions in the target playlist
+        self.done = False
+        self._lock = threading.Lock()   # Inserts are confirmed from worker threads
+
+    @classmethod
+    def create(cls, source_playlist, target_title, video_ids, description="", jobs_dir=DEFAULT_JOBS_DIR):
+        """
+        Start a new journal for a job
+        Args: source_playlist - dictionary from get_user_playlists,
+              target_title/description - for the new playlist,
+              video_ids - the shuffled order that will be written
+        Returns: JobJournal
+        """
+        os.makedirs(jobs_dir, exist_ok=True)
+        path = os.path.join(jobs_dir, f"shuffle_{time.strftime('%Y%m%d_%H%M%S')}_{source_playlist['id']}.jsonl")
+        journal = cls(path)
+        journal._append({
+            'type': 'job',
+            'source_playlist_id': source_playlist['id'],
+            'source_title': source_playlist['title'],
+            'target_title': target_title,
+            'description': description,
+            'video_ids': list(video_ids),
+            'created': time.time()
+        })
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """
+        Replay a journal from disk
+        A torn last line (crash in the middle of a write) is ignored.
+        """
+        journal = cls(path)
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break   # Only the last line can be incomplete
+                journal._apply(record)
+        if journal.job is None:
+            raise ValueError(f"{path} is not a job journal")
+        return journal
+
+    # === Writing ===
+    def record_target(self, playlist_id):
+        self._append({'type': 'target', 'playlist_id': playlist_id})
+
+    def record_inserted(self, positions):
+        if positions:
+            self._append({'type': 'inserted', 'positions': sorted(positions)})
+
+    def record_done(self):
+        self._append({'type': 'done'})
+
+    # === Reading ===
+    def remaining(self):
+        """Return (video_ids, positions) still to be inserted, in position order"""
+        todo = [i for i in range(len(self.job['video_ids'])) if i not in self.inserted]
+        return [self.job['video_ids'][i] for i in todo], todo
+
+    def _append(self, record):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())    # Committed means on disk
+            self._apply(record)
+
+    def _apply(self, record):
+        kind = record['type']
+        if kind == 'job':
+            self.job = record
+        elif kind == 'target':
+            self.target_playlist_id = record['playlist_id']
+        elif kind == 'inserted':
+            self.inserted.update(record['positions'])
+        elif kind == 'done':
+            self.done = True
+
+
+def find_unfinished_jobs(jobs_dir=DEFAULT_JOBS_DIR):
+    """Return paths of journals that are not done, newest first"""
+    paths = sorted(glob.glob(os.path.join(jobs_dir, 'shuffle_*.jsonl')), key=os.path.getmtime, reverse=True)
+    unfinished = []
+    for path in paths:
+        try:
+            if not JobJournal.load(path).done:
+                unfinished.append(path)
+        except (OSError, ValueError):
+            continue    # Unreadable journal, skip it
+    return unfinished
+
+
+def run_job(playlist_manager, journal, log=print, scheduler=None, **add_options):
+    """
+    Run (or resume) a journaled job: create the target if needed, insert what is left,
+    then check the final order (PlaylistManager.ensure_order)
+    Args: playlist_manager - PlaylistManager, journal - JobJournal,
+          log - function for progress messages,
+          scheduler - optional QuotaScheduler; work is then split to fit today's
+                      quota and the rest waits for the daily reset,
+          add_options - passed to add_videos_to_playlist
+    Returns: tuple (added_count, failed_videos) for this run
+    """
+    # One span around the whole job; create and insert spans become its children
+    metrics = getattr(playlist_manager, 'metrics', None)
+    with metrics.span('job', journal=journal.path) if metrics else contextlib.nullcontext():
+        return _run_job(playlist_manager, journal, log, scheduler, add_options)
+
+
+def _run_job(playlist_manager, journal, log, scheduler, add_options):
+    job = journal.job
+    if journal.target_playlist_id is None:
+        if scheduler and scheduler.check(QUOTA_COSTS['insert']) == 'queue':
+            scheduler.wait_for_reset(log)
+        log(f"Creating playlist '{job['target_title']}'...")
+        playlist_id = playlist_manager.create_new_playlist(job['target_title'], job['description'])
+        if not playlist_id:
+            raise RuntimeError("Failed to create playlist")
+        journal.record_target(playlist_id)
+
+    done_before = len(journal.inserted)
+    if done_before:
+        log(f"Resuming: {done_before}/{len(job['video_ids'])} videos already added")
+
+    total_added = 0
+    while True:
+        video_ids, positions = journal.remaining()
+        if scheduler:
+            affordable = scheduler.affordable_inserts()
+            if not affordable:
+                scheduler.wait_for_reset(log)
+                continue
+            if affordable < len(video_ids):
+                log(f"Quota allows {affordable} of {len(video_ids)} remaining videos today")
+            video_ids, positions = video_ids[:affordable], positions[:affordable]
+
+        # The target holds only what the journal confirmed; lets unanswered inserts be checked
+        existing = [job['video_ids'][position] for position in journal.inserted]
+        added_count, failed_videos = playlist_manager.add_videos_to_playlist(
+            journal.target_playlist_id, video_ids, positions=positions,
+            on_inserted=journal.record_inserted, existing=existing, **add_options)
+        total_added += added_count
+
+        if not journal.remaining()[0]:
+            # Parts of a batch may be applied out of order; fix any stragglers before finishing
+            moved_count, failed_moves = playlist_manager.ensure_order(journal.target_playlist_id,
+                                                                      job['video_ids'])
+            if moved_count:
+                log(f"Moved {moved_count} videos that landed out of order")
+            journal.record_done()
+            return total_added, failed_videos + failed_moves
+        # Keep going only when quota (not a bad video) is what stopped us
+        if not scheduler or (failed_videos and scheduler.ledger.remaining() > 0):
+            return total_added, failed_videos
+
+
+# Resume a job from the command line: python job_journal.py resume [journal.jsonl]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'resume':
+        print("Usage: python job_journal.py resume [journal.jsonl]")
+        sys.exit(2)
+
+    paths = sys.argv[2:] or find_unfinished_jobs()[:1]
+    if not paths:
+        print("No unfinished jobs found")
+        sys.exit(0)
+
+    from api_test import authenticate_youtube, get_session
+    from playlist_manager import PlaylistManager
+    from quota import QuotaLedger, QuotaScheduler, project_id_from_credentials
+    from request_executor import RequestExecutor
+
+    journal = JobJournal.load(paths[0])
+    if journal.done:
+        print(f"{paths[0]} is already finished")
+        sys.exit(0)
+    ledger = QuotaLedger(project=project_id_from_credentials())
+    pm = PlaylistManager(authenticate_youtube(), RequestExecutor(ledger=ledger), session=get_session())
+    added, failed = run_job(pm, journal, scheduler=QuotaScheduler(ledger))
+    print(f"Added {added} videos, {len(failed)} failed")
+    sys.exit(1 if failed else 0)
@@ -1,14 +1,34 @@
 import sys
 import os
-from api_test import authenticate_youtube
-from playlist_manager import PlaylistManager
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from job_journal import JobJournal, find_unfinished_jobs, run_job
+from quota import QuotaLedger, QuotaScheduler, project_id_from_credentials
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
 
+# The Google client libraries (api_test, playlist_manager, request_executor...)
+# take longer to import than the whole window takes to appear, so they are
+# imported where they are first needed and warmed up on a worker thread once
+# the window is on screen. test/test_import_time.py keeps it that way.
+
+DRAIN_INTERVAL_MS = 50      # How often the Tk thread applies updates from workers
+MAX_LOG_LINES = 5000        # Older lines are dropped so the log widget stays fast
+
+
+def preload_client():
+    """Import the Google client stack in the background so 'Connect' does not wait for it"""
+    try:
+        import api_test, playlist_manager, request_executor   # noqa: F401
+    except Exception as e:
+        print(f"Could not preload the YouTube client: {e}")    # authenticate reports it properly
+
 class YouTubeShufflerGUI:
     """
     Main GUI class for the YouTube Playlist Shuffler application
+    Worker threads never touch Tk widgets: they put updates on self.events,
+    and drain_events applies them on the Tk thread every DRAIN_INTERVAL_MS.
     """
     def __init__(self, root):
         self.root = root
@@ -19,8 +39,19 @@ class YouTubeShufflerGUI:
         self.youtube_service = None     # Will hold authenticated YouTube API service
         self.playlist_manager = None    # Will hold PlaylistManager instance
         self.user_playlists = []        # Will store user's playlists
+        self.quota_ledger = QuotaLedger(project=project_id_from_credentials())   # Units spent today
+
+        # Background work: one small pool for every button instead of a thread per click
+        self.workers = ThreadPoolExecutor(max_workers=3, thread_name_prefix='gui-worker')
+        self.queued_work = set()            # Futures not finished yet, cancelled on close
+        self.events = queue.Queue()         # Updates from workers, drained on the Tk thread
+        self.cancel_event = threading.Event()   # Set by the Cancel button
 
         self.create_widgets()           # Build the GUI
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(DRAIN_INTERVAL_MS, self.drain_events)
+        # Once the first frame is drawn, load the client libraries off the Tk thread
+        self.root.after_idle(self.submit, preload_client)
 
     def create_widgets(self):
         """
@@ -44,6 +75,10 @@ class YouTubeShufflerGUI:
         self.status_label = ttk.Label(auth_frame, text="Not connected")
         self.status_label.grid(row=0, column=1)
 
+        # Label to show today's API quota use
+        self.quota_label = ttk.Label(auth_frame, text="")
+        self.quota_label.grid(row=0, column=2, padx=(20, 0))
+
         # === PLAYLIST SELECTION SECTION ===
         playlist_frame = ttk.LabelFrame(main_frame, text="Select Playlist", padding="5")
         playlist_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -51,8 +86,10 @@ class YouTubeShufflerGUI:
         # Dropdown to select playlist
         self.playlist_var = tk.StringVar() # Variable to store selected playlist
         self.playlist_combo = ttk.Combobox(playlist_frame, textvariable=self.playlist_var,
-                                           state="readonly", width="50")
+                                           state="readonly", width="50",
+                                           postcommand=self.prefetch_playlist_details)
         self.playlist_combo.grid(row=0, column=0, padx=(0, 10))
+        self.playlist_combo.bind("<<ComboboxSelected>>", self.show_playlist_details)
 
         # Button to load user's playlists
         self.load_playlists_button = ttk.Button(playlist_frame, text="Load Playlists",
@@ -76,9 +113,19 @@ class YouTubeShufflerGUI:
         self.shuffle_button = ttk.Button(action_frame, text="Shuffle & Create Playlist",
                                          command=self.shuffle_and_create, state="disabled")
         self.shuffle_button.grid(row=0, column=0)
-        
+
+        # Continue a job that was interrupted (crash, expired token, quota)
+        self.resume_button = ttk.Button(action_frame, text="Resume Last Job",
+                                        command=self.resume_job, state="disabled")
+        self.resume_button.grid(row=0, column=1, padx=(10, 0))
+
+        # Stop a running shuffle or resume; batches already sent still finish and are journaled
+        self.cancel_button = ttk.Button(action_frame, text="Cancel",
+                                        command=self.cancel, state="disabled")
+        self.cancel_button.grid(row=0, column=2, padx=(10, 0))
+
         # === PROGRESS AND LOG SECTION ===
-        # Progress bar for showing ongoing operations
+        # Progress bar: determinate while fetching/inserting, indeterminate otherwise
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
         self.progress.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
 
@@ -93,70 +140,243 @@ class YouTubeShufflerGUI:
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(5, weight=1)    # Log area should expand
 
+        self.update_quota_label()
+
+    def update_quota_label(self):
+        """
+        Show units spent and remaining today; reschedules itself every 2 seconds
+        Runs on the Tk thread via root.after, so worker threads never touch the label.
+        """
+        spent = self.quota_ledger.spent()
+        self.quota_label.config(text=f"Quota: {spent} used / {self.quota_ledger.remaining()} left today")
+        self.root.after(2000, self.update_quota_label)
+
+    # === THREAD-SAFE UPDATES (callable from any thread) ===
     def log_message(self, message):
         """
-        Add a message to the log area with timestamp
+        Add a message to the log area
         Args: message - text to display
         """
-        self.log_text.insert(tk.END, f"{message}\n")
+        self.events.put(('log', message))
+
+    def ui(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the Tk thread (widget changes, message boxes)"""
+        self.events.put(('call', (func, args, kwargs)))
+
+    def start_progress(self, total=None):
+        """Reset the progress bar: determinate up to total, or indeterminate if total is None"""
+        self.events.put(('progress_start', total))
+
+    def step_progress(self, count):
+        self.events.put(('progress_step', count))
+
+    def stop_progress(self):
+        self.events.put(('progress_stop', None))
+
+    def drain_events(self):
+        """
+        Apply everything workers queued since the last run, then reschedule
+        Log lines are joined into one insert, so thousands of messages cost one redraw.
+        """
+        lines = []
+        try:
+            while True:
+                kind, value = self.events.get_nowait()
+                if kind == 'log':
+                    lines.append(value)
+                    continue
+                if lines:   # Keep log lines and other updates in order
+                    self.append_log(lines)
+                    lines = []
+                if kind == 'call':
+                    func, args, kwargs = value
+                    func(*args, **kwargs)
+                elif kind == 'progress_start':
+                    self.progress.stop()
+                    if value:
+                        self.progress.config(mode='determinate', maximum=value, value=0)
+                    else:
+                        self.progress.config(mode='indeterminate')
+                        self.progress.start()
+                elif kind == 'progress_step':
+                    self.progress.config(value=min(float(self.progress['maximum']),
+                                                   float(self.progress['value']) + value))
+                elif kind == 'progress_stop':
+                    self.progress.stop()
+                    self.progress.config(mode='determinate', value=0)
+        except queue.Empty:
+            pass
+        if lines:
+            self.append_log(lines)
+        self.root.after(DRAIN_INTERVAL_MS, self.drain_events)
+
+    def append_log(self, lines):
+        """Tk thread only: add lines to the log widget and trim the oldest"""
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.log_text.index('end-1c').split('.')[0]) - MAX_LOG_LINES
+        if excess > 0:
+            self.log_text.delete('1.0', f"{excess + 1}.0")
         self.log_text.see(tk.END)       # Scroll to bottom
-        self.root.update_idletasks()    # Update GUI immediately
+
+    def run_in_background(self, func, cancellable=False):
+        """
+        Run func on the worker pool
+        A cancellable job disables the action buttons and enables Cancel until it ends.
+        """
+        if cancellable:
+            self.cancel_event.clear()
+            self.set_busy(True)
+
+        def run():
+            try:
+                func()
+            finally:
+                if cancellable:
+                    self.ui(self.set_busy, False)
+        self.submit(run)
+
+    def submit(self, func, *args):
+        """Queue func(*args) on the worker pool, remembering it until it finishes"""
+        future = self.workers.submit(func, *args)
+        self.queued_work.add(future)
+        future.add_done_callback(self.queued_work.discard)
+        return future
+
+    def set_busy(self, busy):
+        """Tk thread only: toggle the action buttons while a long job runs"""
+        state = "disabled" if busy else "normal"
+        self.shuffle_button.config(state=state if self.user_playlists else "disabled")
+        self.resume_button.config(state=state)
+        self.cancel_button.config(state="normal" if busy else "disabled")
+
+    def cancel(self):
+        """Ask the running job to stop after the batches already in flight"""
+        self.cancel_event.set()
+        self.cancel_button.config(state="disabled")
+        self.log_message("Cancelling - waiting for requests in flight to finish...")
+
+    def cancellable_sleep(self, seconds):
+        """Sleep for the quota scheduler that wakes up early when Cancel is pressed"""
+        if self.cancel_event.wait(seconds):
+            from playlist_manager import OperationCancelled
+            raise OperationCancelled()
+
+    def on_close(self):
+        self.cancel_event.set()
+        # Drop work that has not started (shutdown's cancel_futures needs Python 3.9)
+        for future in list(self.queued_work):
+            future.cancel()
+        self.workers.shutdown(wait=False)
+        self.root.destroy()
+
+    def on_metrics_event(self, event):
+        """
+        Show what slows a run down: failed/retried API calls and how long each phase took
+        Args: event - dictionary from PlaylistManager.metrics
+        """
+        if event['event'] in ('page_fetched', 'inserted'):
+            self.step_progress(event['count'])
+        elif event['event'] == 'api_call' and event['status'] not in ('200', '304'):
+            self.log_message(f"{event['endpoint']} returned {event['status']} "
+                             f"(attempt {event['attempt'] + 1}), retrying if possible")
+        elif event['event'] == 'span_end' and event['duration'] >= 1:
+            self.log_message(f"{event['name'].capitalize()} took {event['duration']:.1f}s")
 
     # === PLACEHOLDER METHODS (TO BE IMPLEMENTED) ===
     def authenticate(self):
         """Authenticate with YouTube API"""
-        def auth_thread():
+        def auth_task():
             try:
-                self.progress.start()
+                self.start_progress()
                 self.log_message("Connecting to YouTube...")
 
-                self.youtube_service = authenticate_youtube()
-                self.playlist_manager = PlaylistManager(self.youtube_service)
+                # Already imported by preload_client unless Connect was clicked right away
+                from api_test import authenticate_youtube, get_session
+                from playlist_cache import PlaylistCache
+                from playlist_manager import PlaylistManager
+                from request_executor import RequestExecutor
+                from video_metadata import VideoMetadataCache
 
-                self.progress.stop()
-                self.status_label.config(text="Connected")
-                self.load_playlists_button.config(state="normal")
+                self.youtube_service = authenticate_youtube()
+                self.playlist_manager = PlaylistManager(self.youtube_service,
+                                                        RequestExecutor(ledger=self.quota_ledger),
+                                                        cache=PlaylistCache(),
+                                                        metadata_cache=VideoMetadataCache(),
+                                                        session=get_session())
+                self.playlist_manager.metrics.subscribe(self.on_metrics_event)
+
+                self.stop_progress()
+                self.ui(self.status_label.config, text="Connected")
+                self.ui(self.load_playlists_button.config, state="normal")
+                self.ui(self.resume_button.config, state="normal")
                 self.log_message("Succesfully connected to YouTube!")
 
             except Exception as e:
-                self.progress.stop()
-                self.status_label.config(text="Connection failed")
+                self.stop_progress()
+                self.ui(self.status_label.config, text="Connection failed")
                 self.log_message(f"Authentication failed:{str(e)}")
-                messagebox.showerror("Error", f"Authentication failed: {str(e)}")
+                self.ui(messagebox.showerror, "Error", f"Authentication failed: {str(e)}")
 
-        # Run in separate thread to prevent GUI freezing
-        threading.Thread(target=auth_thread, daemon=True).start()
+        # Run in the background to prevent GUI freezing
+        self.run_in_background(auth_task)
 
     def load_playlists(self):
         """Load user playlists"""
-        def load_thread():
+        def load_task():
             try:
-                self.progress.start()
+                self.start_progress()
                 self.log_message("Loading playlists...")
 
-                self.user_playlists = self.playlist_manager.get_user_playlists()
-
-                # Update combo box
-                playlist_names = [f"{p['title']} ({p['video_count']} videos)"
-                                  for p in self.user_playlists]
-                
-                self.playlist_combo['values'] = playlist_names
+                playlists = self.playlist_manager.get_user_playlists()
 
+                # Update combo box (on the Tk thread)
+                playlist_names = [f"{p['title']} ({p['video_count']} videos)" for p in playlists]
+                self.ui(self.show_playlists, playlists, playlist_names)
                 if playlist_names:
-                    self.playlist_combo.current(0)
-                    self.shuffle_button.config(state="normal")
                     self.log_message(f"Loaded {len(playlist_names)} playlists")
                 else:
                     self.log_message("No playlists found")
 
-                self.progress.stop()
+                self.stop_progress()
 
             except Exception as e:
-                self.progress.stop()
+                self.stop_progress()
                 self.log_message(f"Error loading playlists: {str(e)}")
-                messagebox.showerror("Error", f"Failed to load playlists: {str(e)}")
+                self.ui(messagebox.showerror, "Error", f"Failed to load playlists: {str(e)}")
+
+        self.run_in_background(load_task)
+
+    def show_playlists(self, playlists, playlist_names):
+        """Tk thread only: fill the dropdown"""
+        self.user_playlists = playlists
+        self.playlist_combo['values'] = playlist_names
+        if playlist_names:
+            self.playlist_combo.current(0)
+            if self.cancel_button['state'] == "disabled":    # Not while a job runs
+                self.shuffle_button.config(state="normal")
+
+    def prefetch_playlist_details(self):
+        """Fetch details for every listed playlist in the background when the dropdown opens"""
+        if not self.user_playlists:
+            return
+        playlist_ids = [p['id'] for p in self.user_playlists]
+        self.submit(self.playlist_manager.get_playlist_details, playlist_ids)
 
-        threading.Thread(target=load_thread, daemon=True).start()
+    def show_playlist_details(self, event=None):
+        """Log the selected playlist's details (served from cache when prefetched)"""
+        selected_playlist = self.user_playlists[self.playlist_combo.current()]
+
+        def details_task():
+            try:
+                details = self.playlist_manager.get_playlist_details([selected_playlist['id']])
+                info = details.get(selected_playlist['id'])
+                if info:
+                    self.log_message(f"'{selected_playlist['title']}': {info['item_count']} videos, "
+                                     f"{info['privacy_status']}, created {info['published_at']}")
+            except Exception as e:
+                self.log_message(f"Could not load playlist details: {str(e)}")
+
+        self.run_in_background(details_task)
 
     def shuffle_and_create(self):
         """Main shuffle and create functionality"""
@@ -169,48 +389,113 @@ class YouTubeShufflerGUI:
             messagebox.showwarning("Warning", "Please enter a name for the new playlist")
             return
 
-        def shuffle_thread():
-            try:
-                self.progress.start()
-
-                # Get selected playlist
-                selected_index = self.playlist_combo.current()
-                selected_playlist = self.user_playlists[selected_index]
+        # Read the selection here: widgets belong to the Tk thread
+        selected_playlist = self.user_playlists[self.playlist_combo.current()]
 
+        def shuffle_task():
+            # Only reachable after Connect, so these are already loaded
+            from playlist_manager import PlaylistFetchError, OperationCancelled
+            try:
                 self.log_message(f"Getting videos from '{selected_playlist['title']}'...")
-                videos = self.playlist_manager.get_playlist_videos(selected_playlist['id'])
+                self.start_progress(selected_playlist['video_count'])
+                videos = []
+                try:
+                    # Pages stream in while the next one is fetched; the bar moves per page
+                    for page in self.playlist_manager.iter_playlist_pages(
+                            selected_playlist['id'], selected_playlist['video_count']):
+                        videos.extend(page['videos'])
+                        if self.cancel_event.is_set():
+                            raise OperationCancelled()
+                except PlaylistFetchError as e:
+                    self.stop_progress()
+                    self.log_message(f"Error: {e} (resume token: {e.page_token})")
+                    return
+                self.log_message(f"Fetched {len(videos)}/{selected_playlist['video_count']} videos")
 
                 if not videos:
+                    self.stop_progress()
                     self.log_message("No videos found in playlist")
                     return
                 
-                self.log_message(f"Found {len(videos)} videos. Shuffling...")
+                # Deleted, rejected and others' private videos would only burn 50-unit inserts that fail
+                self.start_progress()
+                self.log_message(f"Found {len(videos)} videos. Checking availability...")
+                videos = self.playlist_manager.enrich_videos(videos)
+                unavailable = [v for v in videos if not v['available']]
+                if unavailable:
+                    self.log_message(f"Skipping {len(unavailable)} deleted or unavailable videos")
+                    videos = [v for v in videos if v['available']]
+
+                self.log_message(f"Shuffling {len(videos)} videos...")
                 shuffled_videos = self.playlist_manager.shuffle_videos(videos)
 
-                self.log_message("Creating new playlist...")
-                new_playlist_id = self.playlist_manager.create_new_playlist(
-                    new_name,
-                    f"Shuffled version of {selected_playlist['title']}"
-                )
-
-                if not new_playlist_id:
-                    self.log_message("Failed to create playlist")
-                    return
-                
-                self.log_message("Adding videos to new playlist...")
+                # Journal the job first so it can be resumed if anything stops it
                 video_ids = [v['video_id'] for v in shuffled_videos]
-                added_count = self.playlist_manager.add_videos_to_playlist(new_playlist_id, video_ids)
+                journal = JobJournal.create(selected_playlist, new_name, video_ids,
+                                            f"Shuffled version of {selected_playlist['title']}")
+                self.log_message(f"Job journal: {journal.path}")
+                if self.cancel_event.is_set():
+                    raise OperationCancelled()
 
-                self.progress.stop()
+                self.log_message("Adding videos to new playlist...")
+                scheduler = QuotaScheduler(self.quota_ledger, sleep=self.cancellable_sleep)
+                cost = scheduler.estimate(len(video_ids), fetch_pages=0)
+                if scheduler.check(cost) != 'run':
+                    self.log_message(f"Job needs {cost} quota units, {self.quota_ledger.remaining()} left today - "
+                                     "the rest will continue after the daily reset")
+                self.start_progress(len(video_ids))
+                added_count, failed_videos = run_job(self.playlist_manager, journal, self.log_message,
+                                                     scheduler, cancel=self.cancel_event)
+
+                self.stop_progress()
+                if failed_videos:
+                    self.log_message(f"{len(failed_videos)} videos failed - use 'Resume Last Job' to retry")
                 self.log_message(f"Success! Added {added_count}/{len(videos)} videos to new playlist")
-                messagebox.showinfo("Success", f"Created playlist '{new_name}' with {added_count} videos!")
+                self.ui(messagebox.showinfo, "Success", f"Created playlist '{new_name}' with {added_count} videos!")
+
+            except OperationCancelled as e:
+                self.stop_progress()
+                self.log_message(f"Cancelled ({e.added_count} videos added) - use 'Resume Last Job' to continue")
+            except Exception as e:
+                self.stop_progress()
+                self.log_message(f"Error: {str(e)}")
+                self.ui(messagebox.showerror, "Error", f"Operation failed: {str(e)}")
+
+        self.run_in_background(shuffle_task, cancellable=True)
+
+    def resume_job(self):
+        """Continue the most recent unfinished shuffle job from its journal"""
+        def resume_task():
+            from playlist_manager import OperationCancelled
+            try:
+                unfinished = find_unfinished_jobs()
+                if not unfinished:
+                    self.log_message("No unfinished jobs to resume")
+                    return
 
+                journal = JobJournal.load(unfinished[0])
+                self.log_message(f"Resuming '{journal.job['target_title']}' from {journal.path}")
+                self.start_progress(len(journal.job['video_ids']))
+                self.step_progress(len(journal.inserted))
+                added_count, failed_videos = run_job(self.playlist_manager, journal, self.log_message,
+                                                     QuotaScheduler(self.quota_ledger, sleep=self.cancellable_sleep),
+                                                     cancel=self.cancel_event)
+
+                self.stop_progress()
+                total = len(journal.inserted)
+                self.log_message(f"Added {added_count} more videos ({total}/{len(journal.job['video_ids'])} done)")
+                if failed_videos:
+                    self.log_message(f"{len(failed_videos)} videos still failed")
+
+            except OperationCancelled as e:
+                self.stop_progress()
+                self.log_message(f"Cancelled ({e.added_count} more videos added)")
             except Exception as e:
-                self.progress.stop()
+                self.stop_progress()
                 self.log_message(f"Error: {str(e)}")
-                messagebox.showerror("Error", f"Operation failed: {str(e)}")
+                self.ui(messagebox.showerror, "Error", f"Resume failed: {str(e)}")
 
-        threading.Thread(target=shuffle_thread, daemon=True).start()
+        self.run_in_background(resume_task, cancellable=True)
 
 # Run the application when script is executed direclty 
 if __name__ == "__main__":
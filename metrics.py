@@ -0,0 +1,244 @@
+import bisect
+import contextlib
+import functools
+import json
+import secrets
+import threading
+import time
+from collections import deque
+
+PREFIX = 'shuffler_'
+# Upper bounds in seconds; covers a fast local call up to a long insert phase
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def traced(phase):
+    """Decorator: run a method of an object with a .metrics attribute inside a span"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(phase):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, fraction):
+        """Estimate a percentile from the buckets (upper bound of the bucket it falls in)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """
+    In-process counters, histograms and trace spans, plus event hooks
+    RequestExecutor records every API call here; PlaylistManager wraps each
+    job phase in a span. Subscribe a function to get every event as a
+    dictionary ({'event': 'api_call', ...}) instead of parsing printed text.
+    Hooks run on the thread that produced the event.
+    """
+    def __init__(self, keep_spans=1000):
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> number
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._hooks = []
+        self._local = threading.local()     # Open spans of this thread
+        self.spans = deque(maxlen=keep_spans)   # Most recent finished spans
+
+    # === Hooks ===
+    def subscribe(self, hook):
+        """Call hook(event_dict) for every event; returns hook so it can be unsubscribed"""
+        with self._lock:
+            self._hooks.append(hook)
+        return hook
+
+    def unsubscribe(self, hook):
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def emit(self, event, **fields):
+        """Send an event to every hook; a failing hook never breaks the caller"""
+        with self._lock:
+            hooks = list(self._hooks)
+        record = dict(event=event, time=time.time(), **fields)
+        for hook in hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                print(f"Metrics hook failed: {e}")
+
+    # === Recording ===
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        """Current value of a counter (summed over any labels not given)"""
+        with self._lock:
+            return sum(value for (counter_name, counter_labels), value in self._counters.items()
+                       if counter_name == name and set(labels.items()) <= set(counter_labels))
+
+    def histogram(self, name, **labels):
+        """The Histogram for exactly these labels, or None"""
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def record_call(self, endpoint, status, latency, attempt=0, units=0,
+                    request_bytes=0, response_bytes=0, wait=0.0):
+        """
+        Record one attempt of one API call
+        Args: endpoint - e.g. 'playlistItems.insert' or 'batch', status - HTTP status
+              or 'network', latency - seconds on the wire, attempt - 0 for the first try,
+              units - quota units charged, request/response_bytes - payload sizes,
+              wait - seconds spent waiting for the rate limiter first
+        """
+        status = str(status)
+        self.inc('api_calls_total', endpoint=endpoint, status=status)
+        if attempt:
+            self.inc('api_retries_total', endpoint=endpoint)
+        self.inc('quota_units_total', units, endpoint=endpoint)
+        self.inc('request_bytes_total', request_bytes, endpoint=endpoint)
+        self.inc('response_bytes_total', response_bytes, endpoint=endpoint)
+        self.inc('rate_limit_wait_seconds_total', wait)
+        self.observe('api_latency_seconds', latency, endpoint=endpoint)
+        self.emit('api_call', endpoint=endpoint, status=status, latency=latency, attempt=attempt,
+                  units=units, request_bytes=request_bytes, response_bytes=response_bytes, wait=wait)
+
+    # === Tracing ===
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Time a job phase (fetch, shuffle, create, insert...) as an OpenTelemetry-style span
+        Spans opened inside another one on the same thread become its children.
+        Yields: the span dictionary; add to span['attributes'] while it runs
+        """
+        stack = self._local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        span = {
+            'name': name,
+            'trace_id': parent['trace_id'] if parent else secrets.token_hex(16),
+            'span_id': secrets.token_hex(8),
+            'parent_id': parent['span_id'] if parent else None,
+            'start': time.time(),
+            'attributes': attributes,
+            'status': 'ok'
+        }
+        stack.append(span)
+        self.emit('span_start', **span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span['status'] = 'error'
+            span['error'] = str(e)
+            raise
+        finally:
+            stack.pop()
+            span['duration'] = time.perf_counter() - start
+            span['end'] = span['start'] + span['duration']
+            self.observe('phase_seconds', span['duration'], phase=name)
+            with self._lock:
+                self.spans.append(span)
+            self.emit('span_end', **span)
+
+    # === Export ===
+    def snapshot(self):
+        """All counters, histograms and recent spans as plain JSON-ready data"""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum,
+                           'p50': h.percentile(0.5), 'p95': h.percentile(0.95), 'p99': h.percentile(0.99),
+                           'buckets': dict(zip([str(b) for b in h.buckets] + ['+Inf'], h.counts))}
+                          for (name, labels), h in sorted(self._histograms.items())]
+            spans = list(self.spans)
+        return {'counters': counters, 'histograms': histograms, 'spans': spans}
+
+    def merge(self, snapshot, **labels):
+        """
+        Add another Metrics' snapshot() (e.g. from a worker process) to this one
+        Args: labels - added to every merged series, e.g. account='work'
+        """
+        extra = tuple(labels.items())
+        with self._lock:
+            for counter in snapshot['counters']:
+                key = (counter['name'], tuple(sorted(tuple(counter['labels'].items()) + extra)))
+                self._counters[key] = self._counters.get(key, 0) + counter['value']
+            for data in snapshot['histograms']:
+                key = (data['name'], tuple(sorted(tuple(data['labels'].items()) + extra)))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    bounds = [float(bound) for bound in data['buckets'] if bound != '+Inf']
+                    histogram = self._histograms[key] = Histogram(bounds)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, data['buckets'].values())]
+                histogram.count += data['count']
+                histogram.sum += data['sum']
+            self.spans.extend(dict(span, **labels) for span in snapshot['spans'])
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, default=str)
+
+    def to_prometheus(self):
+        """Counters and histograms in the Prometheus text exposition format"""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{str(value)}"' for key, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} counter")
+                    typed.add(name)
+                lines.append(f"{PREFIX}{name}{label_text(labels)} {value:g}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                    lines.append(f"{PREFIX}{name}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{label_text(labels)} {h.sum:g}")
+                lines.append(f"{PREFIX}{name}_count{label_text(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Export to a file: Prometheus text for *.prom / *.txt, JSON otherwise"""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
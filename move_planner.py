@@ -0,0 +1,78 @@
+import bisect
+import random
+
+
+def longest_increasing_subsequence(sequence):
+    """
+    Find one longest strictly increasing subsequence in O(n log n) (patience sorting)
+    Args: sequence - list of comparable values
+    Returns: list of indexes into sequence, in order
+    """
+    tails = []                      # tails[k] = smallest tail value of an increasing run of length k+1
+    tail_indexes = []               # index in sequence of that tail
+    previous = [-1] * len(sequence) # back-pointers to rebuild the run
+
+    for i, value in enumerate(sequence):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_indexes.append(i)
+        else:
+            tails[k] = value
+            tail_indexes[k] = i
+        previous[i] = tail_indexes[k - 1] if k > 0 else -1
+
+    # Walk the back-pointers from the end of the longest run
+    result = []
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i != -1:
+        result.append(i)
+        i = previous[i]
+    return result[::-1]
+
+
+def plan_moves(current, target):
+    """
+    Compute the fewest single-item moves that turn current into target
+    Items on a longest increasing subsequence (in target order) stay put;
+    every other item is moved once, right after its target predecessor.
+    Args: current - list of unique item IDs in playlist order,
+          target - the same IDs in the wanted order
+    Returns: list of (item_id, position) moves, to be applied in order, where
+             position is the item's index once the move is done
+    """
+    if sorted(current) != sorted(target):
+        raise ValueError("current and target must contain the same items")
+
+    target_index = {item: i for i, item in enumerate(target)}
+    ranks = [target_index[item] for item in current]
+    keep = {current[i] for i in longest_increasing_subsequence(ranks)}
+
+    order = list(current)   # Simulated playlist as the moves are applied
+    moves = []
+    for i, item in enumerate(target):
+        if item in keep:
+            continue
+        # Everything before item in target is already in place, so slot it in after its predecessor
+        order.remove(item)
+        position = order.index(target[i - 1]) + 1 if i > 0 else 0
+        order.insert(position, item)
+        moves.append((item, position))
+    return moves
+
+
+def partial_shuffle(items, max_moves):
+    """
+    Shuffle by relocating at most max_moves randomly chosen items
+    A full random shuffle keeps only about 2*sqrt(n) items in place, so an
+    in-place reshuffle of it costs nearly one update per item; this bounds
+    the cost instead.
+    Returns: new list
+    """
+    result = list(items)
+    chosen = set(random.sample(range(len(result)), min(max_moves, len(result))))
+    moving = [item for i, item in enumerate(result) if i in chosen]
+    result = [item for i, item in enumerate(result) if i not in chosen]
+    for item in moving:
+        result.insert(random.randint(0, len(result)), item)
+    return result
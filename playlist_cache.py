@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = 'playlist_cache.sqlite3'
+
+
+class PlaylistCache:
+    """
+    On-disk cache of playlist contents, stored page by page with each page's ETag
+    Cached pages are revalidated with If-None-Match, so an unchanged page costs a
+    304 instead of a full download. The least recently used playlists are
+    evicted once more than max_playlists are stored.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_playlists=100):
+        self.max_playlists = max_playlists
+        self._lock = threading.Lock()   # The GUI calls us from worker threads
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS playlists (
+                    playlist_id TEXT PRIMARY KEY,
+                    item_count INTEGER,
+                    last_used REAL
+                );
+                CREATE TABLE IF NOT EXISTS pages (
+                    playlist_id TEXT,
+                    page_index INTEGER,
+                    page_token TEXT,
+                    etag TEXT,
+                    next_page_token TEXT,
+                    videos TEXT,
+                    PRIMARY KEY (playlist_id, page_index)
+                );
+            """)
+
+    def get_pages(self, playlist_id, item_count=None):
+        """
+        Return the cached pages of a playlist, in order
+        Args: playlist_id - YouTube playlist ID,
+              item_count - current contentDetails.itemCount if known; a mismatch
+                           means the playlist changed and the entry is dropped
+        Returns: list of page dictionaries (empty if nothing usable is cached)
+        """
+        with self._lock:
+            row = self._db.execute("SELECT item_count FROM playlists WHERE playlist_id = ?",
+                                   (playlist_id,)).fetchone()
+            if row is None:
+                return []
+            if item_count is not None and row[0] != item_count:
+                with self._db:      # Commit, or the deletes linger in an open transaction
+                    self._delete(playlist_id)
+                return []
+
+            with self._db:
+                self._db.execute("UPDATE playlists SET last_used = ? WHERE playlist_id = ?",
+                                 (time.time(), playlist_id))
+            rows = self._db.execute(
+                "SELECT page_token, etag, next_page_token, videos FROM pages "
+                "WHERE playlist_id = ? ORDER BY page_index", (playlist_id,)).fetchall()
+
+        return [{
+            'page_token': page_token,
+            'etag': etag,
+            'next_page_token': next_page_token,
+            'videos': json.loads(videos)
+        } for page_token, etag, next_page_token, videos in rows]
+
+    def store(self, playlist_id, pages):
+        """
+        Replace the cached pages of a playlist
+        Args: pages - list of page dictionaries as returned by get_pages
+        """
+        item_count = sum(len(page['videos']) for page in pages)
+        with self._lock, self._db:
+            self._delete(playlist_id)
+            self._db.execute("INSERT INTO playlists VALUES (?, ?, ?)",
+                             (playlist_id, item_count, time.time()))
+            self._db.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)", [
+                (playlist_id, index, page['page_token'], page['etag'],
+                 page['next_page_token'], json.dumps(page['videos']))
+                for index, page in enumerate(pages)
+            ])
+            self._evict()
+
+    def invalidate(self, playlist_id):
+        """Forget a playlist, e.g. after we changed it ourselves"""
+        with self._lock, self._db:
+            self._delete(playlist_id)
+
+    def close(self):
+        self._db.close()
+
+    def _delete(self, playlist_id):
+        self._db.execute("DELETE FROM pages WHERE playlist_id = ?", (playlist_id,))
+        self._db.execute("DELETE FROM playlists WHERE playlist_id = ?", (playlist_id,))
+
+    def _evict(self):
+        """Drop least recently used playlists beyond max_playlists"""
+        stale = self._db.execute(
+            "SELECT playlist_id FROM playlists ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+            (self.max_playlists,)).fetchall()
+        for (playlist_id,) in stale:
+            self._delete(playlist_id)
@@ -1,96 +1,366 @@
+import bisect
 import random
-from googleapiclient.errors import HttpError
+import threading
 import time
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import google_auth_httplib2
+import httplib2
+from googleapiclient.errors import HttpError
+from request_executor import (RequestExecutor, NETWORK_ERRORS, classify_error, error_reason, error_status,
+                              QUOTA, FATAL, RETRY, THROTTLE)
+from metrics import Metrics, traced
+from move_planner import plan_moves, partial_shuffle
+from quota import QUOTA_COSTS
+from video_store import VideoStore
+from playlist_snapshot import save_snapshot
+from video_metadata import metadata_from_resource, MISSING_VIDEO
+
+
+class PlaylistFetchError(Exception):
+    """
+    A playlist page could not be fetched
+    page_token is the token to pass back to iter_playlist_pages to resume
+    """
+    def __init__(self, playlist_id, page_index, page_token, error):
+        super().__init__(f"page {page_index} of playlist {playlist_id} failed: {error}")
+        self.playlist_id = playlist_id
+        self.page_index = page_index
+        self.page_token = page_token
+        self.error = error
+
+
+class OperationCancelled(Exception):
+    """
+    A long operation was stopped through its cancel event
+    added_count is what add_videos_to_playlist confirmed before stopping.
+    """
+    def __init__(self, added_count=0):
+        super().__init__(f"cancelled after {added_count} videos were added")
+        self.added_count = added_count
+
 
 class PlaylistManager:
     """
     Manages YouTube playlist operations: fetching, shuffling, creating
     """
-    def __init__(self, youtube_service):
+    def __init__(self, youtube_service, executor=None, cache=None, playlists_ttl=300,
+                 metadata_cache=None, session=None):
         # Store the authenticated YouTube API service
         self.youtube = youtube_service
+        # Every request.execute() goes through this (rate limiting + retries)
+        self.executor = executor or RequestExecutor()
+        # Counters, spans and event hooks (subscribe here instead of reading printed text)
+        self.metrics = getattr(self.executor, 'metrics', None) or Metrics()
+        # Optional PlaylistCache so repeated fetches can be answered with 304s
+        self.cache = cache
+        # Optional VideoMetadataCache shared by every playlist for enrich_videos
+        self.metadata_cache = metadata_cache
+        # Optional YouTubeSession; when given its per-thread Http objects are used
+        self.session = session
+        self._local = threading.local()     # Per-thread Http objects for batch workers
+        # Short-lived in-memory cache of the playlist listing and per-playlist details
+        self.playlists_ttl = playlists_ttl
+        self._playlists_listing = (0.0, None)
+        self._details = {}                  # playlist_id -> (stored_at, details)
+        self._listing_lock = threading.Lock()
 
-    def get_user_playlists(self):
+    @traced('list')
+    def get_user_playlists(self, refresh=False):
         """
         Fetch all playlists owned by the authenticated user
+        Args: refresh - ignore the cached listing (kept for playlists_ttl seconds)
         Returns: List of dictionaries with playlist info
+
+        Pages are fetched one after another - each needs the previous page's
+        token - but every page holds 50 playlists and costs 1 unit.
         """
-        try:
-            # API call to get user's playlists
-            request = self.youtube.playlists().list(
-                part="snippet,contentDetails",  # What data to include
-                mine=True,                      # Only user's playlists
-                maxResults=50                   # Maximum playlists to fetch
-            )
-            response = request.execute()
-
-            # Process the response into a cleaner format
-            playlists = []
-            for item in response['items']:
-                playlists.append({
-                    'id': item['id'],                                      # Playlist ID for API calls
-                    'title': item['snippet']['title'],                     # Display name
-                    'video_count': item['contentDetails']['itemCount']     # Number of videos
-                })
-            return playlists
-        
-        except HttpError as e:
-            # Handle API errores gracefully
-            print(f"Error fetching playlists: {e}")
-            return[]
-        
-    def get_playlist_videos(self, playlist_id):
-        """
-        Get all videos from a specific playlist
-        Args: playlist_id - YouTube playlist ID
-        Returns: List of video dictionaries
-        """
-        videos = []
-        next_page_token = None  # For pagination (playlists can have 100+ videos)
+        with self._listing_lock:
+            cached_at, cached = self._playlists_listing
+            if cached is not None and not refresh and time.monotonic() - cached_at < self.playlists_ttl:
+                return list(cached)
 
+        playlists = []
+        next_page_token = None
         try:
-            # Keep fetching until we get all videos
             while True:
-                request = self.youtube.playlistItems().list(
-                    part="snippet",
-                    playlistId=playlist_id,
-                    maxResults=50,               # Max per request
-                    pageToken=next_page_token   # For next page of results
+                # API call to get user's playlists
+                request = self.youtube.playlists().list(
+                    part="snippet,contentDetails",  # What data to include
+                    mine=True,                      # Only user's playlists
+                    maxResults=50,                  # Maximum playlists per page
+                    pageToken=next_page_token
                 )
-                response = request.execute()
+                response = self.executor.execute(request, http=self._thread_http())
 
-                # Extract video information from each item
+                # Process the response into a cleaner format
                 for item in response['items']:
-                    videos.append({
-                        'video_id': item['snippet']['resourceId']['videoId'],   # Unique video ID
-                        'title': item['snippet']['title']                       # Video title
+                    playlists.append({
+                        'id': item['id'],                                      # Playlist ID for API calls
+                        'title': item['snippet']['title'],                     # Display name
+                        'video_count': item['contentDetails']['itemCount'],    # Number of videos
+                        'etag': item.get('etag')                               # Changes when the playlist does
                     })
 
-                # Check if there are more pages
                 next_page_token = response.get('nextPageToken')
                 if not next_page_token:
-                    break   # No more pages, exit loop
+                    break
 
-        except HttpError as e:
-            print(f"Error fetching videos: {e}")
+        except (HttpError,) + NETWORK_ERRORS as e:
+            # Handle API errores gracefully; a partial listing is returned but not cached
+            self._log(f"Error fetching playlists: {e}")
+            if playlists:
+                self._log(f"Warning: playlist list is incomplete ({len(playlists)} loaded)")
+            return playlists
+
+        with self._listing_lock:
+            self._playlists_listing = (time.monotonic(), playlists)
+        return list(playlists)
+
+    def get_playlist_details(self, playlist_ids, max_workers=4):
+        """
+        Fetch extra metadata for playlists, 50 IDs per call, calls in parallel
+        Results are cached for playlists_ttl seconds, so asking again (e.g.
+        every time the GUI dropdown opens) is free.
+        Args: playlist_ids - IDs to describe
+        Returns: dictionary playlist_id -> {'item_count', 'etag', 'privacy_status',
+                 'published_at'}; YouTube does not expose a last-modified time,
+                 a changed etag is the signal that a playlist changed
+        """
+        now = time.monotonic()
+        with self._listing_lock:
+            details = {pid: entry for pid, (stored_at, entry) in self._details.items()
+                       if pid in playlist_ids and now - stored_at < self.playlists_ttl}
+        missing = [pid for pid in dict.fromkeys(playlist_ids) if pid not in details]
+        chunks = [missing[i:i + 50] for i in range(0, len(missing), 50)]
+
+        def fetch(chunk):
+            request = self.youtube.playlists().list(
+                part="contentDetails,status,snippet",
+                id=",".join(chunk),
+                maxResults=50
+            )
+            return self.executor.execute(request, http=self._thread_http())['items']
+
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+                for items in pool.map(fetch, chunks):
+                    for item in items:
+                        entry = {
+                            'item_count': item['contentDetails']['itemCount'],
+                            'etag': item.get('etag'),
+                            'privacy_status': item.get('status', {}).get('privacyStatus'),
+                            'published_at': item['snippet'].get('publishedAt')
+                        }
+                        details[item['id']] = entry
+                        with self._listing_lock:
+                            self._details[item['id']] = (time.monotonic(), entry)
+        return details
+
+    @traced('fetch')
+    def get_playlist_videos(self, playlist_id, item_count=None):
+        """
+        Get all videos from a specific playlist
+        Args: playlist_id - YouTube playlist ID,
+              item_count - itemCount from get_user_playlists; lets the cache
+                           throw away a stale entry without asking the API
+        Returns: List of video dictionaries (what was fetched so far if a page fails)
+        """
+        videos = []
+        try:
+            for page in self.iter_playlist_pages(playlist_id, item_count):
+                videos.extend(page['videos'])
+        except PlaylistFetchError as e:
+            self._log(f"Error fetching videos: {e}")
 
         return videos
+
+    def iter_playlist_videos(self, playlist_id, item_count=None, page_token=None, page_index=0):
+        """
+        Yield the videos of a playlist one at a time, as pages arrive
+        Args: same as iter_playlist_pages
+        Raises: PlaylistFetchError - carries the page token to resume from
+        """
+        for page in self.iter_playlist_pages(playlist_id, item_count, page_token, page_index):
+            yield from page['videos']
+
+    def iter_playlist_pages(self, playlist_id, item_count=None, page_token=None, page_index=0):
+        """
+        Yield a playlist page by page (50 videos each) while the next page is fetched
+        Args: playlist_id - YouTube playlist ID, item_count - see get_playlist_videos,
+              page_token/page_index - resume from this page (PlaylistFetchError.page_token
+                                      and .page_index), so page indexes stay absolute
+        Yields: dictionaries with 'page_index', 'page_token', 'next_page_token', 'videos'
+        Raises: PlaylistFetchError if a page cannot be fetched
+
+        Only the current and the next page are held in memory. When a cache is
+        set a full pass from the first page is kept and stored at the end.
+        """
+        cached_pages = {}
+        if self.cache:
+            cached_pages = {page['page_token']: page
+                            for page in self.cache.get_pages(playlist_id, item_count)}
+        pages = [] if self.cache and page_token is None else None
+
+        # One background worker fetches page N+1 while the caller handles page N
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            future = prefetcher.submit(self._fetch_page, playlist_id, page_token,
+                                       cached_pages.get(page_token))
+            while future is not None:
+                try:
+                    page = future.result()
+                except (HttpError,) + NETWORK_ERRORS as e:
+                    raise PlaylistFetchError(playlist_id, page_index, page_token, e) from e
+
+                # Check if there are more pages, and start on the next one straight away
+                page_token = page['next_page_token']
+                future = None
+                if page_token:
+                    future = prefetcher.submit(self._fetch_page, playlist_id, page_token,
+                                               cached_pages.get(page_token))
+
+                if pages is not None:
+                    pages.append(page)
+                self.metrics.emit('page_fetched', playlist_id=playlist_id, page_index=page_index,
+                                  count=len(page['videos']))
+                yield dict(page, page_index=page_index)
+                page_index += 1
+
+        if pages is not None:
+            self.cache.store(playlist_id, pages)
+
+    def _fetch_page(self, playlist_id, page_token, cached=None):
+        """
+        Fetch one page of playlistItems, revalidating a cached copy if given
+        Returns: page dictionary ('page_token', 'etag', 'next_page_token', 'videos')
+        """
+        request = self.youtube.playlistItems().list(
+            part="snippet",
+            playlistId=playlist_id,
+            maxResults=50,          # Max per request
+            pageToken=page_token    # For next page of results
+        )
+        if cached:
+            # Revalidate the cached copy of this page instead of downloading it again
+            request.headers['If-None-Match'] = cached['etag']
+
+        try:
+            response = self.executor.execute(request, http=self._thread_http())
+        except HttpError as e:
+            if cached and error_status(e) == 304:
+                return cached   # 304 Not Modified - the cached page is still good
+            raise
+
+        return {
+            'page_token': page_token,
+            'etag': response.get('etag'),
+            'next_page_token': response.get('nextPageToken'),
+            # Extract video information from each item
+            'videos': [{
+                'video_id': item['snippet']['resourceId']['videoId'],   # Unique video ID
+                'title': item['snippet']['title'],                      # Video title
+                'item_id': item['id']                                   # Playlist item ID (for updates)
+            } for item in response['items']]
+        }
     
     # How to verify this works:
     # The test script below will show if these methods work correctly
 
-    def shuffle_videos(self, videos):
+    @traced('enrich')
+    def enrich_videos(self, videos, max_workers=4):
         """
-        Randomize the order of videos in a playlist
+        Add duration, channel and availability to video dictionaries
+        Asks videos().list for 50 IDs per call (1 quota unit), several calls at
+        once, and only for IDs the shared metadata cache does not already know.
         Args: videos - list of video dictionaries
+        Returns: new list of dictionaries with the fields of
+                 video_metadata.metadata_from_resource added ('available' is
+                 False for deleted, rejected and other people's private videos)
+        """
+        video_ids = list(dict.fromkeys(v['video_id'] for v in videos))
+        metadata = self.metadata_cache.get_many(video_ids) if self.metadata_cache else {}
+        missing = [video_id for video_id in video_ids if video_id not in metadata]
+        chunks = [missing[i:i + 50] for i in range(0, len(missing), 50)]
+
+        def fetch(chunk):
+            request = self.youtube.videos().list(
+                part="snippet,contentDetails,status",
+                id=",".join(chunk),
+                maxResults=50
+            )
+            response = self.executor.execute(request, http=self._thread_http())
+            found = {item['id']: metadata_from_resource(item) for item in response['items']}
+            # IDs the API does not return are deleted (or otherwise gone)
+            return {video_id: found.get(video_id, MISSING_VIDEO) for video_id in chunk}
+
+        if chunks:
+            fetched = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+                for chunk_metadata in pool.map(fetch, chunks):
+                    fetched.update(chunk_metadata)
+            if self.metadata_cache:
+                self.metadata_cache.store_many(fetched)
+            metadata.update(fetched)
+
+        return [dict(video, **metadata[video['video_id']]) for video in videos]
+
+    @traced('fetch')
+    def get_playlist_store(self, playlist_id, item_count=None):
+        """
+        Like get_playlist_videos, but into a compact VideoStore
+        Use for very large or merged playlists. Raises PlaylistFetchError.
+        """
+        store = VideoStore()
+        for page in self.iter_playlist_pages(playlist_id, item_count):
+            store.extend(page['videos'])
+        return store
+
+    @traced('fetch')
+    def export_snapshot(self, playlist_id, path, item_count=None, title=None):
+        """
+        Fetch a playlist and save it with its page ETags (see playlist_snapshot)
+        Args: path - *.jsonl for JSON Lines, anything else for the binary format,
+              item_count - see get_playlist_videos, title - stored in the header
+        Returns: number of videos saved
+        Raises: PlaylistFetchError - nothing is written for a partial playlist
+        """
+        fetched_at = time.time()
+        pages = list(self.iter_playlist_pages(playlist_id, item_count))
+        videos = [video for page in pages for video in page['videos']]
+        return save_snapshot(path, videos, playlist_id, title, pages, fetched_at)
+
+    @traced('shuffle')
+    def shuffle_videos(self, videos, strategy=None, seed=None, **options):
+        """
+        Randomize the order of videos in a playlist
+        Args: videos - list of video dictionaries, or a VideoStore (which keeps no
+                       metadata: strategies that need it raise ValueError),
+              strategy - optional name from shuffle_strategies.STRATEGIES
+                         ('random', 'weighted', 'recency', 'avoid_previous',
+                         'channel_spread'), seed - makes the order reproducible,
+              options - passed to the strategy (e.g. k=3 for channel_spread)
         Returns: new list with videos in random order
+                 (a VideoView - just a shuffled index array - for a VideoStore)
         """
+        if strategy is not None or seed is not None:
+            # NumPy is only needed for strategy shuffles, so import it on demand
+            from shuffle_strategies import build_permutation
+            if isinstance(videos, VideoStore):
+                order = build_permutation(videos.view(), strategy or 'random', seed, **options)
+                return videos.view(array('L', order.tolist()))
+            order = build_permutation(videos, strategy or 'random', seed, **options)
+            return [videos[i] for i in order]
+
+        if isinstance(videos, VideoStore):
+            return videos.shuffled()
         shuffled = videos.copy() # Create copy to avoid modifying original
         random.shuffle(shuffled) # Randomize order in-place
         return shuffled
     
         # How to verify: Check that returned list has same videos but different order
 
+    @traced('create')
     def create_new_playlist(self, title, description=""):
         """
         Create a new empty playlist on YouTube
@@ -111,67 +381,511 @@ class PlaylistManager:
                     }
                 }
             )
-            response = request.execute()
+            response = self.executor.execute(request, http=self._thread_http())
+            self._playlists_listing = (0.0, None)  # The cached listing is missing the new one
             return response['id'] # Return the new playlist's ID
         
         except HttpError as e:
-            print(f"Error creating playlist: {e}")
+            self._log(f"Error creating playlist: {e}")
+            return None
+        except NETWORK_ERRORS as e:
+            # Not retried: the playlist may have been created before the connection broke
+            self._log(f"Connection lost while creating playlist (it may exist anyway): {e}")
             return None
         
         # How to verify: Check your YouTube account - new playlist should appear
 
-    def add_videos_to_playlist(self, playlist_id, video_ids, max_retries=3):
+    @traced('insert')
+    def add_videos_to_playlist(self, playlist_id, video_ids, max_retries=3,
+                               batch_size=50, max_workers=1, positions=None, on_inserted=None,
+                               cancel=None, existing=None):
         """
         Add multiple videos to an existing playlist
-        Args: playlist_id - target playlist ID, video_ids - list of video IDs to add
+        Args: playlist_id - target playlist ID, video_ids - list of video IDs to add,
+              batch_size - inserts sent per HTTP round trip (YouTube allows up to 50),
+              max_workers - number of batches in flight at once (see below),
+              positions - final playlist position of each video once all of them
+                          are in, the slots not listed being taken by videos
+                          already there; default None appends them to the end
+                          (a retried video lands after the others),
+              on_inserted - called from worker threads with the positions of
+                            each batch's confirmed inserts (indexes into video_ids
+                            when positions is None),
+              cancel - optional threading.Event; once set no new batch is sent,
+              existing - video IDs the playlist held before this call (see below)
         Returns: tuple (successful_count, failed_videos)
+        Raises: OperationCancelled when cancel is set, after the batches
+                already in flight have finished (and reached on_inserted)
+
+        Batches are sent one at a time in ascending position order. Each insert
+        is sent with its rank among the slots filled so far, so a video that
+        cannot be added leaves no hole for the later positions to point past;
+        with existing given, inserts at the end are sent as appends. max_workers > 1 sends batches
+        concurrently and breaks the order (a later batch can land first); it
+        also saves little time, as the rate limiter charges each batch for all
+        its inserts. The API does not promise to apply the parts of one batch
+        in order either: call ensure_order afterwards when the exact order matters.
+
+        An insert that got no answer (dropped connection) may still have been
+        carried out. With existing given, the playlist is listed again and only
+        the videos that are not in it are sent again; without it, or if the
+        listing fails, they are reported in failed_videos instead.
         """
         added_count = 0
         failed_videos = []
+        if self.cache:
+            self.cache.invalidate(playlist_id)     # Whatever was cached is about to change
+        slots = positions if positions is not None else list(range(len(video_ids)))
+        errors = {}                                 # index -> last error seen
+        confirmed = []                              # indexes known to be in the playlist
+        pending = sorted(range(len(video_ids)), key=slots.__getitem__)  # indexes into video_ids still to insert
+        unfilled = sorted(slots)                    # slots not confirmed yet, shared by the workers
+        unfilled_lock = threading.Lock()
 
-        for i, video_id in enumerate(video_ids):
-            success = False
-        
-            # Try adding each video with retries
-            for attempt in range(max_retries):
-                try:
-                    request = self.youtube.playlistItems().insert(
-                        part="snippet",
-                        body={
-                            "snippet": {
-                                "playlistId": playlist_id,
-                                "resourceId": {
-                                    "kind": "youtube#video",
-                                    "videoId": video_id
-                                }
-                            }
-                        }
-                    )
-                    request.execute()
-                    added_count += 1
-                    success = True
-                    print(f"Added video {i+1}/{len(video_ids)}")
-                    break  # Success, no need to retry
-                
-                except HttpError as e:
-                    error_code = e.resp.status if hasattr(e, 'resp') else 'unknown'
-                    print(f"Attempt {attempt+1}/{max_retries} failed for video {i+1}: {error_code}")
-                
-                    if attempt < max_retries - 1:  # Not the last attempt
-                        time.sleep(1)  # Wait 1 second before retry
+        def fill(indexes):
+            with unfilled_lock:
+                for index in indexes:
+                    del unfilled[bisect.bisect_left(unfilled, slots[index])]
+
+        def run_batch(indexes):
+            if cancel is not None and cancel.is_set():
+                return {}   # Never sent; left for a resume
+            sent_positions = None
+            if positions is not None:
+                sent_positions = {}
+                with unfilled_lock:
+                    # Items surely in the playlist now (unknown without existing)
+                    filled = len(existing) + len(slots) - len(unfilled) if existing is not None else None
+                    for k, index in enumerate(indexes):
+                        below = slots[index] - bisect.bisect_left(unfilled, slots[index])   # Filled slots below
+                        # Nothing known above it: append, which is never out of range even if
+                        # an earlier part of this batch fails. Otherwise count those parts in
+                        sent_positions[index] = below + k if filled is None or below < filled else None
+            batch_errors = self._insert_batch(playlist_id, video_ids, sent_positions, indexes)
+            fill([i for i, error in batch_errors.items() if error is None])
+            inserted = [slots[i] for i, error in batch_errors.items() if error is None]
+            if on_inserted:
+                on_inserted(inserted)
+            self.metrics.emit('inserted', playlist_id=playlist_id, count=len(inserted), total=len(video_ids))
+            return batch_errors
+
+        for attempt in range(max_retries):
+            if not pending:
+                break
+
+            # Split what is left into batches and send them through the worker pool
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+                results = list(pool.map(run_batch, batches))
+
+            pending = []
+            unanswered = []
+            for batch_errors in results:
+                for index, error in batch_errors.items():
+                    if error is None:
+                        confirmed.append(index)
                     else:
-                        # All retries failed
-                        failed_videos.append({
-                            'video_id': video_id,
-                            'error': str(e),
-                            'position': i+1
-                        })
-                        print(f"Failed to add video {i+1} after {max_retries} attempts")
-        
-            # Small delay between videos to avoid rate limits
-            if success:
-                time.sleep(0.1)  # 100ms delay
-    
+                        errors[index] = error
+                        # A network error leaves the outcome unknown; a 5xx means nothing was written
+                        (unanswered if isinstance(error, NETWORK_ERRORS) else pending).append(index)
+
+            if unanswered:
+                landed = self._find_landed(playlist_id, video_ids, unanswered, confirmed, existing)
+                if landed is None:
+                    for index in unanswered:
+                        self._record_failure(failed_videos, video_ids[index], slots[index],
+                                             f"no answer, it may have been added: {errors[index]}")
+                else:
+                    confirmed.extend(landed)
+                    fill(landed)
+                    if landed:
+                        if on_inserted:
+                            on_inserted([slots[i] for i in landed])
+                        self.metrics.emit('inserted', playlist_id=playlist_id, count=len(landed),
+                                          total=len(video_ids))
+                    landed = set(landed)
+                    pending.extend(index for index in unanswered if index not in landed)
+                    pending.sort(key=slots.__getitem__)
+            added_count = len(confirmed)
+
+            self._log(f"Added {added_count}/{len(video_ids)} videos")
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled(added_count)
+            if not pending:
+                break
+
+            # Drop items that can never succeed instead of retrying them; a position past the
+            # end (an earlier part of its batch failed) is worked out again next round
+            kinds = {index: RETRY if error_reason(errors[index]) == 'invalidPlaylistItemPosition'
+                     else classify_error(errors[index]) for index in pending}
+            if QUOTA in kinds.values():
+                self._quota_exceeded()
+                break
+            for index in pending:
+                if kinds[index] == FATAL:
+                    self._record_failure(failed_videos, video_ids[index], slots[index], errors[index])
+            pending = [index for index in pending if kinds[index] != FATAL]
+
+            if pending:
+                self._log(f"Attempt {attempt+1}/{max_retries}: {len(pending)} videos failed")
+                if attempt < max_retries - 1:   # Not the last attempt
+                    # Back off once per round; a throttled item slows the rate limiter
+                    throttled = [i for i in pending if kinds[i] == THROTTLE]
+                    self.executor.backoff(attempt, errors[(throttled or pending)[0]])
+
+        # Everything still pending failed on every attempt
+        for index in pending:
+            self._record_failure(failed_videos, video_ids[index], slots[index], errors.get(index))
+        failed_videos.sort(key=lambda failure: failure['position'])
+
         return added_count, failed_videos
-    
-        # How to verify: Check the target playlist - should contain the added videos
\ No newline at end of file
+
+        # How to verify: Check the target playlist - should contain the added videos
+
+    @traced('reshuffle')
+    def reshuffle_in_place(self, playlist_id, target_videos=None, max_moves=None):
+        """
+        Reorder an existing playlist instead of building a new one
+        Only items off the longest increasing subsequence are moved, with one
+        playlistItems().update each, so the playlist keeps its ID and links.
+        Args: playlist_id - playlist to reorder,
+              target_videos - wanted order (video dictionaries from get_playlist_videos);
+                              default is a random shuffle,
+              max_moves - when shuffling, relocate at most this many items
+        Returns: tuple (moved_count, failed_moves)
+        Raises: PlaylistFetchError if the playlist cannot be read completely
+                (moves planned from part of it would scramble the rest)
+
+        A full random shuffle still moves almost every item (about 2*sqrt(n)
+        stay put); use max_moves or a close-to-current target to save quota.
+        Moves build on each other, so the first one that fails ends the reshuffle.
+        """
+        videos = self._list_playlist(playlist_id)
+        if target_videos is None:
+            target_videos = (partial_shuffle(videos, max_moves) if max_moves is not None
+                             else self.shuffle_videos(videos))
+        return self._move_items(playlist_id, videos, target_videos)
+
+    def ensure_order(self, playlist_id, video_ids):
+        """
+        Check that a playlist holds its videos in the order of video_ids and move any that are not
+        Explicit insert positions alone do not guarantee the final order: the
+        API may apply the parts of a batch in any order.
+        Args: playlist_id - playlist to check, video_ids - wanted order (videos in
+              the playlist but not in video_ids are kept after them)
+        Returns: tuple (moved_count, failed_moves) as reshuffle_in_place
+        Raises: PlaylistFetchError if the playlist cannot be read completely
+        """
+        videos = self._list_playlist(playlist_id)
+        wanted = {}                 # video_id -> its indexes in video_ids, for duplicates
+        for index, video_id in enumerate(video_ids):
+            wanted.setdefault(video_id, []).append(index)
+        ranks = {}
+        for position, video in enumerate(videos):
+            indexes = wanted.get(video['video_id'])
+            ranks[video['item_id']] = indexes.pop(0) if indexes else len(video_ids) + position
+        target_videos = sorted(videos, key=lambda video: ranks[video['item_id']])
+        if target_videos == videos:
+            return 0, []
+        return self._move_items(playlist_id, videos, target_videos)
+
+    def _move_items(self, playlist_id, videos, target_videos):
+        """
+        Reorder a playlist from videos (its current items) to target_videos with the fewest updates
+        Returns: tuple (moved_count, failed_moves) - failed_moves holds at most the one
+                 move that failed; the planned positions of later moves depend on it
+        """
+        by_item = {video['item_id']: video for video in videos}
+        moves = plan_moves([v['item_id'] for v in videos], [v['item_id'] for v in target_videos])
+        self._log(f"Reordering needs {len(moves)} moves for {len(videos)} videos")
+
+        moved_count = 0
+        failed_moves = []
+        for done, (item_id, position) in enumerate(moves):
+            # Moves build on each other, so they go one at a time in order
+            request = self.youtube.playlistItems().update(
+                part="snippet",
+                body={
+                    "id": item_id,
+                    "snippet": {
+                        "playlistId": playlist_id,
+                        "position": position,
+                        "resourceId": {
+                            "kind": "youtube#video",
+                            "videoId": by_item[item_id]['video_id']
+                        }
+                    }
+                }
+            )
+            try:
+                self.executor.execute(request, http=self._thread_http())
+                moved_count += 1
+            except (HttpError,) + NETWORK_ERRORS as e:
+                failed_moves.append({'video_id': by_item[item_id]['video_id'],
+                                     'error': str(e), 'position': position+1})
+                self._log(f"Failed to move video to position {position+1}: {e}")
+                # The executor already retried; later positions assume this move happened
+                self._log(f"Stopping with {len(moves) - done - 1} moves not attempted")
+                break
+
+        if self.cache:
+            self.cache.invalidate(playlist_id)
+        return moved_count, failed_moves
+
+    @traced('sync')
+    def sync_playlist(self, source_id, target_id, source_count=None, target_count=None,
+                      seed=None, batch_size=50, cancel=None):
+        """
+        Bring an existing shuffled copy up to date with its source
+        Only the difference is written: target items whose video left the
+        source are deleted, and new source videos are inserted at random
+        positions, so the rest of the copy keeps its order. A weekly update of
+        a few videos costs a few hundred units instead of a whole new copy.
+        Args: source_id / target_id - playlist IDs,
+              source_count / target_count - itemCount from get_user_playlists (see get_playlist_videos),
+              seed - for reproducible insert positions,
+              batch_size - deletes and inserts sent per HTTP round trip,
+              cancel - optional threading.Event, checked before the inserts start
+        Returns: tuple (added_count, removed_count, failed) - failed lists the
+                 inserts and deletes that did not go through
+        Raises: PlaylistFetchError if either playlist cannot be read completely
+                (a partial listing would delete items that are still wanted)
+
+        Videos are matched by video_id; one listed twice in the source is kept twice.
+        """
+        # Read both at once; unchanged pages are answered from the cache with 304s
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            source, target = pool.map(self._list_playlist, (source_id, target_id), (source_count, target_count))
+
+        # Keep as many copies of each video as the source has, remove the rest
+        wanted = Counter(video['video_id'] for video in source)
+        kept = Counter()
+        removals = []                       # (position, video) of target items to delete
+        for position, video in enumerate(target):
+            if kept[video['video_id']] < wanted[video['video_id']]:
+                kept[video['video_id']] += 1
+            else:
+                removals.append((position, video))
+        missing = wanted - kept
+        additions = []
+        for video in source:
+            if missing[video['video_id']]:
+                missing[video['video_id']] -= 1
+                additions.append(video['video_id'])
+        self._log(f"Sync: {len(additions)} new, {len(removals)} removed, "
+                  f"{len(target) - len(removals)} unchanged")
+
+        removed_count, failed = self._delete_items(target_id, removals, batch_size)
+        if cancel is not None and cancel.is_set():
+            raise OperationCancelled(0)
+        if not additions:
+            return 0, removed_count, failed
+
+        # Pick the final slots of the new videos among everything that stays, then
+        # insert in slot order so each position is still right when it is used
+        rng = random.Random(seed)
+        rng.shuffle(additions)
+        positions = sorted(rng.sample(range(len(target) - removed_count + len(additions)), len(additions)))
+        not_removed = {failure['position'] - 1 for failure in failed}
+        removed = {position for position, video in removals} - not_removed
+        existing = [video['video_id'] for position, video in enumerate(target) if position not in removed]
+        added_count, failed_inserts = self.add_videos_to_playlist(
+            target_id, additions, positions=positions, batch_size=batch_size, cancel=cancel,
+            existing=existing)
+        return added_count, removed_count, failed + failed_inserts
+
+    def _list_playlist(self, playlist_id, item_count=None):
+        """Every video of a playlist; unlike get_playlist_videos a failed page raises PlaylistFetchError"""
+        videos = []
+        for page in self.iter_playlist_pages(playlist_id, item_count):
+            videos.extend(page['videos'])
+        return videos
+
+    def _find_landed(self, playlist_id, video_ids, unanswered, confirmed, existing):
+        """
+        List a playlist to find which inserts that got no answer went through anyway
+        Args: unanswered/confirmed - indexes into video_ids,
+              existing - video IDs the playlist held before the inserts (None: unknown)
+        Returns: list of the unanswered indexes whose video is in the playlist,
+                 or None if that cannot be told
+        """
+        if existing is None:
+            return None
+        try:
+            videos = self._list_playlist(playlist_id)
+        except PlaylistFetchError as e:
+            self._log(f"Could not check the unanswered inserts: {e}")
+            return None
+        finally:
+            if self.cache:
+                self.cache.invalidate(playlist_id)     # More inserts may follow
+        extra = (Counter(video['video_id'] for video in videos) - Counter(existing)
+                 - Counter(video_ids[index] for index in confirmed))
+        landed = []
+        for index in unanswered:
+            if extra[video_ids[index]] > 0:
+                extra[video_ids[index]] -= 1
+                landed.append(index)
+        return landed
+
+    def _delete_items(self, playlist_id, removals, batch_size=50, max_retries=3):
+        """
+        Delete playlist items with batched playlistItems().delete calls
+        Args: removals - list of (position, video dictionary with 'item_id')
+        Returns: tuple (removed_count, failed_deletes)
+        """
+        removed_count = 0
+        failed = []
+        errors = {}                 # position -> last error seen
+        pending = list(removals)
+        for attempt in range(max_retries):
+            if not pending:
+                break
+            errors = {}
+            for start in range(0, len(pending), batch_size):
+                batch_errors = self._delete_batch(pending[start:start + batch_size])
+                # A 404 means the item is already gone, which is what we wanted
+                batch_errors = {position: error for position, error in batch_errors.items()
+                                if error is not None and error_status(error) != 404}
+                done = min(batch_size, len(pending) - start) - len(batch_errors)
+                self.metrics.emit('removed', playlist_id=playlist_id, count=done, total=len(removals))
+                errors.update(batch_errors)
+            removed_count += len(pending) - len(errors)
+            pending = [(position, video) for position, video in pending if position in errors]
+            if not pending:
+                break
+
+            # Same rules as add_videos_to_playlist: stop on quota, drop what can never work
+            kinds = {position: classify_error(errors[position]) for position, video in pending}
+            if QUOTA in kinds.values():
+                self._quota_exceeded()
+                break
+            failed.extend(self._failed_delete(position, video, errors[position])
+                          for position, video in pending if kinds[position] == FATAL)
+            pending = [(position, video) for position, video in pending if kinds[position] != FATAL]
+            if pending and attempt < max_retries - 1:
+                self._log(f"Attempt {attempt+1}/{max_retries}: {len(pending)} deletes failed")
+                self.executor.backoff(attempt, errors[pending[0][0]])
+
+        # Everything still pending failed on every attempt
+        failed.extend(self._failed_delete(position, video, errors.get(position)) for position, video in pending)
+        failed.sort(key=lambda failure: failure['position'])
+        self._log(f"Removed {removed_count}/{len(removals)} videos")
+        if self.cache:
+            self.cache.invalidate(playlist_id)
+        return removed_count, failed
+
+    def _delete_batch(self, removals):
+        """
+        Send one BatchHttpRequest with a delete for every (position, video) given
+        Returns: dictionary position -> None on success or the exception raised
+        """
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = exception
+
+        batch = self.youtube.new_batch_http_request(callback=callback)
+        for position, video in removals:
+            batch.add(self.youtube.playlistItems().delete(id=video['item_id']), request_id=str(position))
+
+        positions = [position for position, video in removals]
+        try:
+            self.executor.execute(batch, cost=len(removals), units=QUOTA_COSTS['delete'] * len(removals),
+                                  idempotent=False, http=self._thread_http())
+        except (HttpError,) + NETWORK_ERRORS as e:
+            return {position: e for position in positions}
+
+        missing = ConnectionError("No response for this item in the batch")
+        return {position: results.get(position, missing) for position in positions}
+
+    def _failed_delete(self, position, video, error):
+        """One entry of the failed list returned by sync_playlist, for a delete"""
+        self._log(f"Failed to remove video {position+1}: {error}")
+        return {'video_id': video['video_id'], 'error': str(error), 'position': position+1}
+
+    def _quota_exceeded(self):
+        """
+        A batch part said quotaExceeded: stop, and tell the ledger
+        The batch itself succeeded, so the executor never saw the error.
+        """
+        self._log("Daily quota exceeded - stopping")
+        ledger = getattr(self.executor, 'ledger', None)
+        if ledger:
+            ledger.mark_exhausted()
+
+    def _log(self, message):
+        """Print a progress message and send it to metrics hooks as a 'log' event"""
+        print(message)
+        self.metrics.emit('log', message=message)
+
+    def _record_failure(self, failed_videos, video_id, position, error):
+        """Add one entry to the failed_videos list returned by add_videos_to_playlist"""
+        failed_videos.append({
+            'video_id': video_id,
+            'error': str(error),
+            'position': position+1
+        })
+        self._log(f"Failed to add video {position+1}: {error}")
+
+    def _insert_batch(self, playlist_id, video_ids, positions, indexes):
+        """
+        Send one BatchHttpRequest with an insert for every index given
+        Args: positions - position to send for each index (None appends)
+        Returns: dictionary index -> None on success or the exception raised
+        """
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = exception
+
+        batch = self.youtube.new_batch_http_request(callback=callback)
+        for index in indexes:
+            position = positions[index] if positions is not None else None
+            batch.add(self._insert_request(playlist_id, video_ids[index], position),
+                      request_id=str(index))
+
+        try:
+            self.executor.execute(batch, cost=len(indexes), units=QUOTA_COSTS['insert'] * len(indexes),
+                                  idempotent=False, http=self._thread_http())
+        except (HttpError,) + NETWORK_ERRORS as e:
+            # The whole round trip failed: an HttpError means nothing was written,
+            # a network error that any of it may have been
+            return {index: e for index in indexes}
+
+        # Items the server never answered: outcome unknown, like a network error
+        missing = ConnectionError("No response for this item in the batch")
+        return {index: results.get(index, missing) for index in indexes}
+
+    def _insert_request(self, playlist_id, video_id, position=None):
+        """Build (without executing) a playlistItems().insert request; position None appends"""
+        snippet = {
+            "playlistId": playlist_id,
+            "resourceId": {
+                "kind": "youtube#video",
+                "videoId": video_id
+            }
+        }
+        if position is not None:
+            snippet["position"] = position
+        return self.youtube.playlistItems().insert(part="snippet", body={"snippet": snippet})
+
+    def _thread_http(self):
+        """
+        Return an Http object owned by the current thread
+        httplib2 is not thread-safe, so concurrent batches must not share the
+        service's own connection. Returns None to use the service default.
+        """
+        if self.session is not None:
+            return self.session.http()
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            service_http = getattr(self.youtube, '_http', None)
+            if isinstance(service_http, google_auth_httplib2.AuthorizedHttp):
+                http = google_auth_httplib2.AuthorizedHttp(service_http.credentials, http=httplib2.Http())
+            elif isinstance(service_http, httplib2.Http):
+                http = httplib2.Http()  # Unauthenticated (API key or local test server)
+            else:
+                return None     # Not a real service (e.g. a mock), use its default
+            self._local.http = http
+        return http
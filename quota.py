@@ -0,0 +1,162 @@
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo('America/Los_Angeles')
+except Exception:
+    # No tz database (e.g. Windows without tzdata): fall back to standard time
+    PACIFIC = timezone(timedelta(hours=-8))
+
+DEFAULT_LEDGER_PATH = 'quota_ledger.json'
+DAILY_QUOTA = 10000     # Default YouTube Data API allowance per project per day
+
+# Units charged per call, by the last part of the API method ID
+QUOTA_COSTS = {
+    'list': 1,
+    'insert': 50,
+    'update': 50,
+    'delete': 50,
+}
+PAGE_SIZE = 50          # Items per list page
+
+
+def quota_units(request):
+    """
+    Units a prepared googleapiclient request will cost, from its methodId
+    (e.g. 'youtube.playlistItems.insert'); unknown requests count as 1
+    """
+    method = getattr(request, 'methodId', None) or ''
+    return QUOTA_COSTS.get(method.rsplit('.', 1)[-1], 1)
+
+
+def quota_day(now=None):
+    """The quota day (Pacific date, YYYY-MM-DD) that a moment falls in"""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(PACIFIC).strftime('%Y-%m-%d')
+
+
+def next_reset(now=None):
+    """Return the next Pacific midnight as an aware UTC datetime"""
+    now = (now or datetime.now(timezone.utc)).astimezone(PACIFIC)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return midnight.replace(tzinfo=PACIFIC).astimezone(timezone.utc)
+
+
+def project_id_from_credentials(path='credentials.json'):
+    """Google Cloud project of the OAuth client, used to key the ledger"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            secrets = json.load(f)
+        return next(iter(secrets.values())).get('project_id', 'default')
+    except (OSError, ValueError, StopIteration, AttributeError):
+        return 'default'
+
+
+class QuotaLedger:
+    """
+    Units spent per project per quota day, saved to a JSON file after every call
+    File layout: {project: {day: {'spent': units, 'calls': {method: count}}}}
+    """
+    def __init__(self, path=DEFAULT_LEDGER_PATH, project='default', daily_limit=DAILY_QUOTA):
+        self.path = path
+        self.project = project
+        self.daily_limit = daily_limit
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except ValueError:
+                self._data = {}     # Corrupt ledger, start over rather than crash
+
+    def record(self, method, units):
+        """Charge units for one API call (method is e.g. 'insert' or 'list')"""
+        with self._lock:
+            today = self._today()
+            today['spent'] += units
+            today['calls'][method] = today['calls'].get(method, 0) + 1
+            self._save()
+
+    def mark_exhausted(self):
+        """The API said quotaExceeded: whatever we counted, nothing is left today"""
+        with self._lock:
+            today = self._today()
+            today['spent'] = max(today['spent'], self.daily_limit)
+            self._save()
+
+    def spent(self):
+        with self._lock:
+            return self._today()['spent']
+
+    def remaining(self):
+        return max(0, self.daily_limit - self.spent())
+
+    def _today(self):
+        days = self._data.setdefault(self.project, {})
+        return days.setdefault(quota_day(), {'spent': 0, 'calls': {}})
+
+    def _save(self):
+        # Write to a temp file and swap it in so a crash never leaves half a ledger
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f)
+        os.replace(temp_path, self.path)
+
+
+class QuotaBudgetError(Exception):
+    """A job can never fit in the daily quota and splitting is not allowed"""
+
+
+class QuotaScheduler:
+    """
+    Estimates job cost and fits work into what is left of today's quota
+    Work that does not fit is split; the rest waits for the Pacific-midnight reset.
+    """
+    def __init__(self, ledger, sleep=time.sleep):
+        self.ledger = ledger
+        self.sleep = sleep
+
+    @staticmethod
+    def estimate(item_count, new_playlist=True, fetch_pages=None):
+        """
+        Units a shuffle-and-create job will cost
+        Args: item_count - videos to insert, new_playlist - add a playlists.insert,
+              fetch_pages - list pages to read (default: enough for item_count)
+        """
+        if fetch_pages is None:
+            fetch_pages = math.ceil(item_count / PAGE_SIZE)
+        return (item_count * QUOTA_COSTS['insert'] + fetch_pages * QUOTA_COSTS['list']
+                + (QUOTA_COSTS['insert'] if new_playlist else 0))
+
+    def affordable_inserts(self, reserve=0):
+        """How many 50-unit inserts fit in today's remaining quota after reserve units"""
+        return max(0, (self.ledger.remaining() - reserve) // QUOTA_COSTS['insert'])
+
+    def check(self, cost, allow_split=True):
+        """
+        Decide what to do with a job of the given cost
+        Returns: 'run' (fits now), 'split' (part fits now, rest after reset),
+                 'queue' (nothing fits until reset)
+        Raises: QuotaBudgetError if it cannot fit at all without splitting
+        """
+        if cost <= self.ledger.remaining():
+            return 'run'
+        if not allow_split:
+            if cost > self.ledger.daily_limit:
+                raise QuotaBudgetError(f"Job needs {cost} units, more than the daily limit "
+                                       f"of {self.ledger.daily_limit}")
+            return 'queue'
+        return 'split' if self.affordable_inserts() else 'queue'
+
+    def wait_for_reset(self, log=print):
+        """Block until the next Pacific-midnight quota reset"""
+        reset = next_reset()
+        log(f"Quota used up - waiting until {reset.astimezone().strftime('%Y-%m-%d %H:%M')} for the reset")
+        while datetime.now(timezone.utc) < reset:
+            self.sleep(min(60, (reset - datetime.now(timezone.utc)).total_seconds() + 1))
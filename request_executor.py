@@ -0,0 +1,249 @@
+import contextlib
+import json
+import random
+import threading
+import time
+import httplib2
+from googleapiclient.errors import HttpError
+from metrics import Metrics
+from quota import quota_units
+
+# Errors raised by the transport itself (dropped connection, timeout, DNS...)
+NETWORK_ERRORS = (OSError, httplib2.HttpLib2Error)
+
+# 403 reasons that will not go away by waiting a few seconds
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+# 403 reasons that mean "slow down", the same as a 429
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# How an error should be handled
+RETRY = 'retry'         # Transient - back off and try again
+THROTTLE = 'throttle'   # Too fast - slow the rate limiter down, then retry
+FATAL = 'fatal'         # Will never succeed - give up straight away
+QUOTA = 'quota'         # Daily quota used up - give up on everything until reset
+
+
+def error_reason(error):
+    """
+    Pull the first error reason (e.g. 'quotaExceeded') out of an HttpError body
+    Returns: reason string, or None if the body has no reason
+    """
+    try:
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        return json.loads(content)['error']['errors'][0]['reason']
+    except (AttributeError, ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def error_status(error):
+    """Return the HTTP status of an HttpError, or None for other errors"""
+    resp = getattr(error, 'resp', None)
+    return getattr(resp, 'status', None)
+
+
+def classify_error(error):
+    """
+    Decide what to do about an error raised by an API call
+    Returns: one of RETRY, THROTTLE, FATAL or QUOTA
+    """
+    if isinstance(error, NETWORK_ERRORS):
+        return RETRY
+    if not isinstance(error, HttpError):
+        return FATAL
+
+    status = error_status(error)
+    reason = error_reason(error)
+    if status == 429 or reason in RATE_LIMIT_REASONS:
+        return THROTTLE
+    if status == 403 and reason in QUOTA_REASONS:
+        return QUOTA
+    if status == 409 or (status is not None and status >= 500):
+        return RETRY    # 409 is YouTube's "aborted, try again" on concurrent writes
+    return FATAL        # Other 4xx: bad request, not found, forbidden...
+
+
+def endpoint_name(request):
+    """Short name of what a request calls, e.g. 'playlistItems.insert' or 'batch'"""
+    method_id = getattr(request, 'methodId', None)
+    return method_id.split('.', 1)[-1] if method_id else 'batch'
+
+
+def request_size(request):
+    """Bytes of request body (summed over the parts of a batch)"""
+    parts = getattr(request, '_requests', None)    # BatchHttpRequest keeps its parts here
+    bodies = [part.body for part in parts.values()] if parts else [getattr(request, 'body', None)]
+    return sum(len(body) for body in bodies if isinstance(body, (str, bytes)))
+
+
+def is_idempotent(request):
+    """
+    Whether a request can safely be sent again after a network error
+    Single POSTs (inserts) are not, nor are batches holding anything but GETs.
+    """
+    parts = getattr(request, '_requests', None)    # BatchHttpRequest keeps its parts here
+    if parts is not None:
+        return all(getattr(part, 'method', None) == 'GET' for part in parts.values())
+    return getattr(request, 'method', None) != 'POST'
+
+
+def retry_after(error):
+    """Return the Retry-After header of an HttpError in seconds, or None"""
+    resp = getattr(error, 'resp', None)
+    try:
+        return float(resp.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter with an adaptive rate
+    The rate is halved on every throttle signal and creeps back up by a
+    fixed step after each success (additive increase, multiplicative decrease).
+    """
+    def __init__(self, rate=50.0, burst=100, min_rate=1.0, max_rate=200.0, increase=5.0):
+        self.rate = rate            # Tokens added per second
+        self.burst = burst          # Bucket size - largest burst allowed
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase    # Rate added back per successful call
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until the given number of tokens are available and take them"""
+        tokens = min(tokens, self.burst)    # A big batch must not wait forever
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self):
+        """Halve the rate after a 429 / rateLimitExceeded"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self):
+        """Raise the rate a little after a successful call"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff
+    Args: max_retries - retries after the first attempt,
+          base_delay/max_delay - bounds of the backoff in seconds
+    """
+    def __init__(self, max_retries=5, base_delay=0.5, max_delay=32.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, error=None):
+        """
+        Seconds to wait before retry number attempt (0 = first retry)
+        Uses "full jitter" and never waits less than the server's Retry-After.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        server_delay = retry_after(error) if error is not None else None
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        return delay
+
+
+class RequestExecutor:
+    """
+    Runs every YouTube API request: rate limiting, retries and backoff
+    Shared by all PlaylistManager calls; pass a custom one to change pacing.
+    Every attempt is recorded in metrics (endpoint, status, latency, bytes,
+    retries, quota units, time spent waiting for the rate limiter).
+    max_in_flight caps the HTTP requests running at once across every thread
+    that shares this executor (None: no cap beyond the callers' own pools).
+    """
+    def __init__(self, rate_limiter=None, retry_policy=None, sleep=time.sleep, ledger=None,
+                 metrics=None, max_in_flight=None):
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.sleep = sleep      # Replaceable so tests do not actually wait
+        self.ledger = ledger    # Optional QuotaLedger charged for every attempt
+        self.metrics = metrics or Metrics()
+        self._in_flight = (threading.BoundedSemaphore(max_in_flight) if max_in_flight
+                           else contextlib.nullcontext())
+
+    def execute(self, request, cost=1, units=None, idempotent=None, **kwargs):
+        """
+        Execute a request (or BatchHttpRequest), retrying transient failures
+        Args: request - anything with .execute(), cost - API calls it contains,
+              units - quota units per attempt (default: from the request's method),
+              idempotent - whether it is safe to send again after a network error
+                           (default: is_idempotent(request)),
+              kwargs - passed through to request.execute()
+        Returns: the response of request.execute()
+        Raises: the last error if it cannot succeed or retries run out
+
+        A POST that dies with a network error may still have been carried out;
+        sending it again could create a second playlist. The same holds for a
+        batch of writes: it is given up on, and the caller has to find out which
+        of its parts were carried out before sending any of them again.
+        """
+        if idempotent is None:
+            idempotent = is_idempotent(request)
+        endpoint = endpoint_name(request)
+        method = endpoint.rsplit('.', 1)[-1]
+        if units is None:
+            units = quota_units(request)
+        sent = request_size(request)
+        received = []
+        if hasattr(request, 'add_response_callback'):
+            # Sees the raw httplib2 response of every attempt, successful or not
+            request.add_response_callback(lambda resp: received.append(int(resp.get('content-length') or 0)))
+
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            self.rate_limiter.acquire(cost)     # Before taking a slot, so waiting for tokens holds none
+            with self._in_flight:   # Held while sending only, never during a backoff
+                waited = time.perf_counter() - waited
+                if self.ledger:
+                    self.ledger.record(method, units)   # Failed calls are charged too
+                received.clear()
+                start = time.perf_counter()
+                try:
+                    response = request.execute(**kwargs)
+                except (HttpError,) + NETWORK_ERRORS as e:
+                    error = e
+                    latency = time.perf_counter() - start
+                else:
+                    self.metrics.record_call(endpoint, 200, time.perf_counter() - start, attempt, units,
+                                             sent, sum(received), waited)
+                    self.rate_limiter.speed_up()
+                    return response
+
+            self.metrics.record_call(endpoint, error_status(error) or 'network', latency,
+                                     attempt, units, sent, sum(received), waited)
+            kind = classify_error(error)
+            if kind == QUOTA and self.ledger:
+                self.ledger.mark_exhausted()
+            if kind in (FATAL, QUOTA) or attempt >= self.retry_policy.max_retries:
+                raise error
+            if not idempotent and isinstance(error, NETWORK_ERRORS):
+                raise error
+            self.backoff(attempt, error)
+            attempt += 1
+
+    def backoff(self, attempt, error=None):
+        """Wait before retry number attempt, slowing down first if throttled"""
+        if error is not None and classify_error(error) == THROTTLE:
+            self.rate_limiter.slow_down()
+            self.metrics.inc('throttled_total')
+        delay = self.retry_policy.delay(attempt, error)
+        self.metrics.inc('backoff_seconds_total', delay)
+        self.sleep(delay)
@@ -0,0 +1,191 @@
+import heapq
+import numpy as np
+
+# name -> function(videos, rng, **options) returning an index permutation
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    """Decorator that makes a strategy available to build_permutation by name"""
+    def register(func):
+        STRATEGIES[name] = func
+        return func
+    return register
+
+
+def build_permutation(videos, strategy='random', seed=None, **options):
+    """
+    Compute a shuffled order for videos without touching the videos themselves
+    Args: videos - list of video dictionaries (or a VideoView of a VideoStore,
+                   which only 'random' and 'avoid_previous' can use: it keeps
+                   no channel, duration or publish date),
+          strategy - name of a registered strategy, seed - for reproducible results,
+          options - passed to the strategy
+    Returns: numpy int64 array; element i is the index of the video to put at position i
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown shuffle strategy '{strategy}' (have: {', '.join(sorted(STRATEGIES))})")
+    rng = np.random.default_rng(seed)
+    return np.asarray(STRATEGIES[strategy](videos, rng, **options), dtype=np.int64)
+
+
+def video_field(videos, field, default=None):
+    """
+    Pull one field out of every video record into a list
+    Raises: ValueError for a VideoView whose records lack the field; a
+            default for every video would quietly turn into a plain shuffle
+    """
+    if hasattr(videos, 'store') and len(videos) and field not in videos[0]:
+        raise ValueError(f"A VideoStore keeps no '{field}'; pass a list of video dictionaries "
+                         f"(see PlaylistManager.enrich_videos) for this strategy")
+    return [video.get(field, default) for video in videos]
+
+
+# === Strategies ===
+@register_strategy('random')
+def random_order(videos, rng):
+    """Uniform shuffle - reproducible when a seed is given"""
+    return rng.permutation(len(videos))
+
+
+@register_strategy('weighted')
+def weighted_order(videos, rng, weights=None, field='duration_seconds'):
+    """
+    Weighted shuffle: heavier videos tend to come first (Efraimidis-Spirakis)
+    Each item gets the key log(U)/w and the order is the keys sorted descending,
+    which is the same as repeatedly drawing without replacement by weight.
+    Args: weights - one non-negative number per video, or taken from field;
+          videos with weight 0 go last in random order
+    """
+    weights = np.asarray(weights if weights is not None else video_field(videos, field, 0),
+                         dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        keys = np.log(rng.random(len(weights))) / weights   # 0 weight -> -inf
+    zero = weights <= 0
+    keys[zero] = -np.inf
+    order = np.argsort(-keys, kind='stable')
+    # argsort leaves the zero-weight tail in index order; shuffle it too
+    tail = int(zero.sum())
+    if tail:
+        order[-tail:] = rng.permutation(order[-tail:])
+    return order
+
+
+@register_strategy('recency')
+def recency_order(videos, rng, field='published_at', half_life_days=365.0):
+    """
+    Weighted shuffle favouring recent videos
+    Weights halve for every half_life_days of age, relative to the newest video.
+    """
+    # One vectorized parse; 'NaT' stands in for a missing date
+    stamps = np.array([v.rstrip('Z') if v else 'NaT' for v in video_field(videos, field)],
+                      dtype='datetime64[s]')
+    valid = ~np.isnat(stamps)
+    ages = np.zeros(len(stamps))
+    if valid.any():
+        newest = stamps[valid].max()
+        ages[valid] = (newest - stamps[valid]).astype(np.float64) / 86400.0
+    weights = np.where(valid, 0.5 ** (ages / half_life_days), 0.0)
+    return weighted_order(videos, rng, weights=weights)
+
+
+@register_strategy('avoid_previous')
+def avoid_previous_order(videos, rng):
+    """
+    Shuffle in which no video keeps the position it has now
+    Videos are assumed to be in their previous order. Fixed points of a
+    random permutation are rotated among themselves (or, if there is only
+    one, swapped with a random other slot), which is O(n).
+    """
+    n = len(videos)
+    order = rng.permutation(n)
+    if n < 2:
+        return order
+    fixed = np.flatnonzero(order == np.arange(n))
+    if len(fixed) >= 2:
+        order[fixed] = np.roll(order[fixed], 1)
+    elif len(fixed) == 1:
+        i = fixed[0]
+        j = (i + 1 + rng.integers(n - 1)) % n    # any slot but i
+        order[i], order[j] = order[j], order[i]
+    return order
+
+
+@register_strategy('channel_spread')
+def channel_spread_order(videos, rng, k=3, field='channel_id'):
+    """
+    Shuffle so that no two videos of the same channel are within k slots
+    First spreads every channel's videos evenly with a random phase and
+    sorts by the resulting keys (vectorized, O(n log n)). If that still
+    breaks the rule, falls back to a greedy heap scheduler (O(n log c)).
+    When a channel has too many videos for the rule to hold, the result
+    is the best effort of the greedy pass.
+    Args: k - minimum distance between videos of one channel, field - channel key
+    """
+    channels = video_field(videos, field, '')
+    n = len(channels)
+    if n < 2:
+        return np.arange(n)
+    seen = {}       # channel -> code, in order of first appearance (cheaper than np.unique on strings)
+    codes = np.array([seen.setdefault(channel, len(seen)) for channel in channels], dtype=np.int64)
+
+    order = spread_by_group(codes, rng)
+    if min_group_distance(codes[order]) > k:
+        return order
+    return greedy_spread(codes, k, rng)
+
+
+# === Helpers ===
+def spread_by_group(codes, rng):
+    """
+    Even-spread order: the j-th of m items in a group gets key (j + phase) / m
+    with a random phase per group and a little jitter, then sort by key.
+    """
+    n = len(codes)
+    shuffled = rng.permutation(n)
+    grouped = shuffled[np.argsort(codes[shuffled], kind='stable')]    # groups contiguous, random inside
+    counts = np.bincount(codes)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    group_of = codes[grouped]
+    rank = np.arange(n) - starts[group_of]
+    phase = rng.random(len(counts))
+    jitter = rng.random(n) * 0.1
+    keys = (rank + phase[group_of] * (1 - 0.1) + jitter) / counts[group_of]
+    return grouped[np.argsort(keys, kind='stable')]
+
+
+def min_group_distance(codes_in_order):
+    """Smallest distance between two equal codes in a sequence (n if none repeat)"""
+    n = len(codes_in_order)
+    positions = np.argsort(codes_in_order, kind='stable')
+    same = codes_in_order[positions][1:] == codes_in_order[positions][:-1]
+    if not same.any():
+        return n
+    return int(np.diff(positions)[same].min())
+
+
+def greedy_spread(codes, k, rng):
+    """
+    Always place the channel with the most videos left whose cooldown has expired
+    Classic "rearrange with distance k" with a max-heap and a cooldown queue.
+    """
+    groups = {}
+    for index in rng.permutation(len(codes)):
+        groups.setdefault(codes[index], []).append(index)
+
+    # Heap entries: (-videos left, random tie-break, code)
+    heap = [(-len(items), rng.random(), code) for code, items in groups.items()]
+    heapq.heapify(heap)
+    cooling = []    # (slot when usable again, entry)
+    order = []
+    while heap or cooling:
+        while cooling and cooling[0][0] <= len(order):
+            heapq.heappush(heap, heapq.heappop(cooling)[1])
+        if not heap:
+            # Nothing may be placed without breaking the rule; take the one that cools soonest
+            heapq.heappush(heap, heapq.heappop(cooling)[1])
+        left, tie, code = heapq.heappop(heap)
+        order.append(groups[code].pop())
+        if left + 1 < 0:
+            heapq.heappush(cooling, (len(order) + k, (left + 1, rng.random(), code)))
+    return np.array(order, dtype=np.int64)
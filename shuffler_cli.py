@@ -0,0 +1,340 @@
+"""
+Headless command line for shuffling many playlists in one run
+
+Usage:
+    python shuffler_cli.py run --config nightly.json [--concurrency 4] [--wait-for-quota]
+                               [--accounts DIR [DIR ...]]
+    python shuffler_cli.py resume [journal.jsonl ...]
+    python shuffler_cli.py merge PLAYLIST [PLAYLIST ...] --title "Mix" [--sample 500] [--top-by FIELD]
+    python shuffler_cli.py sync SOURCE TARGET [--seed N]
+    python shuffler_cli.py snapshot PLAYLIST [PLAYLIST ...] [--dir snapshots] [--jsonl]
+
+Config file (JSON):
+    {
+        "playlists": ["PLxxxxxxxx", "Road trip*", "Workout ?"],   # IDs or title globs
+        "mode": "create",                      # "create" a new copy or "reshuffle" in place
+        "name_template": "{title} (shuffled)", # New playlist name, create mode only
+        "concurrency": 4,
+        "accounts": ["accounts/brand-a", "accounts/brand-b"]   # Optional, see below
+    }
+
+With accounts (each a directory holding its own credentials.json and
+token.json), every account runs in its own process against its own
+project's quota, and each playlist goes to an account that owns it and
+still has quota left (see account_pool.py). --wait-for-quota lets jobs
+wait in their account's process for the reset instead of being skipped;
+--metrics merges every account's metrics, labelled with the account.
+
+merge combines the given playlists (IDs or title globs), drops duplicate
+videos, optionally keeps a random sample (or the top --sample videos by a
+metadata field such as duration_seconds or published_at) and writes the
+shuffled result to one new playlist.
+
+sync updates an existing shuffled copy (TARGET) after its SOURCE changed:
+videos that left the source are removed and new ones are inserted at random
+positions; everything else stays where it is.
+
+snapshot saves playlists to files (see playlist_snapshot.py) for offline
+planning, diffing and test fixtures: compact binary by default, or JSON Lines.
+
+Progress and results are written to stdout as JSON Lines; human-readable
+messages go to stderr. Phase timings ("phase") and failed API calls
+("api_error") are included; --metrics FILE also writes all counters and
+latency histograms at the end (Prometheus text for *.prom, JSON otherwise).
+"""
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from job_journal import JobJournal, find_unfinished_jobs, run_job
+from playlist_cache import PlaylistCache
+from playlist_pipeline import merge_playlists
+from quota import QuotaLedger, QuotaScheduler, project_id_from_credentials
+from video_metadata import VideoMetadataCache
+from video_store import VideoStore
+
+DEFAULT_CONCURRENCY = 4
+
+
+class BatchRunner:
+    """
+    Runs shuffle jobs for many playlists on a bounded thread pool
+    Every worker thread gets its own YouTube service (httplib2 is not
+    thread-safe); the rate limiter, quota ledger and cache are shared.
+    """
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, wait_for_quota=False, out=sys.stdout):
+        self.concurrency = concurrency
+        self.out = out
+        self._out_lock = threading.Lock()
+        self._local = threading.local()
+        # The Google client stack is imported only once there is work to do,
+        # so --help and argument errors return immediately
+        from request_executor import RequestExecutor
+        self.ledger = QuotaLedger(project=project_id_from_credentials())
+        # --concurrency caps API requests in flight, not just playlists: the
+        # insert, prefetch and metadata threads of every job share these slots
+        self.executor = RequestExecutor(ledger=self.ledger, max_in_flight=concurrency)
+        self.cache = PlaylistCache()
+        self.metadata_cache = VideoMetadataCache()
+        self.scheduler = QuotaScheduler(self.ledger) if wait_for_quota else None
+        self.metrics = self.executor.metrics
+        self.metrics.subscribe(self.on_metrics_event)
+
+    def emit(self, event, **fields):
+        """Write one JSON progress line"""
+        record = dict(event=event, time=round(time.time(), 3), **fields)
+        with self._out_lock:
+            self.out.write(json.dumps(record) + '\n')
+            self.out.flush()
+
+    def on_metrics_event(self, event):
+        """Forward phase timings and failed API calls as JSON lines"""
+        if event['event'] == 'span_end':
+            self.emit('phase', phase=event['name'], seconds=round(event['duration'], 3),
+                      status=event['status'], trace_id=event['trace_id'])
+        elif event['event'] == 'api_call' and event['status'] not in ('200', '304'):
+            self.emit('api_error', endpoint=event['endpoint'], status=event['status'],
+                      attempt=event['attempt'], latency=round(event['latency'], 3))
+
+    def manager(self):
+        """The calling thread's PlaylistManager"""
+        if getattr(self._local, 'manager', None) is None:
+            from api_test import authenticate_youtube, get_session
+            from playlist_manager import PlaylistManager
+            self._local.manager = PlaylistManager(authenticate_youtube(), self.executor, self.cache,
+                                                  metadata_cache=self.metadata_cache, session=get_session())
+        return self._local.manager
+
+    # === Selecting playlists ===
+    def select_playlists(self, patterns):
+        """
+        Resolve playlist IDs and title globs against the user's playlists
+        Returns: list of playlist dictionaries, each at most once
+        """
+        playlists = self.manager().get_user_playlists()
+        selected = {}
+        for pattern in patterns:
+            matches = [p for p in playlists if p['id'] == pattern or fnmatch.fnmatchcase(p['title'], pattern)]
+            if not matches:
+                self.emit('warning', message=f"No playlist matches '{pattern}'")
+            for playlist in matches:
+                selected[playlist['id']] = playlist
+        return list(selected.values())
+
+    # === Jobs ===
+    def shuffle_one(self, playlist, mode, name_template):
+        """Fetch, shuffle and write one playlist; returns a result dictionary"""
+        pm = self.manager()
+        log = lambda message: self.emit('log', playlist_id=playlist['id'], message=message)
+        self.emit('started', playlist_id=playlist['id'], title=playlist['title'], mode=mode)
+
+        if mode == 'reshuffle':
+            moved, failed = pm.reshuffle_in_place(playlist['id'])
+            return {'playlist_id': playlist['id'], 'moved': moved, 'failed': len(failed)}
+
+        videos = VideoStore()   # Compact: dozens of big playlists may be in memory at once
+        skipped = 0
+        for page in pm.iter_playlist_pages(playlist['id'], playlist['video_count']):
+            # Check each page while the next one downloads; drop deleted/unavailable videos
+            enriched = pm.enrich_videos(page['videos'])
+            videos.extend(v for v in enriched if v['available'])
+            skipped += sum(1 for v in enriched if not v['available'])
+            self.emit('fetched', playlist_id=playlist['id'], videos=len(videos), skipped=skipped,
+                      total=playlist['video_count'])
+        if not len(videos):
+            return {'playlist_id': playlist['id'], 'added': 0, 'failed': 0, 'skipped': 'empty playlist'}
+
+        shuffled = pm.shuffle_videos(videos)
+        journal = JobJournal.create(playlist, name_template.format(title=playlist['title']),
+                                    shuffled.video_ids(),
+                                    f"Shuffled version of {playlist['title']}")
+        return self.finish_job(journal, log)
+
+    def merge(self, playlists, title, sample_size=None, top_by=None, seed=None):
+        """Merge, dedupe and sample many playlists into one new shuffled playlist"""
+        pm = self.manager()
+        log = lambda message: self.emit('log', playlist_id='merge', message=message)
+        self.emit('started', playlist_id='merge', sources=[p['id'] for p in playlists], mode='merge')
+
+        videos = merge_playlists(pm, playlists, sample_size, top_by, seed,
+                                 max_workers=self.concurrency)
+        self.emit('fetched', playlist_id='merge', videos=len(videos),
+                  total=sum(p['video_count'] for p in playlists))
+        if not videos:
+            return {'playlist_id': 'merge', 'added': 0, 'failed': 0, 'skipped': 'no videos'}
+
+        shuffled = pm.shuffle_videos(videos, seed=seed)
+        source = {'id': 'merge', 'title': ', '.join(p['title'] for p in playlists)}
+        journal = JobJournal.create(source, title, [v['video_id'] for v in shuffled],
+                                    f"Merged from {len(playlists)} playlists")
+        return self.finish_job(journal, log)
+
+    def sync(self, source, target, seed=None):
+        """Apply the changes of a source playlist to its shuffled copy; returns a result dictionary"""
+        pm = self.manager()
+        self.emit('started', playlist_id=source['id'], target_playlist_id=target['id'], mode='sync')
+        added, removed, failed = pm.sync_playlist(source['id'], target['id'], source['video_count'],
+                                                  target['video_count'], seed=seed)
+        return {'playlist_id': source['id'], 'target_playlist_id': target['id'],
+                'added': added, 'removed': removed, 'failed': len(failed)}
+
+    def snapshot(self, playlist, directory, extension):
+        """Save one playlist to DIRECTORY/<playlist id><extension>; returns a result dictionary"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, playlist['id'] + extension)
+        count = self.manager().export_snapshot(playlist['id'], path, playlist['video_count'], playlist['title'])
+        return {'playlist_id': playlist['id'], 'path': path, 'videos': count}
+
+    def finish_job(self, journal, log):
+        added, failed = run_job(self.manager(), journal, log, self.scheduler)
+        return {'playlist_id': journal.job['source_playlist_id'], 'target_playlist_id': journal.target_playlist_id,
+                'journal': journal.path, 'added': added, 'failed': len(failed), 'done': journal.done}
+
+    def run_all(self, tasks):
+        """
+        Run task functions concurrently and emit a result for each
+        Returns: True if every task succeeded
+        """
+        def run(task):
+            name, func = task
+            try:
+                result = func()
+                self.emit('result', status='ok' if not result.get('failed') else 'partial', **result)
+                return not result.get('failed')
+            except Exception as e:
+                self.emit('result', status='error', name=name, error=str(e))
+                return False
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            ok = all(list(pool.map(run, tasks)))
+        self.emit('finished', ok=ok, quota_spent=self.ledger.spent(), quota_remaining=self.ledger.remaining(),
+                  api_calls=self.metrics.counter('api_calls_total'),
+                  retries=self.metrics.counter('api_retries_total'),
+                  throttled=self.metrics.counter('throttled_total'))
+        return ok
+
+
+def load_config(path):
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not config.get('playlists'):
+        raise ValueError(f"{path}: 'playlists' must list at least one playlist ID or title")
+    if config.get('mode', 'create') not in ('create', 'reshuffle'):
+        raise ValueError(f"{path}: 'mode' must be 'create' or 'reshuffle'")
+    return config
+
+
+def run_accounts(args, config, out):
+    """The run command spread over several accounts, one worker process each"""
+    from account_pool import AccountPool
+    concurrency = args.concurrency or config.get('concurrency', DEFAULT_CONCURRENCY)
+    with AccountPool(args.accounts or config['accounts'], concurrency, out, args.wait_for_quota) as pool:
+        pool.discover()
+        jobs = pool.plan(config['playlists'], config.get('mode', 'create'),
+                         config.get('name_template', '{title} (shuffled)'))
+        results = pool.run(jobs)
+        if args.metrics:
+            pool.collect_metrics().write(args.metrics)
+    return 0 if all(result['status'] == 'ok' for result in results) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shuffle YouTube playlists without the GUI")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="shuffle the playlists listed in a config file")
+    run_parser.add_argument('--config', required=True, help="JSON config file")
+    run_parser.add_argument('--concurrency', type=int,
+                            help="playlists processed, and API requests in flight, at once")
+    run_parser.add_argument('--wait-for-quota', action='store_true',
+                            help="split jobs to fit the daily quota and wait for the reset")
+    run_parser.add_argument('--accounts', nargs='+', metavar='DIR',
+                            help="account directories to spread the playlists over (one process each)")
+
+    resume_parser = commands.add_parser('resume', help="finish interrupted jobs")
+    resume_parser.add_argument('journals', nargs='*', help="journal files (default: all unfinished)")
+    resume_parser.add_argument('--concurrency', type=int)
+    resume_parser.add_argument('--wait-for-quota', action='store_true')
+
+    merge_parser = commands.add_parser('merge', help="merge many playlists into one new playlist")
+    merge_parser.add_argument('playlists', nargs='+', help="playlist IDs or title globs")
+    merge_parser.add_argument('--title', required=True, help="title of the new playlist")
+    merge_parser.add_argument('--sample', type=int, help="keep only this many videos")
+    merge_parser.add_argument('--top-by', help="with --sample: keep the videos with the largest value "
+                                               "of this field instead of a random sample")
+    merge_parser.add_argument('--seed', type=int, help="for a reproducible sample and order")
+    merge_parser.add_argument('--concurrency', type=int, help="playlists fetched (and requests in flight) at once")
+    merge_parser.add_argument('--wait-for-quota', action='store_true')
+
+    sync_parser = commands.add_parser('sync', help="update a shuffled copy with its source's changes")
+    sync_parser.add_argument('source', help="source playlist ID or title")
+    sync_parser.add_argument('target', help="the shuffled copy to update (ID or title)")
+    sync_parser.add_argument('--seed', type=int, help="for reproducible insert positions")
+
+    snapshot_parser = commands.add_parser('snapshot', help="save playlists to local snapshot files")
+    snapshot_parser.add_argument('playlists', nargs='+', help="playlist IDs or title globs")
+    snapshot_parser.add_argument('--dir', default='snapshots', help="where to write (default: snapshots)")
+    snapshot_parser.add_argument('--jsonl', action='store_true', help="JSON Lines instead of binary")
+    snapshot_parser.add_argument('--concurrency', type=int, help="playlists fetched (and requests in flight) at once")
+
+    for command_parser in (run_parser, resume_parser, merge_parser, sync_parser, snapshot_parser):
+        command_parser.add_argument('--metrics', help="write metrics here when done (*.prom or *.json)")
+
+    args = parser.parse_args(argv)
+    out = sys.stdout
+
+    # Everything else that prints (PlaylistManager progress...) goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.command == 'run' and (args.accounts or load_config(args.config).get('accounts')):
+            return run_accounts(args, load_config(args.config), out)
+
+        from api_test import authenticate_youtube
+        authenticate_youtube()  # Run any OAuth flow once, before the workers start
+
+        if args.command == 'run':
+            config = load_config(args.config)
+            runner = BatchRunner(args.concurrency or config.get('concurrency', DEFAULT_CONCURRENCY),
+                                 args.wait_for_quota, out)
+            mode = config.get('mode', 'create')
+            template = config.get('name_template', '{title} (shuffled)')
+            tasks = [(p['id'], lambda p=p: runner.shuffle_one(p, mode, template))
+                     for p in runner.select_playlists(config['playlists'])]
+        elif args.command == 'merge':
+            runner = BatchRunner(args.concurrency or DEFAULT_CONCURRENCY, args.wait_for_quota, out)
+            playlists = runner.select_playlists(args.playlists)
+            tasks = [('merge', lambda: runner.merge(playlists, args.title, args.sample,
+                                                    args.top_by, args.seed))]
+        elif args.command == 'sync':
+            runner = BatchRunner(2, out=out)     # Source and target are read at once
+            source, target = (runner.select_playlists([pattern]) for pattern in (args.source, args.target))
+            if len(source) != 1 or len(target) != 1:
+                runner.emit('error', message="SOURCE and TARGET must each match exactly one playlist")
+                return 2
+            tasks = [(source[0]['id'], lambda: runner.sync(source[0], target[0], args.seed))]
+        elif args.command == 'snapshot':
+            runner = BatchRunner(args.concurrency or DEFAULT_CONCURRENCY, out=out)
+            extension = '.jsonl' if args.jsonl else '.ysnap'
+            tasks = [(p['id'], lambda p=p: runner.snapshot(p, args.dir, extension))
+                     for p in runner.select_playlists(args.playlists)]
+        else:
+            runner = BatchRunner(args.concurrency or DEFAULT_CONCURRENCY, args.wait_for_quota, out)
+            tasks = []
+            for path in args.journals or find_unfinished_jobs():
+                journal = JobJournal.load(path)
+                log = lambda message, path=path: runner.emit('log', journal=path, message=message)
+                tasks.append((path, lambda journal=journal, log=log: runner.finish_job(journal, log)))
+
+        ok = runner.run_all(tasks)
+        if args.metrics:
+            runner.metrics.write(args.metrics)
+        return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
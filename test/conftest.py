@@ -0,0 +1,190 @@
+# Shared pytest fixtures and in-memory API fakes
+# Fixtures (server, make_manager...) are found by pytest; test modules import
+# the fake classes with: from conftest import FakeService, FakeRequest
+
+import sys
+import os
+import json
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from fake_youtube_server import FakeYouTubeServer, build_fake_service
+from playlist_manager import PlaylistManager
+from request_executor import RequestExecutor, RetryPolicy
+
+SOURCE_IDS = [f"v{i}" for i in range(120)]
+
+
+def make_error(status, reason=None, retry_after=None):
+    """An HttpError as googleapiclient raises it"""
+    headers = {'status': str(status)}
+    if retry_after is not None:
+        headers['retry-after'] = str(retry_after)
+    body = {'error': {'errors': [{'reason': reason}]}} if reason else {}
+    return HttpError(httplib2.Response(headers), json.dumps(body).encode('utf-8'))
+
+
+def fast_executor(**options):
+    """RequestExecutor with millisecond backoff that never really sleeps"""
+    return RequestExecutor(retry_policy=RetryPolicy(base_delay=0.001, max_delay=0.01),
+                           sleep=lambda seconds: None, **options)
+
+
+# === Fake HTTP server ===
+@pytest.fixture
+def fake_server():
+    """An empty FakeYouTubeServer"""
+    with FakeYouTubeServer() as server:
+        yield server
+
+
+@pytest.fixture
+def server(fake_server):
+    """A fake server holding one 120-video playlist, PLsrc; override in a module to add more"""
+    fake_server.state.add_playlist('Source', SOURCE_IDS, playlist_id='PLsrc')
+    fake_server.state.reset_counters()
+    return fake_server
+
+
+@pytest.fixture
+def make_manager():
+    """Factory: make_manager(server, **options) -> PlaylistManager on a fake server with a fast executor"""
+    def make(server, executor=None, **options):
+        return PlaylistManager(build_fake_service(server), executor or fast_executor(), **options)
+    return make
+
+
+# === In-memory service (no HTTP at all) ===
+class FakeRequest:
+    """A prepared request; execute() runs handler (one round trip of service, if given)"""
+    def __init__(self, handler, service=None):
+        self.handler = handler
+        self.service = service
+        self.headers = {}
+
+    def execute(self, http=None):
+        if self.service is not None:
+            self.service.round_trip()
+        return self.handler()
+
+
+class FakeBatch:
+    """All added requests in a single round trip"""
+    def __init__(self, callback, drop_answer=False, service=None):
+        self.callback = callback
+        self.requests = []
+        self.drop_answer = drop_answer      # Run every part, then lose the answer
+        self.service = service
+
+    def add(self, request, request_id=None):
+        self.requests.append((request, request_id))
+
+    def execute(self, http=None):
+        if self.service is not None:
+            self.service.round_trip()
+        if self.drop_answer:
+            for request, request_id in self.requests:
+                request.handler()
+            raise ConnectionResetError("Connection reset by peer")
+        for request, request_id in self.requests:
+            try:
+                self.callback(request_id, request.handler(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeService:
+    """
+    One playlist in memory behind playlists()/playlistItems() and batches
+    Args: video_ids - the playlist (self.video_ids, changed by inserts and moves),
+          page_size - items per list page; every page carries an ETag of its contents,
+          quota_left - playlist item inserts allowed before quotaExceeded (None: unlimited),
+          drop_answers - how many batches are carried out but answered by a dropped connection,
+          unavailable - video IDs whose insert fails with 404 videoNotFound,
+          latency - seconds every round trip (single call or whole batch) takes
+    Like the API, an insert position past the end of the playlist is rejected.
+    """
+    def __init__(self, video_ids=(), page_size=50, quota_left=None, drop_answers=0, unavailable=(),
+                 latency=0):
+        self.video_ids = list(video_ids)
+        self.page_size = page_size
+        self.quota_left = quota_left
+        self.drop_answers = drop_answers
+        self.unavailable = set(unavailable)
+        self.latency = latency
+        self.round_trips = 0
+        self.lock = threading.Lock()
+        self.created = 0            # playlists().insert calls
+        self.updates = 0            # playlistItems().update calls
+        self.downloads = 0          # list pages sent in full
+        self.not_modified = 0       # list pages answered with 304
+
+    def playlists(self):
+        return self
+
+    def playlistItems(self):
+        return self
+
+    def new_batch_http_request(self, callback=None):
+        drop_answer = self.drop_answers > 0
+        self.drop_answers -= drop_answer
+        return FakeBatch(callback, drop_answer, self)
+
+    def list(self, part, playlistId, maxResults, pageToken):
+        request = FakeRequest(lambda: self._page(pageToken, request.headers), self)
+        return request
+
+    def insert(self, part, body):
+        def insert():
+            snippet = body['snippet']
+            if 'playlistId' not in snippet:
+                self.created += 1
+                return {'id': 'PLnew'}
+            if self.quota_left is not None:
+                if self.quota_left <= 0:
+                    raise make_error(403, 'quotaExceeded')
+                self.quota_left -= 1
+            video_id = snippet['resourceId']['videoId']
+            if video_id in self.unavailable:
+                raise make_error(404, 'videoNotFound')
+            position = snippet.get('position', len(self.video_ids))
+            if position > len(self.video_ids):
+                raise make_error(400, 'invalidPlaylistItemPosition')
+            self.video_ids.insert(position, video_id)
+            return {'id': f"item-{video_id}"}
+        return FakeRequest(insert, self)
+
+    def update(self, part, body):
+        def move():
+            self.updates += 1
+            video_id = body['snippet']['resourceId']['videoId']
+            self.video_ids.remove(video_id)
+            self.video_ids.insert(body['snippet']['position'], video_id)
+            return {}
+        return FakeRequest(move, self)
+
+    def round_trip(self):
+        """Wait latency seconds and count one HTTP round trip"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.round_trips += 1
+
+    def _page(self, page_token, headers):
+        start = int(page_token or 0)
+        ids = self.video_ids[start:start + self.page_size]
+        etag = f"etag-{start}-{'-'.join(ids)}"
+        if headers.get('If-None-Match') == etag:
+            self.not_modified += 1
+            raise make_error(304)
+        self.downloads += 1
+        end = start + self.page_size
+        return {
+            'etag': etag,
+            'items': [{'id': f"item-{v}", 'snippet': {'title': v, 'resourceId': {'videoId': v}}} for v in ids],
+            'nextPageToken': str(end) if end < len(self.video_ids) else None
+        }
@@ -0,0 +1,391 @@
+# Local stand-in for the parts of the YouTube Data API v3 we use
+# Start it with FakeYouTubeServer().start() and point a client at server.url
+#
+# Supports: playlists / playlistItems / videos list, insert and update, batch
+# requests (POST /batch), pagination, ETags with If-None-Match (304),
+# configurable latency, injected errors (403/409/5xx...) and a quota counter.
+
+import email.parser
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PAGE_LIMIT = 50     # Same cap as the real API
+QUOTA_COSTS = {'GET': 1, 'POST': 50, 'PUT': 50, 'DELETE': 50}
+
+# Reason sent with an injected error when none is given
+DEFAULT_REASONS = {403: 'rateLimitExceeded', 404: 'notFound', 409: 'SERVICE_UNAVAILABLE',
+                   429: 'rateLimitExceeded', 500: 'backendError', 503: 'backendError'}
+
+
+def make_etag(value):
+    """Stable ETag for any JSON-serializable value"""
+    return '"' + hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()[:24] + '"'
+
+
+class FakeYouTubeState:
+    """In-memory playlists and videos shared by all request handlers"""
+    def __init__(self, latency=0.0, latency_jitter=0.0, quota_limit=None, shuffle_batches=False):
+        self.latency = latency                  # Seconds added to every round trip
+        self.latency_jitter = latency_jitter    # Plus up to this much at random
+        self.quota_limit = quota_limit          # Units per "day"; None = unlimited
+        self.shuffle_batches = shuffle_batches  # Run batch parts in random order, as the real API may
+        self.lock = threading.Lock()
+        self.playlists = {}     # playlist_id -> {'title', 'description', 'items': [video_id...]}
+        self.videos = {}        # video_id -> {'title', 'channel_id', 'duration', 'privacy_status', 'upload_status'}
+        self.next_id = 0
+        self.faults = []        # Injected errors, see inject_error
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Zero the quota and request counters (e.g. after test setup)"""
+        with self.lock:
+            self.quota_used = 0
+            self.round_trips = 0    # HTTP requests received (a batch counts once)
+            self.calls = {}         # 'GET playlistItems' -> API calls, batch parts included
+
+    def new_id(self, prefix):
+        with self.lock:
+            self.next_id += 1
+            return f"{prefix}{self.next_id:08d}"
+
+    def add_video(self, video_id, title=None, channel_id='UCfake', duration='PT3M30S',
+                  privacy_status='public', upload_status='processed'):
+        """Create or replace a video (test setup)"""
+        self.videos[video_id] = {'title': title or f"Video {video_id}", 'channel_id': channel_id,
+                                 'duration': duration, 'privacy_status': privacy_status,
+                                 'upload_status': upload_status}
+
+    def add_playlist(self, title, video_ids=(), playlist_id=None):
+        """Create a playlist directly (test setup) and return its ID"""
+        playlist_id = playlist_id or self.new_id('PL')
+        for video_id in video_ids:
+            if video_id not in self.videos:
+                self.add_video(video_id)
+        self.playlists[playlist_id] = {'title': title, 'description': '', 'items': list(video_ids)}
+        return playlist_id
+
+    def inject_error(self, status, reason=None, count=1, method=None, resource=None, retry_after=None):
+        """
+        Make the next count matching API calls fail
+        Args: status - HTTP status (403, 409, 500...), reason - error reason in the body,
+              method/resource - only match e.g. 'POST' / 'playlistItems' (default: any),
+              retry_after - seconds for a Retry-After header
+        """
+        with self.lock:
+            self.faults.append({'status': status, 'reason': reason or DEFAULT_REASONS.get(status, 'error'),
+                                'count': count, 'method': method, 'resource': resource,
+                                'retry_after': retry_after})
+
+    def inject_disconnect(self, count=1, method=None, resource=None):
+        """
+        Make the next count matching API calls drop the connection instead of answering
+        The call itself still goes through, like a connection reset after the
+        server wrote: the client cannot tell whether it worked.
+        """
+        with self.lock:
+            self.faults.append({'status': None, 'count': count, 'method': method, 'resource': resource})
+
+    def take_fault(self, method, resource):
+        """Consume and return the first injected error matching this call, or None"""
+        with self.lock:
+            for fault in self.faults:
+                if fault['method'] in (None, method) and fault['resource'] in (None, resource):
+                    fault['count'] -= 1
+                    if fault['count'] <= 0:
+                        self.faults.remove(fault)
+                    return fault
+        return None
+
+    def charge(self, method, resource):
+        """Count one API call; returns False if it does not fit in the quota"""
+        cost = QUOTA_COSTS.get(method, 1)
+        with self.lock:
+            key = f"{method} {resource}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+            if self.quota_limit is not None and self.quota_used + cost > self.quota_limit:
+                return False
+            self.quota_used += cost
+            return True
+
+
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # Keep-alive, like the real API
+    disable_nagle_algorithm = True  # Headers and body go out separately; don't wait 40ms for an ACK
+
+    def log_message(self, format, *args):
+        pass    # Keep test output quiet
+
+    @property
+    def state(self):
+        return self.server.state
+
+    # === Plumbing ===
+    def do_GET(self):
+        self.respond(*self.dispatch('GET', self.path, self.headers, b''))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if urlparse(self.path).path.rstrip('/').endswith('batch'):
+            self.respond_batch(body)
+        else:
+            self.respond(*self.dispatch('POST', self.path, self.headers, body))
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.respond(*self.dispatch('PUT', self.path, self.headers, body))
+
+    def do_DELETE(self):
+        self.respond(*self.dispatch('DELETE', self.path, self.headers, b''))
+
+    def wait(self):
+        """Simulated network and server time, once per round trip"""
+        with self.state.lock:
+            self.state.round_trips += 1
+        delay = self.state.latency + random.random() * self.state.latency_jitter
+        if delay:
+            time.sleep(delay)
+
+    def respond(self, status, headers, payload):
+        self.wait()
+        if status is None:
+            self.close_connection = True    # Injected disconnect: no answer at all
+            return
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if payload is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def respond_batch(self, body):
+        """Answer a multipart/mixed batch: every part is a full HTTP request"""
+        message = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        requests = list(message.get_payload())
+        if self.state.shuffle_batches:
+            random.shuffle(requests)
+        for part in requests:
+            request_line, _, rest = part.get_payload().replace('\r\n', '\n').partition('\n')
+            head, _, part_body = rest.partition('\n\n')
+            headers = dict(line.split(': ', 1) for line in head.splitlines() if ': ' in line)
+            method, path = request_line.split(' ')[:2]
+            status, extra, payload = self.dispatch(method, path, headers, part_body.encode())
+            if status is None:
+                self.respond(None, {}, None)    # The whole batch connection drops
+                return
+            lines = [f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}",
+                     'Content-Type: application/json']
+            lines += [f"{name}: {value}" for name, value in extra.items()]
+            content_id = part['Content-ID'].strip('<>')
+            parts.append(f"--{boundary}\r\nContent-Type: application/http\r\n"
+                         f"Content-ID: <response-{content_id}>\r\n\r\n"
+                         + '\r\n'.join(lines) + '\r\n\r\n' + (json.dumps(payload) if payload else '') + '\r\n')
+        data = (''.join(parts) + f"--{boundary}--\r\n").encode('utf-8')
+
+        self.wait()
+        self.send_response(200)
+        self.send_header('Content-Type', f"multipart/mixed; boundary={boundary}")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def error(self, status, reason, message='', headers=None):
+        return status, headers or {}, {'error': {'code': status, 'message': message or reason,
+                                                 'errors': [{'reason': reason, 'message': message}]}}
+
+    # === API ===
+    def dispatch(self, method, path, headers, body):
+        """
+        Handle one API call
+        Returns: (status, extra headers, JSON payload or None)
+        """
+        url = urlparse(path)
+        resource = url.path.rstrip('/').split('/')[-1]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        fault = self.state.take_fault(method, resource)
+        if fault and fault['status'] is not None:
+            extra = {'Retry-After': str(fault['retry_after'])} if fault['retry_after'] is not None else {}
+            return self.error(fault['status'], fault['reason'], headers=extra)
+        result = self.call_api(method, resource, params, headers, body)
+        return (None, {}, None) if fault else result
+
+    def call_api(self, method, resource, params, headers, body):
+        """dispatch without injected faults"""
+        if not self.state.charge(method, resource):
+            return self.error(403, 'quotaExceeded', "The request cannot be completed because you "
+                                                    "have exceeded your quota.")
+
+        handler = getattr(self, f"{method.lower()}_{resource}", None)
+        if handler is None:
+            return self.error(404, 'notFound')
+        if method == 'GET':
+            status, extra, payload = handler(params)
+            # Conditional GET: an unchanged page comes back as an empty 304
+            if status == 200:
+                payload['etag'] = make_etag(payload)
+                extra['ETag'] = payload['etag']
+                if headers.get('If-None-Match') == payload['etag']:
+                    return 304, extra, None
+            return status, extra, payload
+        return handler(params, json.loads(body or b'{}'))
+
+    def page(self, total, render, params):
+        """Slice a collection the way the API paginates it; render(start, stop) builds the items"""
+        start = int(params.get('pageToken') or 0)
+        size = min(int(params.get('maxResults', 5)), PAGE_LIMIT)
+        body = {'kind': 'youtube#listResponse', 'items': render(start, min(start + size, total)),
+                'pageInfo': {'totalResults': total, 'resultsPerPage': size}}
+        if start + size < total:
+            body['nextPageToken'] = str(start + size)
+        return 200, {}, body
+
+    def get_playlists(self, params):
+        ids = params.get('id')
+        wanted = [p for p in (ids.split(',') if ids else list(self.state.playlists))
+                  if p in self.state.playlists]
+        return self.page(len(wanted), lambda start, stop: [self.playlist_resource(playlist_id)
+                                                           for playlist_id in wanted[start:stop]], params)
+
+    def get_playlistItems(self, params):
+        playlist_id = params.get('playlistId')
+        if playlist_id not in self.state.playlists:
+            return self.error(404, 'playlistNotFound')
+        with self.state.lock:
+            items = list(self.state.playlists[playlist_id]['items'])
+        return self.page(len(items), lambda start, stop: [self.item_resource(playlist_id, items[i], i)
+                                                          for i in range(start, stop)], params)
+
+    def get_videos(self, params):
+        # Like the real API, unknown (deleted) IDs are simply left out
+        wanted = [v for v in params.get('id', '').split(',') if v in self.state.videos]
+        return self.page(len(wanted), lambda start, stop: [self.video_resource(video_id)
+                                                           for video_id in wanted[start:stop]], params)
+
+    def post_playlists(self, params, body):
+        snippet = body.get('snippet', {})
+        playlist_id = self.state.add_playlist(snippet.get('title', ''))
+        return 200, {}, {'kind': 'youtube#playlist', 'id': playlist_id, 'snippet': snippet}
+
+    def post_playlistItems(self, params, body):
+        snippet = body.get('snippet', {})
+        playlist = self.state.playlists.get(snippet.get('playlistId'))
+        if playlist is None:
+            return self.error(404, 'playlistNotFound')
+        video_id = snippet['resourceId']['videoId']
+        with self.state.lock:
+            items = playlist['items']
+            position = snippet.get('position', len(items))
+            if position > len(items):
+                return self.error(400, 'invalidPlaylistItemPosition')
+            items.insert(position, video_id)
+        return 200, {}, {'kind': 'youtube#playlistItem', 'id': f"{snippet['playlistId']}.{video_id}",
+                         'snippet': snippet}
+
+    def put_playlistItems(self, params, body):
+        """Move an item to snippet.position (the only update we use)"""
+        snippet = body.get('snippet', {})
+        playlist = self.state.playlists.get(snippet.get('playlistId'))
+        video_id = body.get('id', '').rpartition('.')[2]
+        with self.state.lock:
+            if playlist is None or video_id not in playlist['items']:
+                return self.error(404, 'playlistItemNotFound')
+            items = playlist['items']
+            items.remove(video_id)
+            items.insert(min(snippet.get('position', len(items)), len(items)), video_id)
+        return 200, {}, {'kind': 'youtube#playlistItem', 'id': body['id'], 'snippet': snippet}
+
+    def delete_playlistItems(self, params, body):
+        playlist_id, _, video_id = params.get('id', '').rpartition('.')
+        playlist = self.state.playlists.get(playlist_id)
+        with self.state.lock:
+            if playlist is None or video_id not in playlist['items']:
+                return self.error(404, 'playlistItemNotFound')
+            playlist['items'].remove(video_id)
+        return 204, {}, None
+
+    # === Resource rendering ===
+    def playlist_resource(self, playlist_id):
+        playlist = self.state.playlists[playlist_id]
+        return {
+            'kind': 'youtube#playlist',
+            'etag': make_etag([playlist['title'], playlist['items']]),  # Changes with the contents
+            'id': playlist_id,
+            'snippet': {'title': playlist['title'], 'description': playlist['description']},
+            'contentDetails': {'itemCount': len(playlist['items'])}
+        }
+
+    def item_resource(self, playlist_id, video_id, position):
+        return {
+            'kind': 'youtube#playlistItem',
+            'id': f"{playlist_id}.{video_id}",
+            'snippet': {'title': self.state.videos.get(video_id, {}).get('title', 'Deleted video'),
+                        'position': position,
+                        'resourceId': {'kind': 'youtube#video', 'videoId': video_id}}
+        }
+
+    def video_resource(self, video_id):
+        video = self.state.videos[video_id]
+        return {
+            'kind': 'youtube#video',
+            'id': video_id,
+            'snippet': {'title': video['title'], 'channelId': video['channel_id'],
+                        'channelTitle': f"Channel {video['channel_id']}",
+                        'publishedAt': '2020-01-01T00:00:00Z'},
+            'contentDetails': {'duration': video['duration']},
+            'status': {'privacyStatus': video['privacy_status'], 'uploadStatus': video['upload_status']}
+        }
+
+
+class FakeYouTubeServer:
+    """
+    Runs FakeYouTubeHandler on a free local port in a background thread
+    server.url is the API root, e.g. http://127.0.0.1:54321/youtube/v3/
+    """
+    def __init__(self, state=None):
+        self.state = state or FakeYouTubeState()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), FakeYouTubeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.root = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        self.url = self.root + "youtube/v3/"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def build_fake_service(server, http=None):
+    """
+    A googleapiclient YouTube service that talks to a FakeYouTubeServer
+    Built from the bundled discovery document with rootUrl pointing at the
+    server, so batch requests (new_batch_http_request) go there as well.
+    """
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+    document = json.loads(get_static_doc('youtube', 'v3'))
+    document['rootUrl'] = server.root
+    return build_from_document(document, http=http or httplib2.Http())
@@ -0,0 +1,101 @@
+# Tests for running jobs across several accounts in worker processes
+# Each account talks to its own fake server, so it owns only that server's playlists
+# Run: python -m pytest test/test_account_pool.py
+
+import os
+import io
+import json
+
+import pytest
+from fake_youtube_server import FakeYouTubeServer
+from account_pool import AccountPool
+from quota import QuotaLedger, DEFAULT_LEDGER_PATH
+
+
+def fake_runner(concurrency, out, wait_for_quota=False):
+    """Worker BatchRunner whose manager talks to the fake server named in the account directory"""
+    from shuffler_cli import BatchRunner
+    from playlist_manager import PlaylistManager
+    from youtube_session import YouTubeSession
+    with open('server_root.txt') as f:
+        session = YouTubeSession(None, root_url=f.read())
+    runner = BatchRunner(concurrency, wait_for_quota, out)
+    if runner.scheduler:
+        runner.scheduler.wait_for_reset = lambda log=print: runner.ledger._data.clear()   # A new quota day
+    pm = PlaylistManager(session.service(), runner.executor, runner.cache, session=session)
+    runner.manager = lambda: pm
+    return runner
+
+
+@pytest.fixture
+def accounts(tmp_path):
+    with FakeYouTubeServer() as server_a, FakeYouTubeServer() as server_b:
+        server_a.state.add_playlist('Brand A', [f"a{i}" for i in range(60)], playlist_id='PLa')
+        server_b.state.add_playlist('Brand B', [f"b{i}" for i in range(10)], playlist_id='PLb')
+        for server in (server_a, server_b):     # Managed by both accounts
+            server.state.add_playlist('Shared', [f"s{i}" for i in range(5)], playlist_id='PLshared')
+        directories = []
+        for name, server in (('a', server_a), ('b', server_b)):
+            directory = tmp_path / name
+            directory.mkdir()
+            (directory / 'server_root.txt').write_text(server.root)
+            directories.append(str(directory))
+        yield directories, server_a.state, server_b.state
+
+
+def run(directories, patterns, mode='create', **options):
+    out = io.StringIO()
+    with AccountPool(directories, concurrency=1, out=out, runner_factory=fake_runner, **options) as pool:
+        owners = pool.discover()
+        results = pool.run(pool.plan(patterns, mode))
+    return owners, {r['playlist_id']: r for r in results}, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_jobs_go_to_owning_account_with_most_quota(accounts):
+    directories, state_a, state_b = accounts
+    QuotaLedger(os.path.join(directories[0], DEFAULT_LEDGER_PATH)).record('insert', 9000)
+
+    owners, results, events = run(directories, ['Brand *', 'PLshared', 'Missing'])
+
+    assert {p['id'] for p in owners['a']} == {'PLa', 'PLshared'}
+    assert (results['PLa']['account'], results['PLb']['account']) == ('a', 'b')
+    assert results['PLshared']['account'] == 'b'        # a has only 1000 units left
+    assert all(r['status'] == 'ok' for r in results.values())
+    # The copies were written through the owner's own server, charged to its own ledger
+    assert sorted(p['title'] for p in state_b.playlists.values())[-1] == 'Shared (shuffled)'
+    assert QuotaLedger(os.path.join(directories[1], DEFAULT_LEDGER_PATH)).spent() > 15 * 50
+    assert any(e['event'] == 'warning' for e in events)
+    assert {e['account'] for e in events if e['event'] == 'fetched'} == {'a', 'b'}
+
+
+def test_job_without_quota_is_skipped(accounts):
+    directories, state_a, state_b = accounts
+    QuotaLedger(os.path.join(directories[1], DEFAULT_LEDGER_PATH)).mark_exhausted()
+
+    owners, results, events = run(directories, ['PLb', 'PLshared'], mode='reshuffle')
+
+    assert results['PLb']['status'] == 'skipped'
+    assert results['PLshared']['account'] == 'a'
+    assert [e['ok'] for e in events if e['event'] == 'finished'] == [False]
+
+
+def test_wait_for_quota_reaches_the_workers(accounts):
+    directories, state_a, state_b = accounts
+    QuotaLedger(os.path.join(directories[1], DEFAULT_LEDGER_PATH)).mark_exhausted()
+
+    owners, results, events = run(directories, ['PLb'], wait_for_quota=True)
+
+    # Without wait_for_quota it would be skipped (see above)
+    assert (results['PLb']['status'], results['PLb']['account']) == ('ok', 'b')
+
+
+def test_worker_metrics_are_collected(accounts):
+    directories, state_a, state_b = accounts
+    with AccountPool(directories, concurrency=1, runner_factory=fake_runner) as pool:
+        pool.discover()
+        pool.run(pool.plan(['Brand *']))
+        metrics = pool.collect_metrics()
+
+    assert metrics.counter('api_calls_total', account='a') > 0
+    assert metrics.counter('api_calls_total', account='b') > 0
+    assert metrics.histogram('phase_seconds', phase='insert', account='b').count == 1
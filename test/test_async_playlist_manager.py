@@ -0,0 +1,86 @@
+# Tests for AsyncPlaylistManager against the local fake YouTube server
+# Run: python -m pytest test/test_async_playlist_manager.py
+
+import asyncio
+import time
+
+import pytest
+from async_playlist_manager import AsyncPlaylistManager
+from fake_youtube_server import FakeYouTubeServer, FakeYouTubeState
+
+
+@pytest.fixture
+def server():
+    with FakeYouTubeServer(FakeYouTubeState()) as server:
+        yield server
+
+
+def run(server, coroutine_function, **kwargs):
+    """Run coroutine_function(pm) inside a manager talking to the fake server"""
+    async def main():
+        async with AsyncPlaylistManager(api_url=server.url, **kwargs) as pm:
+            return await coroutine_function(pm)
+    return asyncio.run(main())
+
+
+def test_lists_playlists_across_pages(server):
+    for i in range(60):
+        server.state.add_playlist(f"List {i}", ['v1'])
+    playlists = run(server, lambda pm: pm.get_user_playlists())
+    assert len(playlists) == 60
+    assert playlists[0]['video_count'] == 1
+
+
+def test_fetches_every_video_in_order(server):
+    video_ids = [f"vid{i:05d}" for i in range(120)]
+    playlist_id = server.state.add_playlist('Big', video_ids)
+    videos = run(server, lambda pm: pm.get_playlist_videos(playlist_id))
+    assert [v['video_id'] for v in videos] == video_ids
+
+
+def test_create_and_add_in_order(server):
+    video_ids = [f"vid{i:05d}" for i in range(30)]
+
+    async def create_and_fill(pm):
+        playlist_id = await pm.create_new_playlist('Shuffled')
+        return playlist_id, await pm.add_videos_to_playlist(playlist_id, video_ids,
+                                                             positions=list(range(30)))
+
+    playlist_id, (added, failed) = run(server, create_and_fill)
+    assert (added, failed) == (30, [])
+    assert server.state.playlists[playlist_id]['items'] == video_ids
+
+
+def test_network_errors_are_retried_for_reads_only(server):
+    playlist_id = server.state.add_playlist('List', ['v1', 'v2'])
+    server.state.inject_disconnect(method='GET')
+    server.state.inject_disconnect(method='POST')
+
+    async def read_and_add(pm):
+        return (await pm.get_playlist_videos(playlist_id),
+                await pm.add_videos_to_playlist(playlist_id, ['a', 'b']))
+
+    videos, (added, failed) = run(server, read_and_add)
+    assert len(videos) == 2
+    # The dropped insert is reported, not sent twice (it did reach the server)
+    assert added == 1 and [f['video_id'] for f in failed] == ['a']
+    assert server.state.playlists[playlist_id]['items'] == ['v1', 'v2', 'a', 'b']
+
+
+def test_failed_inserts_are_reported(server):
+    added, failed = run(server, lambda pm: pm.add_videos_to_playlist('missing', ['a', 'b']))
+    assert added == 0
+    assert [f['position'] for f in failed] == [1, 2]
+
+
+def test_parallel_reads_take_about_as_long_as_the_slowest(server):
+    server.state.latency = 0.05
+    ids = [server.state.add_playlist(f"List {i}", [f"v{j}" for j in range(150)]) for i in range(4)]
+
+    start = time.perf_counter()
+    results = run(server, lambda pm: pm.get_many_playlist_videos(ids))
+    elapsed = time.perf_counter() - start
+
+    assert all(len(videos) == 150 for videos in results.values())
+    # 4 playlists x 3 pages x 50ms would be 0.6s one after another
+    assert elapsed < 0.4
@@ -0,0 +1,90 @@
+# Tests for the fake YouTube server itself: ETags, batches, injected errors, quota
+# Run: python -m pytest test/test_fake_youtube_server.py
+
+import pytest
+from googleapiclient.errors import HttpError
+from fake_youtube_server import FakeYouTubeServer, FakeYouTubeState, build_fake_service
+from conftest import fast_executor
+from request_executor import QUOTA, classify_error
+
+
+@pytest.fixture
+def server(server):
+    server.state.add_playlist('Target', playlist_id='PLdst')
+    server.state.reset_counters()
+    return server
+
+
+def test_unchanged_page_returns_304(server):
+    youtube = build_fake_service(server)
+    first = youtube.playlistItems().list(part='snippet', playlistId='PLsrc', maxResults=50).execute()
+    request = youtube.playlistItems().list(part='snippet', playlistId='PLsrc', maxResults=50)
+    request.headers['If-None-Match'] = first['etag']
+    with pytest.raises(HttpError) as raised:
+        request.execute()
+    assert raised.value.resp.status == 304
+
+    server.state.playlists['PLsrc']['items'][0] = 'changed'
+    request = youtube.playlistItems().list(part='snippet', playlistId='PLsrc', maxResults=50)
+    request.headers['If-None-Match'] = first['etag']
+    assert request.execute()['etag'] != first['etag']
+
+
+def test_batch_inserts_and_quota_counter(server, make_manager):
+    added, failed = make_manager(server).add_videos_to_playlist('PLdst', [f"v{i}" for i in range(120)])
+    assert (added, failed) == (120, [])
+    assert server.state.playlists['PLdst']['items'] == [f"v{i}" for i in range(120)]
+    assert server.state.round_trips == 3            # 50 + 50 + 20
+    assert server.state.calls == {'POST playlistItems': 120}
+    assert server.state.quota_used == 120 * 50
+
+
+def test_inserts_without_positions_are_appended(server, make_manager):
+    server.state.playlists['PLdst']['items'] = ['old1', 'old2']
+    assert make_manager(server).add_videos_to_playlist('PLdst', ['a', 'b', 'c']) == (3, [])
+    assert server.state.playlists['PLdst']['items'] == ['old1', 'old2', 'a', 'b', 'c']
+
+
+def test_create_is_not_resent_after_a_dropped_connection(server, make_manager):
+    # httplib2 itself resends once on a dropped keep-alive connection; the executor must not add more
+    server.state.inject_disconnect(count=2, method='POST', resource='playlists')
+    assert make_manager(server).create_new_playlist('Shuffled') is None
+    assert server.state.calls == {'POST playlists': 2}
+
+
+def test_batch_of_inserts_is_not_resent_after_a_dropped_connection(server):
+    youtube = build_fake_service(server)
+    batch = youtube.new_batch_http_request()
+    for video_id in ['a', 'b', 'c', 'd']:
+        batch.add(youtube.playlistItems().insert(part='snippet', body={'snippet': {
+            'playlistId': 'PLdst', 'resourceId': {'kind': 'youtube#video', 'videoId': video_id}}}))
+    server.state.inject_disconnect(count=2, method='POST', resource='playlistItems')
+    with pytest.raises(ConnectionError):
+        fast_executor().execute(batch)
+    # Both drops hit the first part (httplib2's own resend included); nothing was sent again after that
+    assert server.state.calls == {'POST playlistItems': 2}
+    assert server.state.playlists['PLdst']['items'] == ['a', 'a']
+
+
+def test_injected_errors_are_retried(server, make_manager):
+    server.state.inject_error(409, method='POST', count=3)
+    server.state.inject_error(503, method='GET')
+    pm = make_manager(server)
+    assert len(pm.get_playlist_videos('PLsrc', 120)) == 120
+    assert pm.add_videos_to_playlist('PLdst', ['a', 'b', 'c', 'd'], positions=[0, 1, 2, 3])[0] == 4
+    assert not server.state.faults
+    assert server.state.playlists['PLdst']['items'] == ['a', 'b', 'c', 'd']
+
+
+def test_quota_limit_returns_quota_exceeded():
+    with FakeYouTubeServer(FakeYouTubeState(quota_limit=120)) as server:
+        server.state.add_playlist('Target', playlist_id='PLdst')
+        youtube = build_fake_service(server)
+        insert = lambda: youtube.playlistItems().insert(part='snippet', body={'snippet': {
+            'playlistId': 'PLdst', 'resourceId': {'kind': 'youtube#video', 'videoId': 'v'}}}).execute()
+        insert()
+        insert()
+        with pytest.raises(HttpError) as raised:
+            insert()
+        assert classify_error(raised.value) == QUOTA
+        assert server.state.quota_used == 100
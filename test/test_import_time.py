@@ -0,0 +1,41 @@
+# Guards cold-start latency: the GUI and CLI must not import the Google client
+# libraries until they are needed (see the comment at the top of main_gui.py)
+# Run: python -m pytest test/test_import_time.py
+# Budget override: IMPORT_BUDGET_MS=300 python -m pytest test/test_import_time.py
+
+import sys
+import os
+import subprocess
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 200))   # Both measure ~35ms; the client stack alone ~400ms
+HEAVY = ('googleapiclient', 'google_auth_oauthlib', 'google_auth_httplib2', 'httplib2',
+         'google.auth.transport.requests', 'requests', 'youtube_session', 'api_test', 'playlist_manager')
+
+
+def import_times(module):
+    """
+    Import a module in a fresh interpreter with -X importtime
+    Returns: dictionary of module name -> cumulative import time in ms
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, _, cumulative, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+        times[name] = int(cumulative) / 1000     # Reported in microseconds
+    return times
+
+
+@pytest.mark.parametrize('module', ['main_gui', 'shuffler_cli'])
+def test_startup_skips_client_libraries(module):
+    if module == 'main_gui':
+        pytest.importorskip('tkinter')
+    times = import_times(module)
+    loaded = [name for name in times if name in HEAVY or name.startswith(tuple(h + '.' for h in HEAVY))]
+    assert not loaded, f"{module} imports {loaded} at startup"
+    assert times[module] < BUDGET_MS, f"import {module} took {times[module]:.0f}ms"
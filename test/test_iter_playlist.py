@@ -0,0 +1,52 @@
+# Tests for streaming playlist pagination (no network needed)
+# Run: python -m pytest test/test_iter_playlist.py
+
+import pytest
+from conftest import FakeService, FakeRequest, make_error
+from playlist_manager import PlaylistManager, PlaylistFetchError
+from request_executor import RequestExecutor
+
+
+class FailingService(FakeService):
+    """Fails the page starting at fail_at once with a 404, then behaves"""
+    def __init__(self, video_ids, fail_at):
+        super().__init__(video_ids, page_size=2)
+        self.fail_at = fail_at
+
+    def list(self, part, playlistId, maxResults, pageToken):
+        if pageToken == self.fail_at:
+            self.fail_at = None
+            def fail():
+                raise make_error(404)
+            return FakeRequest(fail)
+        return super().list(part, playlistId, maxResults, pageToken)
+
+
+def test_pages_are_yielded_in_order():
+    pm = PlaylistManager(FakeService(list('abcde'), page_size=2))
+    pages = list(pm.iter_playlist_pages('PL1'))
+    assert [p['page_index'] for p in pages] == [0, 1, 2]
+    assert [v['video_id'] for v in pm.iter_playlist_videos('PL1')] == list('abcde')
+
+
+def test_failed_page_can_be_resumed():
+    pm = PlaylistManager(FailingService(list('abcdef'), fail_at='4'),
+                         RequestExecutor(sleep=lambda seconds: None))
+    seen = []
+    with pytest.raises(PlaylistFetchError) as info:
+        for video in pm.iter_playlist_videos('PL1'):
+            seen.append(video['video_id'])
+    assert seen == list('abcd')
+    assert info.value.page_index == 2
+    assert info.value.page_token == '4'
+
+    pages = list(pm.iter_playlist_pages('PL1', page_token=info.value.page_token,
+                                        page_index=info.value.page_index))
+    assert [page['page_index'] for page in pages] == [2]     # Still counted from the first page
+    seen += [v['video_id'] for page in pages for v in page['videos']]
+    assert seen == list('abcdef')
+
+
+def test_get_playlist_videos_keeps_partial_results():
+    pm = PlaylistManager(FailingService(list('abcdef'), fail_at='2'))
+    assert [v['video_id'] for v in pm.get_playlist_videos('PL1')] == list('ab')
@@ -0,0 +1,104 @@
+# Tests for the resumable shuffle job journal (no network needed)
+# Run: python -m pytest test/test_job_journal.py
+
+import threading
+
+import pytest
+from conftest import FakeService, fast_executor
+from fake_youtube_server import FakeYouTubeServer, FakeYouTubeState
+from job_journal import JobJournal, find_unfinished_jobs, run_job
+from playlist_manager import OperationCancelled, PlaylistManager
+
+
+def test_interrupted_job_resumes_where_it_stopped(tmp_path):
+    jobs_dir = str(tmp_path)
+    video_ids = [f"v{i}" for i in range(120)]
+    service = FakeService(quota_left=70)
+    pm = PlaylistManager(service)
+
+    journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids, jobs_dir=jobs_dir)
+    added, failed = run_job(pm, journal, max_workers=1)
+    assert added == 70 and len(failed) == 50
+    assert find_unfinished_jobs(jobs_dir) == [journal.path]
+
+    # Quota is back; a fresh process replays the journal and only inserts what is missing
+    service.quota_left = 1000
+    resumed = JobJournal.load(journal.path)
+    assert resumed.target_playlist_id == 'PLnew'
+    assert len(resumed.inserted) == 70
+    added, failed = run_job(pm, resumed, max_workers=1)
+    assert (added, failed) == (50, [])
+    assert service.created == 1
+    assert service.video_ids == video_ids
+    assert find_unfinished_jobs(jobs_dir) == []
+
+
+def test_inserts_that_lost_their_answer_are_not_sent_twice(tmp_path):
+    video_ids = [f"v{i}" for i in range(120)]
+    service = FakeService(drop_answers=1)   # The first batch goes through, its answer does not
+    journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids, jobs_dir=str(tmp_path))
+    added, failed = run_job(PlaylistManager(service, fast_executor()), journal)
+    assert (added, failed) == (120, [])
+    assert service.video_ids == video_ids
+    assert len(JobJournal.load(journal.path).inserted) == 120
+
+    # Without knowing what the playlist held before, nothing is sent blindly a second time
+    service = FakeService(['old'], drop_answers=1)
+    added, failed = PlaylistManager(service, fast_executor()).add_videos_to_playlist('PLdst', ['a', 'b'])
+    assert added == 0 and [failure['video_id'] for failure in failed] == ['a', 'b']
+    assert service.video_ids == ['old', 'a', 'b']
+
+
+def test_a_video_that_cannot_be_added_leaves_no_gap(tmp_path):
+    # FakeService rejects positions past the end, as the API does
+    video_ids = [f"v{i}" for i in range(120)]
+    service = FakeService(unavailable={'v3'})
+    journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids, jobs_dir=str(tmp_path))
+    added, failed = run_job(PlaylistManager(service, fast_executor()), journal, batch_size=10)
+    assert added == 119 and [failure['video_id'] for failure in failed] == ['v3']
+    assert service.video_ids == video_ids[:3] + video_ids[4:]
+
+    # Positions between videos already there are counted among the slots actually filled
+    service = FakeService(['x', 'y'], unavailable={'b'})
+    added, failed = PlaylistManager(service, fast_executor()).add_videos_to_playlist(
+        'PLdst', ['a', 'b', 'c', 'd'], positions=[0, 1, 2, 4], batch_size=1, existing=['x', 'y'])
+    assert added == 3 and [failure['position'] for failure in failed] == [2]
+    assert service.video_ids == ['a', 'c', 'x', 'd', 'y']
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', ['a', 'b'],
+                                jobs_dir=str(tmp_path))
+    journal.record_inserted([0])
+    with open(journal.path, 'a') as f:
+        f.write('{"type": "inserted", "posi')
+    assert JobJournal.load(journal.path).remaining() == (['b'], [1])
+
+
+def test_cancelled_job_keeps_inserted_batches_and_resumes(tmp_path):
+    video_ids = [f"v{i}" for i in range(120)]
+    service = FakeService(quota_left=1000)
+    pm = PlaylistManager(service)
+    cancel = threading.Event()
+    pm.metrics.subscribe(lambda event: event['event'] == 'inserted' and cancel.set())
+
+    journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids, jobs_dir=str(tmp_path))
+    with pytest.raises(OperationCancelled) as cancelled:
+        run_job(pm, journal, max_workers=1, cancel=cancel)
+    assert cancelled.value.added_count == 50     # The batch in flight finished, no new one started
+    assert len(JobJournal.load(journal.path).inserted) == 50
+
+    cancel.clear()
+    resumed = JobJournal.load(journal.path)
+    added, failed = run_job(PlaylistManager(service), resumed, max_workers=1)
+    assert (added, failed) == (70, [])
+    assert service.video_ids == video_ids
+
+
+def test_finished_job_fixes_batch_parts_applied_out_of_order(tmp_path, make_manager):
+    with FakeYouTubeServer(FakeYouTubeState(shuffle_batches=True)) as server:
+        video_ids = [f"v{i}" for i in range(120)]
+        journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids,
+                                    jobs_dir=str(tmp_path))
+        assert run_job(make_manager(server), journal, log=lambda message: None) == (120, [])
+        assert server.state.playlists[journal.target_playlist_id]['items'] == video_ids
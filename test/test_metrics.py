@@ -0,0 +1,61 @@
+# Tests for per-call metrics, spans and hooks against the fake server
+# Run: python -m pytest test/test_metrics.py
+
+import pytest
+from metrics import Metrics
+
+
+def test_every_call_is_recorded(server, make_manager):
+    server.state.inject_error(503, method='GET')
+    pm = make_manager(server)
+    events = []
+    pm.metrics.subscribe(events.append)
+    assert len(pm.get_playlist_videos('PLsrc', 120)) == 120
+
+    metrics = pm.metrics
+    assert metrics.counter('api_calls_total', endpoint='playlistItems.list', status='200') == 3
+    assert metrics.counter('api_calls_total', status='503') == 1
+    assert metrics.counter('api_retries_total') == 1
+    assert metrics.counter('quota_units_total') == 4          # failed attempts are charged too
+    assert metrics.counter('response_bytes_total') > 0
+    assert metrics.histogram('api_latency_seconds', endpoint='playlistItems.list').count == 4
+    assert [e['page_index'] for e in events if e['event'] == 'page_fetched'] == [0, 1, 2]
+
+
+def test_job_phases_become_nested_spans(server, make_manager):
+    pm = make_manager(server)
+    with pm.metrics.span('job') as job:
+        videos = pm.shuffle_videos(pm.get_playlist_videos('PLsrc', 120))
+        playlist_id = pm.create_new_playlist('Shuffled')
+        pm.add_videos_to_playlist(playlist_id, [v['video_id'] for v in videos])
+
+    spans = {span['name']: span for span in pm.metrics.spans}
+    assert set(spans) == {'job', 'fetch', 'shuffle', 'create', 'insert'}
+    assert all(span['trace_id'] == job['trace_id'] for span in spans.values())
+    assert spans['insert']['parent_id'] == job['span_id']
+    assert pm.metrics.histogram('phase_seconds', phase='insert').count == 1
+
+
+def test_failed_span_and_broken_hook():
+    metrics = Metrics()
+    metrics.subscribe(lambda event: 1 / 0)     # Must not break the caller
+    with pytest.raises(ValueError):
+        with metrics.span('fetch'):
+            raise ValueError("boom")
+    assert metrics.spans[-1]['status'] == 'error'
+
+
+def test_prometheus_and_json_export():
+    metrics = Metrics()
+    metrics.record_call('playlistItems.insert', 409, 0.02, attempt=1, units=50)
+    metrics.record_call('playlistItems.insert', 200, 0.3, attempt=2, units=50)
+    text = metrics.to_prometheus()
+    assert '# TYPE shuffler_api_calls_total counter' in text
+    assert 'shuffler_api_calls_total{endpoint="playlistItems.insert",status="409"} 1' in text
+    assert 'shuffler_api_latency_seconds_bucket{endpoint="playlistItems.insert",le="0.025"} 1' in text
+    assert 'shuffler_api_latency_seconds_bucket{endpoint="playlistItems.insert",le="+Inf"} 2' in text
+    assert 'shuffler_quota_units_total{endpoint="playlistItems.insert"} 100' in text
+
+    snapshot = metrics.snapshot()
+    latency = [h for h in snapshot['histograms'] if h['name'] == 'api_latency_seconds'][0]
+    assert latency['count'] == 2 and latency['p99'] == 0.5
@@ -0,0 +1,83 @@
+# Tests for the in-place reshuffle move planner (no network needed)
+# Run: python -m pytest test/test_move_planner.py
+
+import random
+
+import pytest
+from conftest import FakeService, FakeRequest, make_error
+from move_planner import longest_increasing_subsequence, plan_moves, partial_shuffle
+from playlist_manager import PlaylistManager, PlaylistFetchError
+
+
+def apply_moves(items, moves):
+    items = list(items)
+    for item, position in moves:
+        items.remove(item)
+        items.insert(position, item)
+    return items
+
+
+def test_longest_increasing_subsequence():
+    sequence = [3, 1, 4, 1, 5, 9, 2, 6]
+    indexes = longest_increasing_subsequence(sequence)
+    values = [sequence[i] for i in indexes]
+    assert len(values) == 4
+    assert values == sorted(set(values))
+    assert longest_increasing_subsequence([]) == []
+
+
+def test_moves_reach_target_with_minimal_count():
+    random.seed(7)
+    for n in (0, 1, 2, 10, 300):
+        current = [f"item{i}" for i in range(n)]
+        target = random.sample(current, n)
+        moves = plan_moves(current, target)
+        assert apply_moves(current, moves) == target
+        ranks = [target.index(item) for item in current]
+        assert len(moves) == n - len(longest_increasing_subsequence(ranks))
+
+
+def test_partial_shuffle_bounds_moves():
+    current = list(range(500))
+    target = partial_shuffle(current, 20)
+    assert sorted(target) == current
+    assert len(plan_moves(current, target)) <= 20
+
+
+def test_reshuffle_in_place_moves_only_what_is_needed():
+    service = FakeService(list('abcdefgh'))
+    pm = PlaylistManager(service)
+    target = [{'video_id': v, 'title': v, 'item_id': f"item-{v}"} for v in 'abcdhefg']
+
+    moved, failed = pm.reshuffle_in_place('PL1', target)
+    assert (moved, failed) == (1, [])
+    assert service.video_ids == list('abcdhefg')
+
+
+def test_reshuffle_stops_at_the_first_failed_move():
+    class RejectingService(FakeService):
+        def update(self, part, body):
+            def reject():
+                self.updates += 1
+                raise make_error(400, 'invalidValue')
+            return FakeRequest(reject)
+
+    service = RejectingService(list('abcdefgh'))
+    target = [{'video_id': v, 'title': v, 'item_id': f"item-{v}"} for v in 'hgfedcba']
+    moved, failed = PlaylistManager(service).reshuffle_in_place('PL1', target)
+    assert (moved, len(failed), service.updates) == (0, 1, 1)
+
+
+def test_reshuffle_of_a_partly_read_playlist_raises():
+    class BrokenService(FakeService):
+        def list(self, part, playlistId, maxResults, pageToken):
+            if pageToken == '2':
+                def fail():
+                    raise make_error(404)
+                return FakeRequest(fail)
+            return super().list(part, playlistId, maxResults, pageToken)
+
+    service = BrokenService(list('abcdefgh'), page_size=2)
+    with pytest.raises(PlaylistFetchError):
+        PlaylistManager(service).reshuffle_in_place('PL1')
+    assert service.updates == 0
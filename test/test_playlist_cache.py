@@ -0,0 +1,48 @@
+# Tests for the ETag playlist cache (no network needed)
+# Run: python -m pytest test/test_playlist_cache.py
+
+from conftest import FakeService
+from playlist_cache import PlaylistCache
+from playlist_manager import PlaylistManager
+
+
+def test_unchanged_playlist_is_served_from_cache(tmp_path):
+    service = FakeService(['a', 'b', 'c', 'd', 'e'], page_size=2)
+    pm = PlaylistManager(service, cache=PlaylistCache(str(tmp_path / 'cache.db')))
+
+    first = pm.get_playlist_videos('PL1')
+    assert service.downloads == 3
+    second = pm.get_playlist_videos('PL1', item_count=5)
+    assert second == first
+    assert service.downloads == 3
+    assert service.not_modified == 3
+
+
+def test_item_count_mismatch_drops_entry(tmp_path):
+    service = FakeService(['a', 'b', 'c'], page_size=2)
+    pm = PlaylistManager(service, cache=PlaylistCache(str(tmp_path / 'cache.db')))
+    pm.get_playlist_videos('PL1')
+
+    service.video_ids.append('d')
+    videos = pm.get_playlist_videos('PL1', item_count=4)
+    assert [v['video_id'] for v in videos] == ['a', 'b', 'c', 'd']
+    assert service.not_modified == 0
+
+
+def test_dropped_entry_is_gone_for_other_connections(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = PlaylistCache(path)
+    PlaylistManager(FakeService(['a', 'b', 'c']), cache=cache).get_playlist_videos('PL1')
+    assert cache.get_pages('PL1', item_count=4) == []
+    assert PlaylistCache(path).get_pages('PL1') == []
+
+
+def test_least_recently_used_playlist_is_evicted(tmp_path):
+    cache = PlaylistCache(str(tmp_path / 'cache.db'), max_playlists=2)
+    page = {'page_token': None, 'etag': 'e', 'next_page_token': None, 'videos': []}
+    cache.store('PL1', [page])
+    cache.store('PL2', [page])
+    cache.get_pages('PL1')
+    cache.store('PL3', [page])
+    assert cache.get_pages('PL2') == []
+    assert cache.get_pages('PL1') and cache.get_pages('PL3')
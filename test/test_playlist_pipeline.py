@@ -0,0 +1,86 @@
+# Tests for merging, deduping and sampling many playlists against the fake server
+# Run: python -m pytest test/test_playlist_pipeline.py
+
+import random
+import threading
+
+import pytest
+from playlist_manager import PlaylistFetchError
+from playlist_pipeline import (BloomFilter, SeenSet, dedupe, hash_sample, merge_playlists,
+                               reservoir_sample, stream_playlists)
+
+
+@pytest.fixture
+def server(fake_server):
+    for i in range(300):
+        fake_server.state.add_video(f"vid{i:04d}", duration=f"PT{i}S")
+    # Three playlists of 120 videos overlapping by 30: 300 distinct videos
+    ids = [f"vid{i:04d}" for i in range(300)]
+    fake_server.state.add_playlist('A', ids[0:120], playlist_id='PLA')
+    fake_server.state.add_playlist('B', ids[90:210], playlist_id='PLB')
+    fake_server.state.add_playlist('C', ids[180:300], playlist_id='PLC')
+    return fake_server
+
+
+def test_merge_drops_duplicates(server, make_manager):
+    videos = merge_playlists(make_manager(server), ['PLA', 'PLB', 'PLC'], max_workers=3)
+    assert sorted(v['video_id'] for v in videos) == [f"vid{i:04d}" for i in range(300)]
+
+
+def test_sample_is_reproducible_and_distinct(server, make_manager):
+    pm = make_manager(server)
+    # Pages of the three playlists arrive in a different order every run
+    runs = [[v['video_id'] for v in merge_playlists(pm, ['PLA', 'PLB', 'PLC'], sample_size=50, seed=7)]
+            for _ in range(5)]
+    assert len(set(runs[0])) == 50
+    assert all(run == runs[0] for run in runs)
+
+
+def test_top_k_by_metadata_field(server, make_manager):
+    videos = merge_playlists(make_manager(server), ['PLA', 'PLB', 'PLC'], sample_size=5,
+                             top_by='duration_seconds')
+    assert sorted(v['duration_seconds'] for v in videos) == [295, 296, 297, 298, 299]
+
+
+def test_failing_source_raises(server, make_manager):
+    with pytest.raises(PlaylistFetchError):
+        merge_playlists(make_manager(server), ['PLA', 'PLmissing'], max_workers=2)
+
+
+def test_closing_early_stops_the_fetchers(server, make_manager):
+    before = set(threading.enumerate())
+    stream = stream_playlists(make_manager(server), ['PLA', 'PLB', 'PLC'], buffer_pages=1)
+    assert next(stream)['source_playlist_id'] in ('PLA', 'PLB', 'PLC')
+    stream.close()
+    # Ignore the fake server's per-connection threads
+    started = [t for t in set(threading.enumerate()) - before if 'process_request' not in t.name]
+    for thread in started:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in started)
+
+
+def test_reservoir_sample_is_uniform():
+    rng = random.Random(1)
+    counts = [0] * 10
+    for _ in range(5000):
+        for item in reservoir_sample(range(10), 3, rng):
+            counts[item] += 1
+    assert all(1300 < count < 1700 for count in counts)    # 1500 expected
+
+
+def test_hash_sample_ignores_order_and_is_uniform():
+    videos = [{'video_id': f"v{i}"} for i in range(10)]
+    assert hash_sample(videos, 3, seed=5) == hash_sample(videos[::-1], 3, seed=5)
+    counts = {video['video_id']: 0 for video in videos}
+    for seed in range(5000):
+        for video in hash_sample(videos, 3, seed):
+            counts[video['video_id']] += 1
+    assert all(1300 < count < 1700 for count in counts.values())    # 1500 expected
+
+
+def test_bloom_filter_matches_set_with_few_false_positives():
+    ids = [f"v{i}" for i in range(20000)]
+    bloom_kept = list(dedupe(({'video_id': i} for i in ids + ids[:5000]), BloomFilter(20000, 0.01)))
+    set_kept = list(dedupe(({'video_id': i} for i in ids + ids[:5000]), SeenSet()))
+    assert len(set_kept) == 20000
+    assert 20000 * 0.97 < len(bloom_kept) <= 20000
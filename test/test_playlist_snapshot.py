@@ -0,0 +1,75 @@
+# Tests for binary and JSON Lines playlist snapshots
+# Run: python -m pytest test/test_playlist_snapshot.py
+
+import time
+
+import pytest
+from fake_youtube_server import FakeYouTubeServer, build_fake_service
+from playlist_cache import PlaylistCache
+from playlist_manager import PlaylistManager
+from playlist_snapshot import save_snapshot, load_snapshot
+
+VIDEOS = [{'video_id': f"vid{i:08d}", 'title': f"Título {i} ♫" * (i % 3), 'item_id': f"item{i}" if i % 4 else None}
+          for i in range(30)]
+
+
+@pytest.mark.parametrize('name', ['playlist.ysnap', 'playlist.jsonl'])
+def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    assert save_snapshot(path, VIDEOS, 'PLx', 'Mix', fetched_at=123.5) == 30
+    with load_snapshot(path) as snapshot:
+        assert (snapshot.playlist_id, snapshot.title, snapshot.fetched_at, len(snapshot)) == ('PLx', 'Mix', 123.5, 30)
+        assert [dict(v, position=i) for i, v in enumerate(VIDEOS)] == list(snapshot)
+        assert snapshot[-1]['video_id'] == 'vid00000029'
+        assert snapshot.video_ids() == [v['video_id'] for v in VIDEOS]
+
+
+def test_shuffle_result_keeps_positions(tmp_path):
+    path = str(tmp_path / 'shuffled.ysnap')
+    videos = [dict(video, position=position) for video, position in zip(VIDEOS, reversed(range(30)))]
+    save_snapshot(path, videos)
+    with load_snapshot(path) as snapshot:
+        assert [v['position'] for v in snapshot] == list(reversed(range(30)))
+        assert len(snapshot.to_store()) == 30
+
+
+def test_empty_and_foreign_files(tmp_path):
+    path = str(tmp_path / 'empty.ysnap')
+    save_snapshot(path, [])
+    with load_snapshot(path) as snapshot:
+        assert len(snapshot) == 0 and list(snapshot) == []
+
+    (tmp_path / 'other.ysnap').write_bytes(b'not a snapshot at all')
+    with pytest.raises(ValueError):
+        load_snapshot(str(tmp_path / 'other.ysnap'))
+
+
+def test_large_snapshot_opens_without_reading_it(tmp_path):
+    path = str(tmp_path / 'big.ysnap')
+    save_snapshot(path, ({'video_id': f"v{i:010d}", 'title': f"Video {i}", 'item_id': f"UEx{i:030d}"}
+                         for i in range(100_000)))
+    start = time.perf_counter()
+    snapshot = load_snapshot(path)
+    assert time.perf_counter() - start < 0.05
+    assert snapshot[99_999]['item_id'] == f"UEx{99_999:030d}"
+    snapshot.close()
+
+
+def test_export_from_api_seeds_cache_and_fixtures(tmp_path):
+    with FakeYouTubeServer() as server:
+        server.state.add_playlist('Source', [f"v{i}" for i in range(120)], playlist_id='PLsrc')
+        pm = PlaylistManager(build_fake_service(server))
+        path = str(tmp_path / 'PLsrc.ysnap')
+        assert pm.export_snapshot('PLsrc', path, title='Source') == 120
+
+    with load_snapshot(path) as snapshot:
+        assert len(snapshot.pages()) == 3 and snapshot.etag == snapshot.pages()[0]['etag']
+        # A snapshot is enough to set up a fake server...
+        with FakeYouTubeServer() as server:
+            server.state.add_playlist(snapshot.title, snapshot.video_ids(), playlist_id=snapshot.playlist_id)
+            # ...and to fill the cache, so unchanged pages cost only a 304
+            cache = PlaylistCache(str(tmp_path / 'cache.db'))
+            cache.store(snapshot.playlist_id, snapshot.pages())
+            pm = PlaylistManager(build_fake_service(server), cache=cache)
+            assert [v['video_id'] for v in pm.get_playlist_videos('PLsrc')] == snapshot.video_ids()
+            assert pm.metrics.counter('api_calls_total', status='304') == 3
@@ -0,0 +1,73 @@
+# Tests for diff-based sync of a shuffled copy against the fake server
+# Run: python -m pytest test/test_playlist_sync.py
+
+from collections import Counter
+
+import pytest
+from conftest import SOURCE_IDS
+from playlist_cache import PlaylistCache
+from playlist_manager import PlaylistFetchError
+
+
+@pytest.fixture
+def server(server):
+    server.state.add_playlist('Copy', SOURCE_IDS[::-1], playlist_id='PLcopy')   # Stands in for a shuffle
+    server.state.reset_counters()
+    return server
+
+
+def test_only_the_difference_is_written(server, make_manager):
+    state = server.state
+    source = state.playlists['PLsrc']['items']
+    source.remove('v5')
+    source.remove('v77')
+    source.extend(['new1', 'new2', 'new3'])
+    for video_id in ('new1', 'new2', 'new3'):
+        state.add_video(video_id)
+    state.reset_counters()
+
+    added, removed, failed = make_manager(server).sync_playlist('PLsrc', 'PLcopy', seed=1)
+
+    target = state.playlists['PLcopy']['items']
+    assert (added, removed, failed) == (3, 2, [])
+    assert Counter(target) == Counter(source)
+    # Everything that stayed keeps its order
+    assert [v for v in target if v.startswith('v')] == [v for v in SOURCE_IDS[::-1] if v not in ('v5', 'v77')]
+    assert state.calls['DELETE playlistItems'] == 2 and state.calls['POST playlistItems'] == 3
+    assert state.quota_used == 6 + 5 * 50      # 3 + 3 list pages, 5 writes
+
+
+def test_unchanged_playlists_cost_only_revalidation(server, make_manager, tmp_path):
+    pm = make_manager(server, cache=PlaylistCache(str(tmp_path / 'cache.db')))
+    assert pm.sync_playlist('PLsrc', 'PLcopy') == (0, 0, [])
+    server.state.reset_counters()
+
+    assert pm.sync_playlist('PLsrc', 'PLcopy', 120, 120) == (0, 0, [])
+    assert set(server.state.calls) == {'GET playlistItems'}
+
+
+def test_duplicates_are_matched_by_count(server, make_manager):
+    server.state.playlists['PLsrc']['items'] += ['v1', 'v1']
+    server.state.playlists['PLcopy']['items'] += ['v2']
+    added, removed, failed = make_manager(server).sync_playlist('PLsrc', 'PLcopy')
+
+    assert (added, removed) == (2, 1)
+    assert Counter(server.state.playlists['PLcopy']['items']) == Counter(server.state.playlists['PLsrc']['items'])
+
+
+def test_failed_fetch_deletes_nothing(server, make_manager):
+    server.state.playlists['PLsrc']['items'].remove('v0')
+    server.state.inject_error(404, 'playlistNotFound', count=10, method='GET')
+    with pytest.raises(PlaylistFetchError):
+        make_manager(server).sync_playlist('PLsrc', 'PLcopy')
+    assert len(server.state.playlists['PLcopy']['items']) == 120
+    assert 'DELETE playlistItems' not in server.state.calls
+
+
+def test_failed_delete_is_reported(server, make_manager):
+    server.state.playlists['PLsrc']['items'].remove('v0')
+    server.state.inject_error(403, 'forbidden', method='DELETE')
+    added, removed, failed = make_manager(server).sync_playlist('PLsrc', 'PLcopy')
+
+    assert (added, removed) == (0, 0)
+    assert [(f['video_id'], f['position']) for f in failed] == [('v0', 120)]
@@ -0,0 +1,88 @@
+# Tests for quota accounting and the budget-aware scheduler (no network needed)
+# Run: python -m pytest test/test_quota.py
+
+from datetime import datetime, timezone
+
+import pytest
+from conftest import FakeService, fast_executor
+from fake_youtube_server import FakeYouTubeServer, FakeYouTubeState
+from job_journal import JobJournal, run_job
+from playlist_manager import PlaylistManager
+from quota import QuotaLedger, QuotaScheduler, QuotaBudgetError, next_reset, quota_day
+from request_executor import RequestExecutor
+
+
+def test_quota_day_follows_pacific_midnight():
+    # 06:30 UTC on July 2nd is still July 1st in California (PDT, UTC-7)
+    assert quota_day(datetime(2026, 7, 2, 6, 30, tzinfo=timezone.utc)) == '2026-07-01'
+    assert next_reset(datetime(2026, 7, 2, 6, 30, tzinfo=timezone.utc)) == \
+        datetime(2026, 7, 2, 7, 0, tzinfo=timezone.utc)
+    assert next_reset(datetime(2026, 1, 2, 9, 0, tzinfo=timezone.utc)) == \
+        datetime(2026, 1, 3, 8, 0, tzinfo=timezone.utc)
+
+
+def test_ledger_persists_per_project(tmp_path):
+    path = str(tmp_path / 'ledger.json')
+    ledger = QuotaLedger(path, project='a', daily_limit=100)
+    ledger.record('insert', 50)
+    ledger.record('list', 1)
+    assert QuotaLedger(path, project='a', daily_limit=100).remaining() == 49
+    assert QuotaLedger(path, project='b', daily_limit=100).remaining() == 100
+
+
+def test_scheduler_decisions(tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'ledger.json'), daily_limit=1000)
+    scheduler = QuotaScheduler(ledger)
+    assert scheduler.estimate(10) == 10 * 50 + 1 + 50
+    assert scheduler.check(900) == 'run'
+    assert scheduler.check(5000) == 'split'
+    with pytest.raises(QuotaBudgetError):
+        scheduler.check(5000, allow_split=False)
+    ledger.mark_exhausted()
+    assert scheduler.check(100) == 'queue'
+
+
+def test_job_is_split_across_quota_days(tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'ledger.json'), daily_limit=50 * 40)
+    pm = PlaylistManager(FakeService(quota_left=10000), RequestExecutor(ledger=ledger))
+    scheduler = QuotaScheduler(ledger)
+    resets = []
+
+    def fake_reset(log=print):
+        resets.append(ledger.spent())
+        ledger._data.clear()    # A new quota day
+
+    scheduler.wait_for_reset = fake_reset
+    video_ids = [f"v{i}" for i in range(100)]
+    journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids,
+                                jobs_dir=str(tmp_path))
+    added, failed = run_job(pm, journal, log=lambda message: None, scheduler=scheduler, max_workers=1)
+
+    assert (added, failed) == (100, [])
+    assert journal.done
+    assert len(resets) == 2
+    assert all(spent <= ledger.daily_limit for spent in resets)
+
+
+def test_server_side_quota_exhaustion_waits_for_reset(tmp_path, make_manager):
+    # The ledger thinks there is plenty left; only the server knows better
+    ledger = QuotaLedger(str(tmp_path / 'ledger.json'), daily_limit=100000)
+    with FakeYouTubeServer(FakeYouTubeState(quota_limit=3000)) as server:
+        pm = make_manager(server, fast_executor(ledger=ledger))
+        scheduler = QuotaScheduler(ledger)
+        resets = []
+
+        def fake_reset(log=print):
+            resets.append(ledger.remaining())
+            server.state.reset_counters()
+            ledger._data.clear()
+
+        scheduler.wait_for_reset = fake_reset
+        video_ids = [f"v{i}" for i in range(100)]
+        journal = JobJournal.create({'id': 'PLsrc', 'title': 'Source'}, 'Shuffled', video_ids,
+                                    jobs_dir=str(tmp_path))
+        added, failed = run_job(pm, journal, log=lambda message: None, scheduler=scheduler)
+
+        assert (added, failed) == (100, [])
+        assert resets and resets[0] == 0        # quotaExceeded in a batch part marked the ledger
+        assert server.state.playlists[journal.target_playlist_id]['items'] == video_ids
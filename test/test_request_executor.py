@@ -0,0 +1,127 @@
+# Tests for the shared rate limiter / retry executor (no network needed)
+# Run: python -m pytest test/test_request_executor.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from googleapiclient.errors import HttpError
+from conftest import make_error
+from request_executor import (RequestExecutor, RetryPolicy, TokenBucket, classify_error,
+                              RETRY, THROTTLE, FATAL, QUOTA)
+
+
+class FlakyRequest:
+    """Raises the given errors in order, then returns 'ok'"""
+    def __init__(self, *errors, method='GET'):
+        self.errors = list(errors)
+        self.method = method
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+def make_executor():
+    waits = []
+    executor = RequestExecutor(TokenBucket(rate=1000, burst=1000), RetryPolicy(max_retries=3),
+                               sleep=waits.append)
+    return executor, waits
+
+
+def test_classify_error():
+    assert classify_error(make_error(403, 'quotaExceeded')) == QUOTA
+    assert classify_error(make_error(403, 'rateLimitExceeded')) == THROTTLE
+    assert classify_error(make_error(429)) == THROTTLE
+    assert classify_error(make_error(409)) == RETRY
+    assert classify_error(make_error(503)) == RETRY
+    assert classify_error(ConnectionResetError()) == RETRY
+    assert classify_error(make_error(404, 'playlistNotFound')) == FATAL
+
+
+def test_retries_transient_errors_then_succeeds():
+    executor, waits = make_executor()
+    request = FlakyRequest(make_error(500), make_error(409))
+    assert executor.execute(request) == 'ok'
+    assert request.calls == 3
+    assert len(waits) == 2
+
+
+def test_fails_fast_on_quota_and_client_errors():
+    for error in (make_error(403, 'quotaExceeded'), make_error(400, 'invalidValue')):
+        executor, waits = make_executor()
+        request = FlakyRequest(error)
+        with pytest.raises(HttpError):
+            executor.execute(request)
+        assert request.calls == 1
+        assert waits == []
+
+
+def test_network_errors_are_not_retried_for_posts():
+    executor, waits = make_executor()
+    assert executor.execute(FlakyRequest(ConnectionResetError())) == 'ok'
+    request = FlakyRequest(ConnectionResetError(), method='POST')
+    with pytest.raises(ConnectionResetError):
+        executor.execute(request)
+    assert request.calls == 1
+    # Server errors mean nothing was written, so those are still retried
+    assert executor.execute(FlakyRequest(make_error(503), method='POST')) == 'ok'
+
+
+def test_throttle_slows_rate_and_respects_retry_after():
+    executor, waits = make_executor()
+    rate = executor.rate_limiter.rate
+    executor.execute(FlakyRequest(make_error(429, retry_after=7)))
+    assert waits[0] >= 7
+    assert executor.rate_limiter.rate < rate + executor.rate_limiter.increase
+
+
+def test_gives_up_after_max_retries():
+    executor, waits = make_executor()
+    request = FlakyRequest(*[make_error(503)] * 10)
+    with pytest.raises(HttpError):
+        executor.execute(request)
+    assert request.calls == 4
+
+
+def test_max_in_flight_is_shared_by_all_threads():
+    executor = RequestExecutor(TokenBucket(rate=1000, burst=1000), max_in_flight=2)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    class SlowRequest:
+        def execute(self):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+            return 'ok'
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(lambda _: executor.execute(SlowRequest()), range(16))) == ['ok'] * 16
+    assert max(peak) == 2
+
+
+def test_waiting_for_tokens_does_not_hold_an_in_flight_slot():
+    release = threading.Event()
+
+    class HeldBucket(TokenBucket):
+        def acquire(self, tokens=1):
+            if tokens > 1:      # The big request waits for tokens until released
+                release.wait(5)
+
+    executor = RequestExecutor(HeldBucket(), max_in_flight=1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        waiting = pool.submit(executor.execute, FlakyRequest(), cost=50)
+        time.sleep(0.05)
+        assert executor.execute(FlakyRequest()) == 'ok'     # Not stuck behind the waiting one
+        assert not waiting.done()
+        release.set()
+        assert waiting.result() == 'ok'
@@ -0,0 +1,78 @@
+# Tests for the NumPy shuffle strategies (no network needed)
+# Run: python -m pytest test/test_shuffle_strategies.py
+
+import numpy as np
+import pytest
+from playlist_manager import PlaylistManager
+from shuffle_strategies import build_permutation, min_group_distance
+from video_store import VideoStore
+
+
+def make_videos(n, channels=10):
+    return [{'video_id': f"v{i}", 'title': f"t{i}", 'channel_id': f"c{i % channels}",
+             'duration_seconds': (i % 5) * 60,
+             'published_at': f"20{10 + i % 15}-01-01T00:00:00Z"} for i in range(n)]
+
+
+def is_permutation(order, n):
+    return sorted(order.tolist()) == list(range(n))
+
+
+@pytest.mark.parametrize('strategy', ['random', 'weighted', 'recency', 'avoid_previous', 'channel_spread'])
+def test_every_strategy_returns_a_reproducible_permutation(strategy):
+    videos = make_videos(500)
+    first = build_permutation(videos, strategy, seed=42)
+    assert is_permutation(first, 500)
+    assert np.array_equal(first, build_permutation(videos, strategy, seed=42))
+
+
+def test_avoid_previous_moves_every_video():
+    for seed in range(50):
+        order = build_permutation(make_videos(7), 'avoid_previous', seed=seed)
+        assert not (order == np.arange(7)).any()
+
+
+def test_channel_spread_keeps_channels_apart():
+    videos = make_videos(1000, channels=10)
+    order = build_permutation(videos, 'channel_spread', seed=1, k=5)
+    codes = np.array([int(videos[i]['channel_id'][1:]) for i in order])
+    assert min_group_distance(codes) > 5
+
+
+def test_channel_spread_uses_greedy_when_tight():
+    # 4 channels and k=3 only works with a strict round robin
+    videos = make_videos(40, channels=4)
+    order = build_permutation(videos, 'channel_spread', seed=3, k=3)
+    codes = np.array([int(videos[i]['channel_id'][1:]) for i in order])
+    assert min_group_distance(codes) == 4
+
+
+def test_zero_weight_videos_go_last():
+    videos = make_videos(100)
+    order = build_permutation(videos, 'weighted', seed=5)
+    zero = [videos[i]['duration_seconds'] == 0 for i in order]
+    assert zero == sorted(zero)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        build_permutation([], 'nope')
+
+
+def test_playlist_manager_applies_strategy_to_lists_and_stores():
+    pm = PlaylistManager(None)
+    videos = make_videos(30)
+    shuffled = pm.shuffle_videos(videos, 'random', seed=9)
+    assert sorted(v['video_id'] for v in shuffled) == sorted(v['video_id'] for v in videos)
+
+    view = pm.shuffle_videos(VideoStore.from_videos(videos), seed=9)
+    assert view.video_ids() == [v['video_id'] for v in shuffled]
+
+
+@pytest.mark.parametrize('strategy', ['weighted', 'recency', 'channel_spread'])
+def test_strategies_that_need_metadata_refuse_a_store(strategy):
+    # A VideoStore keeps no channel/duration/date; silently shuffling at random would hide that
+    store = VideoStore.from_videos(make_videos(30))
+    with pytest.raises(ValueError):
+        PlaylistManager(None).shuffle_videos(store, strategy, seed=1)
+    assert len(PlaylistManager(None).shuffle_videos(store, 'weighted', seed=1, weights=[1] * 30)) == 30
@@ -0,0 +1,86 @@
+# Tests for the headless batch CLI (no network needed)
+# Run: python -m pytest test/test_shuffler_cli.py
+
+import os
+import io
+import json
+
+import pytest
+from shuffler_cli import BatchRunner, load_config
+
+PLAYLISTS = [
+    {'id': 'PL1', 'title': 'Road trip 2024', 'video_count': 3},
+    {'id': 'PL2', 'title': 'Road trip 2025', 'video_count': 0},
+    {'id': 'PL3', 'title': 'Workout', 'video_count': 5},
+]
+
+
+class FakeManager:
+    def get_user_playlists(self):
+        return PLAYLISTS
+
+    def reshuffle_in_place(self, playlist_id):
+        if playlist_id == 'PL3':
+            raise RuntimeError("boom")
+        return 2, []
+
+    def export_snapshot(self, playlist_id, path, item_count=None, title=None):
+        open(path, 'w').close()
+        return item_count
+
+    def sync_playlist(self, source_id, target_id, source_count=None, target_count=None, seed=None):
+        return 1, 2, []
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    out = io.StringIO()
+    runner = BatchRunner(concurrency=2, out=out)
+    runner.manager = lambda: FakeManager()
+    return runner, out
+
+
+def events(out):
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_select_by_id_and_title_glob(runner):
+    runner, out = runner
+    selected = runner.select_playlists(['Road trip *', 'PL1', 'Nope'])
+    assert [p['id'] for p in selected] == ['PL1', 'PL2']
+    assert events(out)[0]['event'] == 'warning'
+
+
+def test_results_are_json_lines(runner):
+    runner, out = runner
+    tasks = [(p['id'], lambda p=p: runner.shuffle_one(p, 'reshuffle', '')) for p in PLAYLISTS]
+    assert runner.run_all(tasks) is False
+
+    results = {e.get('playlist_id') or e.get('name'): e for e in events(out) if e['event'] == 'result'}
+    assert results['PL1']['status'] == 'ok'
+    assert results['PL3']['status'] == 'error'
+    assert events(out)[-1]['event'] == 'finished'
+
+
+def test_config_is_validated(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'playlists': []}))
+    with pytest.raises(ValueError):
+        load_config(str(path))
+    path.write_text(json.dumps({'playlists': ['PL1'], 'mode': 'reshuffle'}))
+    assert load_config(str(path))['mode'] == 'reshuffle'
+
+
+def test_sync_result(runner):
+    runner, out = runner
+    assert runner.run_all([('PL1', lambda: runner.sync(PLAYLISTS[0], PLAYLISTS[1]))]) is True
+    result = [e for e in events(out) if e['event'] == 'result'][0]
+    assert (result['target_playlist_id'], result['added'], result['removed']) == ('PL2', 1, 2)
+
+
+def test_snapshot_result(runner, tmp_path):
+    runner, out = runner
+    assert runner.run_all([('PL3', lambda: runner.snapshot(PLAYLISTS[2], 'snaps', '.ysnap'))]) is True
+    result = [e for e in events(out) if e['event'] == 'result'][0]
+    assert (result['videos'], os.path.exists(result['path'])) == (5, True)
@@ -0,0 +1,49 @@
+# Tests for paginated playlist listing and detail fetch against the fake server
+# Run: python -m pytest test/test_user_playlists.py
+
+import pytest
+from conftest import fast_executor
+from fake_youtube_server import FakeYouTubeServer, build_fake_service
+from playlist_manager import PlaylistManager
+
+
+@pytest.fixture
+def server():
+    with FakeYouTubeServer() as server:
+        for i in range(130):
+            server.state.add_playlist(f"List {i}", ['v'] * (i % 7))
+        yield server
+
+
+def test_lists_every_page(server):
+    playlists = PlaylistManager(build_fake_service(server)).get_user_playlists()
+    assert len(playlists) == 130
+    assert playlists[129]['title'] == 'List 129'
+    assert playlists[6]['video_count'] == 6
+
+
+def test_listing_is_cached_until_refresh(server):
+    pm = PlaylistManager(build_fake_service(server))
+    assert len(pm.get_user_playlists()) == 130
+    server.state.add_playlist('Late addition')
+    assert len(pm.get_user_playlists()) == 130
+    assert len(pm.get_user_playlists(refresh=True)) == 131
+
+
+def test_dropped_connection_is_reported_and_not_cached(server):
+    pm = PlaylistManager(build_fake_service(server), fast_executor())
+    server.state.inject_disconnect(count=100, method='GET', resource='playlists')
+    assert pm.get_user_playlists() == []
+    server.state.faults.clear()
+    assert len(pm.get_user_playlists()) == 130
+
+
+def test_details_are_fetched_in_chunks_and_cached(server):
+    pm = PlaylistManager(build_fake_service(server))
+    ids = [p['id'] for p in pm.get_user_playlists()]
+    details = pm.get_playlist_details(ids)
+    assert len(details) == 130
+    assert details[ids[3]]['item_count'] == 3
+
+    server.state.playlists[ids[3]]['items'].append('new')
+    assert pm.get_playlist_details([ids[3]])[ids[3]]['item_count'] == 3
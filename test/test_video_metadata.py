@@ -0,0 +1,64 @@
+# Tests for batched video metadata enrichment against the fake server
+# Run: python -m pytest test/test_video_metadata.py
+
+import pytest
+from fake_youtube_server import FakeYouTubeServer, build_fake_service
+from playlist_manager import PlaylistManager
+from video_metadata import VideoMetadataCache, parse_duration
+
+
+class CountingExecutor:
+    """Wraps the real executor to count API calls"""
+    def __init__(self, executor):
+        self.executor = executor
+        self.calls = 0
+
+    def execute(self, request, **kwargs):
+        self.calls += 1
+        return self.executor.execute(request, **kwargs)
+
+
+@pytest.fixture
+def server():
+    with FakeYouTubeServer() as server:
+        for i in range(120):
+            server.state.add_video(f"vid{i:04d}", channel_id=f"UC{i % 3}", duration=f"PT{i}M{i}S")
+        server.state.add_video('private1', privacy_status='private')   # The user's own upload
+        server.state.add_video('rejected1', upload_status='rejected')
+        yield server
+
+
+def test_parse_duration():
+    assert parse_duration('PT1H2M3S') == 3723
+    assert parse_duration('P1DT1S') == 86401
+    assert parse_duration('PT0S') == 0
+    assert parse_duration(None) == 0
+
+
+def test_enrich_flags_deleted_and_rejected_videos(server, tmp_path):
+    pm = PlaylistManager(build_fake_service(server),
+                         metadata_cache=VideoMetadataCache(str(tmp_path / 'videos.db')))
+    videos = [{'video_id': f"vid{i:04d}", 'title': ''} for i in range(120)]
+    videos += [{'video_id': vid, 'title': ''} for vid in ('private1', 'rejected1', 'gone')]
+
+    enriched = pm.enrich_videos(videos)
+    assert enriched[5]['duration_seconds'] == 5 * 60 + 5
+    assert enriched[5]['channel_id'] == 'UC2'
+    assert [v['video_id'] for v in enriched if not v['available']] == ['rejected1', 'gone']
+    assert enriched[120]['privacy_status'] == 'private'
+
+
+def test_cache_is_shared_between_playlists(server, tmp_path):
+    cache = VideoMetadataCache(str(tmp_path / 'videos.db'))
+    first = PlaylistManager(build_fake_service(server), metadata_cache=cache)
+    first.enrich_videos([{'video_id': f"vid{i:04d}", 'title': ''} for i in range(100)])
+
+    # A second playlist overlapping the first one only fetches the new IDs
+    pm = PlaylistManager(build_fake_service(server), metadata_cache=cache)
+    pm.executor = CountingExecutor(pm.executor)
+    pm.enrich_videos([{'video_id': f"vid{i:04d}", 'title': ''} for i in range(50, 120)])
+    assert pm.executor.calls == 1
+
+    cache.ttl = -1  # Everything is stale now
+    pm.enrich_videos([{'video_id': 'vid0001', 'title': ''}])
+    assert pm.executor.calls == 2
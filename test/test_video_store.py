@@ -0,0 +1,33 @@
+# Tests for the compact VideoStore (no network needed)
+# Run: python -m pytest test/test_video_store.py
+
+from playlist_manager import PlaylistManager
+from video_store import VideoStore
+
+VIDEOS = [{'video_id': f"vid{i}", 'title': f"Título {i} ♫", 'item_id': f"item{i}"} for i in range(20)]
+
+
+def test_round_trips_records():
+    store = VideoStore.from_videos(VIDEOS)
+    assert len(store) == 20
+    assert list(store.view()) == VIDEOS
+    assert store.record(0)['title'] == "Título 0 ♫"
+
+
+def test_missing_item_id_stays_none():
+    store = VideoStore.from_videos([{'video_id': 'a', 'title': ''}])
+    assert store.record(0) == {'video_id': 'a', 'title': '', 'item_id': None}
+
+
+def test_shuffle_is_an_index_permutation():
+    store = VideoStore.from_videos(VIDEOS)
+    view = PlaylistManager(None).shuffle_videos(store)
+    assert view.store is store
+    assert sorted(view.order) == list(range(20))
+    assert view.video_ids() == [VIDEOS[i]['video_id'] for i in view.order]
+
+
+def test_permuting_a_view_composes_orders():
+    store = VideoStore.from_videos(VIDEOS)
+    view = store.view(list(reversed(range(20))))
+    assert [v['video_id'] for v in view.permute([0, 1])] == ['vid19', 'vid18']
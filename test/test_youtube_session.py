@@ -0,0 +1,98 @@
+# Tests for the shared YouTube session: per-thread services, cached discovery, token refresh
+# Run: python -m pytest test/test_youtube_session.py
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.auth.credentials import Credentials
+from fake_youtube_server import FakeYouTubeServer
+from playlist_manager import PlaylistManager
+from youtube_session import YouTubeSession
+
+
+class FakeCredentials(Credentials):
+    """Token valid for lifetime seconds; refresh() never touches the network"""
+    def __init__(self, lifetime):
+        super().__init__()
+        self.lifetime = lifetime
+        self.refresh_token = 'refresh'
+        self.refreshes = 0
+        self.refresh(None)
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token{self.refreshes}"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=self.lifetime)
+
+    def to_json(self):
+        return '{"token": "%s"}' % self.token
+
+
+@pytest.fixture
+def server():
+    with FakeYouTubeServer() as server:
+        server.state.add_playlist('Source', [f"v{i}" for i in range(60)], playlist_id='PLsrc')
+        yield server
+
+
+def test_each_thread_gets_its_own_service_and_http(server):
+    session = YouTubeSession(None, root_url=server.root)
+    mine = session.service()
+    assert session.service() is mine
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append((session.service(), session.http())))
+    thread.start()
+    thread.join()
+    assert other[0][0] is not mine and other[0][1] is not session.http()
+
+    pm = PlaylistManager(mine, session=session)
+    assert len(pm.get_playlist_videos('PLsrc', 60)) == 60
+
+
+def test_token_is_refreshed_in_the_background_and_saved(tmp_path):
+    credentials = FakeCredentials(lifetime=1.5)
+    token_path = str(tmp_path / 'token.json')
+    session = YouTubeSession(credentials, token_path=token_path, refresh_margin=1).start()
+    try:
+        deadline = time.monotonic() + 5
+        while credentials.refreshes < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        session.stop()
+    assert credentials.refreshes >= 2
+    with open(token_path) as f:
+        assert credentials.token in f.read()
+
+
+def test_refresher_survives_a_token_without_expiry():
+    class NoExpiryCredentials(FakeCredentials):
+        def refresh(self, request):
+            super().refresh(request)
+            self.expiry = None      # The refreshed token never expires
+
+    credentials = NoExpiryCredentials(lifetime=0)
+    credentials.expiry = datetime.now(timezone.utc).replace(tzinfo=None)    # Due now
+    session = YouTubeSession(credentials, refresh_margin=1).start()
+    try:
+        deadline = time.monotonic() + 5
+        while credentials.refreshes < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.1)
+        assert credentials.refreshes == 1
+        assert session._refresher.is_alive()
+    finally:
+        session.stop()
+
+
+def test_service_requests_carry_the_current_token(server):
+    credentials = FakeCredentials(lifetime=3600)
+    session = YouTubeSession(credentials, root_url=server.root)
+    request = session.service().playlists().list(part='snippet', mine=True)
+    headers = {}
+    credentials.before_request(None, 'GET', request.uri, headers)
+    assert headers['authorization'] == f"Bearer {credentials.token}"
+    assert request.uri.startswith(server.root)
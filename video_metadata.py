@@ -0,0 +1,94 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_METADATA_PATH = 'video_cache.sqlite3'
+DEFAULT_TTL = 7 * 24 * 3600     # Durations and channels rarely change; availability might
+
+_DURATION = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?')
+
+
+def parse_duration(value):
+    """Convert an ISO 8601 duration such as 'PT1H2M3S' to seconds (0 if unknown)"""
+    match = _DURATION.fullmatch(value or '')
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def metadata_from_resource(item):
+    """Turn a videos().list resource into the fields we keep"""
+    status = item.get('status', {})
+    upload = status.get('uploadStatus')
+    return {
+        'channel_id': item['snippet'].get('channelId'),
+        'channel_title': item['snippet'].get('channelTitle'),
+        'published_at': item['snippet'].get('publishedAt'),
+        'duration_seconds': parse_duration(item.get('contentDetails', {}).get('duration')),
+        'privacy_status': status.get('privacyStatus'),
+        'upload_status': upload,
+        # Other people's private videos are not returned at all (MISSING_VIDEO);
+        # a private video that is returned is the user's own and can be added
+        'available': upload not in UNAVAILABLE_UPLOADS
+    }
+
+
+# Upload states whose videos cannot be added to a playlist
+UNAVAILABLE_UPLOADS = ('deleted', 'failed', 'rejected')
+
+# What we store for an ID that videos().list did not return at all
+MISSING_VIDEO = {'channel_id': None, 'channel_title': None, 'published_at': None,
+                 'duration_seconds': 0, 'privacy_status': None, 'upload_status': None,
+                 'available': False}
+
+
+class VideoMetadataCache:
+    """
+    One on-disk cache of video metadata shared by every playlist
+    A video seen in ten playlists is fetched once; entries older than ttl
+    seconds are fetched again.
+    """
+    def __init__(self, path=DEFAULT_METADATA_PATH, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id TEXT PRIMARY KEY,
+                    data TEXT,
+                    fetched REAL
+                )
+            """)
+
+    def get_many(self, video_ids):
+        """
+        Return fresh cached metadata
+        Returns: dictionary video_id -> metadata, only for IDs cached within ttl
+        """
+        found = {}
+        oldest = time.time() - self.ttl
+        ids = list(dict.fromkeys(video_ids))
+        with self._lock:
+            # Stay well below SQLite's limit on query parameters
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT video_id, data FROM videos WHERE fetched >= ? "
+                    f"AND video_id IN ({','.join('?' * len(chunk))})", [oldest] + chunk).fetchall()
+                found.update((video_id, json.loads(data)) for video_id, data in rows)
+        # Entries without upload_status were written when private meant unavailable; refetch them
+        return {video_id: data for video_id, data in found.items() if 'upload_status' in data}
+
+    def store_many(self, metadata):
+        """Save a dictionary video_id -> metadata"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO videos VALUES (?, ?, ?)",
+                                 [(video_id, json.dumps(data), now) for video_id, data in metadata.items()])
+
+    def close(self):
+        self._db.close()
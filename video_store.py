@@ -0,0 +1,104 @@
+import random
+import sys
+from array import array
+
+
+class StringColumn:
+    """Many strings packed into one UTF-8 blob plus an array of end offsets"""
+    __slots__ = ('_blob', '_ends')
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._ends = array('Q')
+
+    def append(self, text):
+        self._blob += text.encode('utf-8')
+        self._ends.append(len(self._blob))
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, index):
+        start = self._ends[index - 1] if index else 0
+        return self._blob[start:self._ends[index]].decode('utf-8')
+
+
+class VideoStore:
+    """
+    Compact, column-oriented store of playlist videos
+    Video IDs are interned strings in one list (a video in several merged
+    playlists is stored once); titles and playlist item IDs are packed
+    StringColumns. Shuffling produces an index permutation (VideoView)
+    instead of copying records, so huge merged playlists stay small.
+    """
+    __slots__ = ('video_ids', 'titles', 'item_ids')
+
+    def __init__(self):
+        self.video_ids = []             # Interned video ID strings
+        self.titles = StringColumn()
+        self.item_ids = StringColumn()  # '' when unknown
+
+    @classmethod
+    def from_videos(cls, videos):
+        """Build a store from video dictionaries (as returned by get_playlist_videos)"""
+        store = cls()
+        store.extend(videos)
+        return store
+
+    def append(self, video_id, title, item_id=None):
+        self.video_ids.append(sys.intern(video_id))
+        self.titles.append(title)
+        self.item_ids.append(item_id or '')
+
+    def extend(self, videos):
+        """Add video dictionaries, e.g. one page at a time from iter_playlist_pages"""
+        for video in videos:
+            self.append(video['video_id'], video['title'], video.get('item_id'))
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def record(self, index):
+        """Return one video as the usual dictionary"""
+        return {'video_id': self.video_ids[index], 'title': self.titles[index],
+                'item_id': self.item_ids[index] or None}
+
+    def view(self, order=None):
+        """A view of the store in the given index order (default: stored order)"""
+        return VideoView(self, order if order is not None else array('L', range(len(self))))
+
+    def shuffled(self, rng=random):
+        """Return a shuffled VideoView; only the index array is permuted"""
+        order = array('L', range(len(self)))
+        rng.shuffle(order)
+        return VideoView(self, order)
+
+
+class VideoView:
+    """
+    A permutation of a VideoStore: an index array, no copied records
+    Views of views compose their permutations, still without copying.
+    """
+    __slots__ = ('store', 'order')
+
+    def __init__(self, store, order):
+        self.store = store
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, position):
+        return self.store.record(self.order[position])
+
+    def __iter__(self):
+        return (self.store.record(index) for index in self.order)
+
+    def video_ids(self):
+        """Video IDs in view order - what add_videos_to_playlist needs"""
+        ids = self.store.video_ids
+        return [ids[index] for index in self.order]
+
+    def permute(self, order):
+        """Reorder this view by positions within it; returns a new view"""
+        return VideoView(self.store, array('L', (self.order[position] for position in order)))
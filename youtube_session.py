@@ -0,0 +1,129 @@
+import json
+import threading
+from datetime import datetime, timezone
+import google_auth_httplib2
+import httplib2
+from google.auth.exceptions import RefreshError, TransportError
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+# Refresh this many seconds before the token expires - earlier than google-auth's
+# own threshold (3m45s), which would otherwise refresh on a request thread
+REFRESH_MARGIN = 300
+RETRY_INTERVAL = 30         # Seconds between attempts after a failed refresh
+
+_documents = {}             # (api, version) -> parsed discovery document
+_documents_lock = threading.Lock()
+
+
+def discovery_document(api='youtube', version='v3'):
+    """
+    The discovery document bundled with google-api-python-client, parsed once
+    build() fetches (or re-reads) and parses it on every call; building from
+    this dictionary skips both.
+    """
+    with _documents_lock:
+        if (api, version) not in _documents:
+            document = get_static_doc(api, version)
+            if document is None:
+                raise ValueError(f"No bundled discovery document for {api} {version}")
+            _documents[(api, version)] = json.loads(document)
+        return _documents[(api, version)]
+
+
+class YouTubeSession:
+    """
+    One set of OAuth credentials shared by every thread of the process
+    Hands out a separate Http and service object per thread (httplib2 is not
+    thread-safe) and refreshes the token in the background before it
+    expires, so long jobs never stall on an expired token mid-insert.
+    Args: credentials - google.oauth2 Credentials (None for an unauthenticated server),
+          token_path - where refreshed tokens are saved (None to not save),
+          refresh_margin - seconds before expiry to refresh,
+          root_url - API root override (e.g. a local test server)
+    """
+    def __init__(self, credentials, token_path=None, refresh_margin=REFRESH_MARGIN, root_url=None):
+        self.credentials = credentials
+        self.token_path = token_path
+        self.refresh_margin = refresh_margin
+        self.document = discovery_document()
+        if root_url:
+            self.document = dict(self.document, rootUrl=root_url)
+        self._local = threading.local()
+        self._lock = threading.Lock()   # One refresh at a time
+        self._stop = threading.Event()
+        self._refresher = None
+
+    # === Per-thread objects ===
+    def http(self):
+        """The calling thread's (authorized) Http"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = httplib2.Http()
+            if self.credentials is not None:
+                http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=http)
+            self._local.http = http
+        return http
+
+    def service(self):
+        """The calling thread's YouTube service, built from the cached discovery document"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = build_from_document(self.document, http=self.http())
+        return service
+
+    # === Token refresh ===
+    def refresh(self):
+        """
+        Refresh the access token now and save it
+        Returns: True on success; failures are printed and retried by the refresher
+        """
+        if self.credentials is None or not getattr(self.credentials, 'refresh_token', None):
+            return False
+        with self._lock:
+            try:
+                self.credentials.refresh(Request())
+            except (RefreshError, TransportError) as e:
+                print(f"Token refresh failed: {e}")
+                return False
+            if self.token_path:
+                with open(self.token_path, 'w') as token:
+                    token.write(self.credentials.to_json())
+        return True
+
+    def seconds_until_refresh(self):
+        """How long the current token can still be used before refreshing (None if it never expires)"""
+        expiry = getattr(self.credentials, 'expiry', None)
+        if expiry is None:
+            return None
+        now = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth uses naive UTC
+        return (expiry - now).total_seconds() - self.refresh_margin
+
+    def start(self):
+        """Start the background refresher (no-op without refreshable credentials); returns self"""
+        if self._refresher is None and getattr(self.credentials, 'refresh_token', None):
+            self._refresher = threading.Thread(target=self._refresh_loop, name='token-refresher', daemon=True)
+            self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            remaining = self.seconds_until_refresh()
+            if remaining is not None and remaining <= 0:
+                if not self.refresh():
+                    self._stop.wait(RETRY_INTERVAL)
+                    continue
+                remaining = self.seconds_until_refresh()
+                if remaining is not None and remaining <= 0:
+                    self._stop.wait(RETRY_INTERVAL)     # Still expired: do not spin
+                continue
+            # Sleep until the refresh is due; wake up every 10 minutes anyway in
+            # case the credentials were refreshed or replaced elsewhere
+            self._stop.wait(600 if remaining is None else min(remaining, 600))